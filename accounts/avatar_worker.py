@@ -0,0 +1,39 @@
+# Обработка аватаров в отдельном процессе (см. accounts/avatars.py)
+#
+# Модуль не импортирует Django, чтобы дочерние процессы пула стартовали
+# быстро и не требовали настройки проекта.
+
+import base64
+import io
+import os
+import uuid
+
+from PIL import Image, ImageOps
+
+
+def _save_atomic(img, path, quality):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    img.save(tmp_path, 'WEBP', quality=quality, method=4)
+    os.replace(tmp_path, path)
+
+
+def render_avatar(source, targets, placeholder_size, quality):
+    """
+    Квадратные копии аватара source: targets — {размер: путь}.
+
+    Возвращает крошечную размытую заглушку в виде data URI, которую
+    страница показывает, пока загружается сама картинка.
+    """
+    with Image.open(source) as original:
+        # Поворот по EXIF применяем к пикселям — метаданные в копии не попадают
+        img = ImageOps.exif_transpose(original)
+        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+    for size, path in targets.items():
+        _save_atomic(ImageOps.fit(img, (size, size), Image.LANCZOS), path, quality)
+
+    tiny = ImageOps.fit(img, (placeholder_size, placeholder_size), Image.BILINEAR).convert('RGB')
+    buffer = io.BytesIO()
+    tiny.save(buffer, 'JPEG', quality=50)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
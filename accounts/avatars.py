@@ -0,0 +1,95 @@
+# Копии аватаров пользователей
+#
+# Раньше User.save открывал аватар через PIL при каждом сохранении (в том
+# числе при обновлении last_login) и перезаписывал файл. Теперь обработка
+# запускается только при смене файла (accounts/signals.py), после коммита
+# транзакции, в пуле процессов обработки изображений (core/images.py):
+# запрос не ждет декодирования изображения.
+#
+# Для каждого аватара строятся квадратные WebP-копии фиксированных размеров
+# рядом с оригиналом (avatars/me.png -> avatars/me.png.w128.webp) и заглушка
+# в User.avatar_placeholder. Пока копий нет, выводится оригинал.
+#
+# Настройки (settings.AVATARS):
+#   ASYNC            — False: обрабатывать сразу в текущем процессе
+#   SIZES            — размеры копий, px
+#   PLACEHOLDER_SIZE — размер заглушки, px
+#   QUALITY          — качество WebP
+
+import logging
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections
+
+from core.images import get_executor, variant_name
+from .avatar_worker import render_avatar
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ASYNC': True,
+    'SIZES': (64, 128, 300),
+    'PLACEHOLDER_SIZE': 8,
+    'QUALITY': 82,
+}
+
+
+def _setting(name):
+    return getattr(settings, 'AVATARS', {}).get(name, DEFAULTS[name])
+
+
+def avatar_name(name, size):
+    return variant_name(name, size, 'webp')
+
+
+def _save_placeholder(user_pk, name, placeholder):
+    from .models import User
+
+    # Аватар могли сменить, пока шла обработка, — тогда результат устарел
+    User.objects.filter(pk=user_pk, avatar=name).update(avatar_placeholder=placeholder)
+
+
+def _on_done(user_pk, name, future):
+    try:
+        _save_placeholder(user_pk, name, future.result())
+    except Exception:
+        logger.exception('Не удалось обработать аватар %s', name)
+    finally:
+        # Колбэк выполняется в служебном потоке пула — не держим его соединение с БД
+        connections.close_all()
+
+
+def process(user_pk, name, wait=False):
+    """
+    Строит копии и заглушку аватара name пользователя user_pk;
+    wait=True — в текущем процессе, не через пул.
+    """
+    args = (
+        default_storage.path(name),
+        {size: default_storage.path(avatar_name(name, size)) for size in _setting('SIZES')},
+        _setting('PLACEHOLDER_SIZE'),
+        _setting('QUALITY'),
+    )
+    if wait or not _setting('ASYNC'):
+        _save_placeholder(user_pk, name, render_avatar(*args))
+        return
+    future = get_executor().submit(render_avatar, *args)
+    future.add_done_callback(lambda future: _on_done(user_pk, name, future))
+
+
+def delete_variants(name):
+    for size in _setting('SIZES'):
+        default_storage.delete(avatar_name(name, size))
+
+
+def avatar_url(user, size):
+    """URL наименьшей копии не меньше size (или оригинала, если копий еще нет)"""
+    if not user.avatar:
+        return ''
+    if not user.avatar_placeholder:
+        return user.avatar.url
+    sizes = sorted(_setting('SIZES'))
+    chosen = next((candidate for candidate in sizes if candidate >= size), sizes[-1])
+    return default_storage.url(avatar_name(user.avatar.name, chosen))
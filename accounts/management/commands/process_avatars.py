@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from accounts import avatars
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Строит копии и заглушки аватаров, которые еще не обработаны'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Обработать все аватары заново')
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(avatar='').exclude(avatar__isnull=True)
+        if not options['force']:
+            users = users.filter(avatar_placeholder='')
+
+        total = 0
+        for pk, name in users.values_list('pk', 'avatar').iterator():
+            try:
+                avatars.process(pk, name, wait=True)
+            except Exception as exc:
+                self.stdout.write(self.style.WARNING(f'{name}: {exc}'))
+                continue
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано аватаров: {total}'))
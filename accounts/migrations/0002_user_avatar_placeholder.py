@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Заглушка аватара'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_avatar_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notifications_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Непрочитанных уведомлений'),
+        ),
+    ]
@@ -1,15 +1,17 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.urls import reverse
-from PIL import Image
-import os
 
+from core.mixins import CounterFieldsMixin
 
-class User(AbstractUser):
+
+class User(CounterFieldsMixin, AbstractUser):
     """Расширенная модель пользователя"""
     email = models.EmailField('Электронная почта', unique=True)
     is_developer = models.BooleanField('Является разработчиком', default=False)
     avatar = models.ImageField('Аватар', upload_to='avatars/', blank=True, null=True)
+    # Заполняется после обработки аватара в фоне (accounts/avatars.py)
+    avatar_placeholder = models.TextField('Заглушка аватара', blank=True, editable=False)
     bio = models.TextField('О себе', max_length=500, blank=True)
     date_of_birth = models.DateField('Дата рождения', blank=True, null=True)
     location = models.CharField('Местоположение', max_length=100, blank=True)
@@ -23,6 +25,13 @@ class User(AbstractUser):
     email_notifications = models.BooleanField('Уведомления по эл. почте', default=True)
     public_profile = models.BooleanField('Публичный профиль', default=True)
     
+    # Непрочитанные уведомления (поддерживается social/notifications.py)
+    unread_notifications_count = models.PositiveIntegerField('Непрочитанных уведомлений', default=0, editable=False)
+    
+    # Посты автора с большим числом подписчиков не раскладываются по лентам,
+    # а подмешиваются при чтении (social/feed.py)
+    feed_pull = models.BooleanField('Лента: чтение при запросе', default=False, editable=False)
+    
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Обновлено', auto_now=True)
     
@@ -36,16 +45,8 @@ class User(AbstractUser):
     def get_absolute_url(self):
         return reverse('accounts:profile', kwargs={'username': self.username})
     
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        
-        # Сжатие аватара
-        if self.avatar:
-            img = Image.open(self.avatar.path)
-            if img.height > 300 or img.width > 300:
-                output_size = (300, 300)
-                img.thumbnail(output_size)
-                img.save(self.avatar.path)
+    # Поля, которые меняются запросами в БД (счетчики, флаг ленты), см. core/mixins.py
+    COUNTER_FIELDS = ('unread_notifications_count', 'feed_pull')
     
     @property
     def full_name(self):
@@ -0,0 +1,45 @@
+# Сигналы приложения accounts
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import avatars
+from .models import User
+
+
+@receiver(pre_save, sender=User)
+def remember_avatar(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Запоминает прежний аватар, чтобы заметить его замену"""
+    instance._previous_avatar = None
+    if raw or not instance.pk or (update_fields is not None and 'avatar' not in update_fields):
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list('avatar', flat=True).first()
+    instance._previous_avatar = previous or ''
+
+
+@receiver(post_save, sender=User)
+def process_avatar(sender, instance, created=False, raw=False, **kwargs):
+    """Ставит обработку нового аватара в очередь; профиль сохраняется без PIL"""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_avatar', None)
+    if previous is None and not created:
+        return
+    name = instance.avatar.name or ''
+    if name == (previous or ''):
+        return
+    if instance.avatar_placeholder:
+        # Копии старого аватара к новому не подходят
+        User.objects.filter(pk=instance.pk).update(avatar_placeholder='')
+        instance.avatar_placeholder = ''
+    if name:
+        transaction.on_commit(lambda: avatars.process(instance.pk, name))
+    if previous:
+        transaction.on_commit(lambda: avatars.delete_variants(previous))
+
+
+@receiver(post_delete, sender=User)
+def delete_avatar_variants(sender, instance, **kwargs):
+    if instance.avatar:
+        name = instance.avatar.name
+        transaction.on_commit(lambda: avatars.delete_variants(name))
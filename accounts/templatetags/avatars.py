@@ -0,0 +1,34 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from accounts.avatars import avatar_url
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def avatar(user, size, **attrs):
+    """
+    <img> аватара нужного размера (с учетом экранов высокой плотности):
+
+        {% avatar profile_user 120 class="rounded-circle" %}
+
+    Пока копия загружается, фоном показывается размытая заглушка.
+    """
+    if not user.avatar:
+        return ''
+    attrs.setdefault('alt', user.username)
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    if user.avatar_placeholder:
+        style = f'background: url({user.avatar_placeholder}) center / cover; object-fit: cover;'
+        attrs['style'] = f"{style} {attrs.get('style', '')}".strip()
+    return format_html(
+        '<img src="{}" width="{}" height="{}"{}>',
+        avatar_url(user, size * 2),
+        size,
+        size,
+        flatatt(attrs),
+    )
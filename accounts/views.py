@@ -7,6 +7,8 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.http import JsonResponse
 from django.db.models import Q
+from core import viewer
+from core.models import DeveloperStats
 from .models import User, DeveloperProfile, Follow
 from .forms import CustomUserCreationForm, UserProfileForm, DeveloperProfileForm, LoginForm
 
@@ -69,9 +71,7 @@ class ProfileView(DetailView):
         # Проверяем, подписан ли текущий пользователь
         context['is_following'] = False
         if self.request.user.is_authenticated and self.request.user != user:
-            context['is_following'] = Follow.objects.filter(
-                follower=self.request.user, following=user
-            ).exists()
+            context['is_following'] = user.pk in viewer.for_request(self.request).following
         
         # Получаем игры пользователя
         if user.is_developer:
@@ -115,7 +115,8 @@ class DeveloperProfileView(DetailView):
         
         context['developer_profile'] = get_object_or_404(DeveloperProfile, user=user)
         context['games'] = user.developed_games.filter(is_published=True)
-        context['total_downloads'] = sum(game.download_count for game in context['games'])
+        context['stats'] = DeveloperStats.for_user(user)
+        context['total_downloads'] = context['stats'].published_downloads
         
         return context
 
@@ -202,7 +203,7 @@ def developers_list(request):
     developers = User.objects.filter(
         is_developer=True,
         public_profile=True
-    ).select_related('developer_profile').order_by('-developer_profile__total_downloads')
+    ).select_related('developer_profile', 'developer_stats').order_by('-developer_stats__published_downloads')
     
     # Фильтрация
     verified_only = request.GET.get('verified') == 'true'
@@ -1,21 +1,86 @@
 # Контекстные процессоры
+#
+# Значения, требующие запросов, передаются ленивыми объектами и вычисляются,
+# только если шаблон к ним обращается. Меню жанров кешируется в процессе;
+# изменение жанров меняет версию в кеше Django. Если кеш общий (Redis,
+# Memcached), процессы замечают новую версию не позже чем через
+# GENRES_MENU_CHECK_INTERVAL секунд; с LocMemCache версию видит только
+# процесс, изменивший жанры, а остальные перечитывают меню по возрасту —
+# раз в GENRES_MENU_MAX_AGE секунд.
+#
+# Число непрочитанных уведомлений берется из счетчика пользователя
+# (social/notifications.py), списки желаний, подписок и лайков — из
+# core/viewer.py. shared_page — признак рендера страницы в общий кеш
+# (core/page_cache.py).
+import threading
+import time
+
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
 from games.models import Genre
-from social.models import Notification
+from social import push
+from . import viewer
+
+
+GENRES_MENU_SIZE = 10
+GENRES_MENU_CHECK_INTERVAL = 5
+GENRES_MENU_MAX_AGE = 60
+GENRES_MENU_VERSION_KEY = 'genres-menu:version'
+
+_genres_menu = {'genres': None, 'version': None, 'checked': 0.0, 'loaded': 0.0}
+_genres_menu_lock = threading.Lock()
+
+
+def invalidate_genres_menu():
+    """
+    Сбрасывает меню жанров в текущем процессе и меняет версию в кеше
+    (остальные процессы увидят ее только при общем кеше)
+    """
+    try:
+        cache.incr(GENRES_MENU_VERSION_KEY)
+    except ValueError:
+        cache.set(GENRES_MENU_VERSION_KEY, 1, None)
+    _genres_menu['checked'] = 0.0
+
+
+def genres_menu():
+    """Жанры для меню (кешируются в процессе)"""
+    now = time.monotonic()
+    if _genres_menu['genres'] is not None and now - _genres_menu['checked'] < GENRES_MENU_CHECK_INTERVAL:
+        return _genres_menu['genres']
+    with _genres_menu_lock:
+        # Версию читаем до запроса: изменение во время запроса не потеряется
+        version = cache.get(GENRES_MENU_VERSION_KEY, 0)
+        if (
+            _genres_menu['genres'] is None
+            or version != _genres_menu['version']
+            or now - _genres_menu['loaded'] >= GENRES_MENU_MAX_AGE
+        ):
+            _genres_menu['genres'] = list(Genre.objects.all()[:GENRES_MENU_SIZE])
+            _genres_menu['version'] = version
+            _genres_menu['loaded'] = now
+        _genres_menu['checked'] = now
+    return _genres_menu['genres']
+
+
+def _unread_notifications(request):
+    user = request.user
+    return user.unread_notifications_count if user.is_authenticated else 0
 
 
 def platform_context(request):
     """Глобальный контекст платформы"""
-    context = {
+    return {
         'platform_name': 'IndieGameHub',
         'platform_tagline': 'Платформа для инди-разработчиков',
-        'genres_menu': Genre.objects.all()[:10],
+        'genres_menu': SimpleLazyObject(genres_menu),
+        # Уведомления для аутентифицированных пользователей
+        'unread_notifications': SimpleLazyObject(lambda: _unread_notifications(request)),
+        # Списки желаний, подписок и лайков текущего пользователя
+        'viewer': SimpleLazyObject(lambda: viewer.for_request(request)),
+        # Поток уведомлений (SSE) доступен только под ASGI (social/push.py)
+        'notifications_push': push.enabled(),
+        # Страница рендерится в общий кеш (core/page_cache.py)
+        'shared_page': getattr(request, 'shared_page', False),
     }
-    
-    # Уведомления для аутентифицированных пользователей
-    if request.user.is_authenticated:
-        context['unread_notifications'] = Notification.objects.filter(
-            recipient=request.user,
-            is_read=False
-        ).count()
-    
-    return context
@@ -0,0 +1,301 @@
+# Отложенная запись счетчиков (write-behind)
+#
+# Инкременты view_count/download_count копятся в буфере (в памяти процесса
+# или в Redis) и периодически сбрасываются в БД пачкой UPDATE ... SET
+# field = field + N — по одному запросу на (модель, поле, приращение).
+#
+# Настройки (settings.COUNTERS):
+#   BACKEND        — 'local' (буфер процесса) или 'redis' (общий буфер)
+#   FLUSH_INTERVAL — период сброса в секундах; 0 — писать сразу
+#   REDIS_URL      — адрес Redis для BACKEND='redis'
+#   KEY_PREFIX     — префикс ключей в Redis
+#   ORPHAN_AFTER   — через сколько секунд хеш незавершенного сброса в Redis
+#                    считается брошенным (процесс упал посреди сброса)
+#
+# Команда flush_counters имеет смысл только с BACKEND='redis': локальный
+# буфер принадлежит процессу сайта, и другой процесс его не видит. Она же
+# возвращает в буфер инкременты брошенных сбросов.
+#
+# После записи приращения в БД отправляется сигнал counter_applied (в той же
+# транзакции) — по нему обновляются зависящие от счетчиков сводки.
+
+import atexit
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.dispatch import Signal
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'BACKEND': 'local',
+    'FLUSH_INTERVAL': 10,
+    'REDIS_URL': 'redis://localhost:6379/0',
+    'KEY_PREFIX': 'counters',
+    'ORPHAN_AFTER': 10 * 60,
+}
+
+UPDATE_BATCH_SIZE = 500
+
+# sender — модель, pks — id объектов, field — поле, amount — приращение каждого
+counter_applied = Signal()
+
+
+def _setting(name):
+    return getattr(settings, 'COUNTERS', {}).get(name, DEFAULTS[name])
+
+
+def _key(instance, field):
+    return f'{instance._meta.label_lower}:{instance.pk}:{field}'
+
+
+def _parse_key(key):
+    label, pk, field = key.rsplit(':', 2)
+    return apps.get_model(label), pk, field
+
+
+class LocalCounterBuffer:
+    """Буфер в памяти процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._inflight = {}
+
+    def add(self, key, amount):
+        with self._lock:
+            self._pending[key] += amount
+
+    def get(self, keys):
+        with self._lock:
+            return {key: self._pending.get(key, 0) + self._inflight.get(key, 0) for key in keys}
+
+    def take(self):
+        with self._lock:
+            self._inflight, self._pending = dict(self._pending), defaultdict(int)
+            return self._inflight
+
+    def done(self):
+        with self._lock:
+            self._inflight = {}
+
+    def restore(self, pending):
+        with self._lock:
+            for key, amount in pending.items():
+                self._pending[key] += amount
+            self._inflight = {}
+
+    def recover(self):
+        return 0
+
+
+class RedisCounterBuffer:
+    """Общий буфер в Redis (HINCRBY), сбрасывать может любой процесс"""
+
+    def __init__(self):
+        import redis
+
+        self._redis = redis.Redis.from_url(_setting('REDIS_URL'))
+        self._response_error = redis.ResponseError
+        self._hash = f"{_setting('KEY_PREFIX')}:pending"
+        self._flushing = None
+
+    def add(self, key, amount):
+        self._redis.hincrby(self._hash, key, amount)
+
+    def get(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._redis.hmget(self._hash, keys)
+        return {key: int(value or 0) for key, value in zip(keys, values)}
+
+    def _flushing_key(self):
+        # Время в имени ключа позволяет найти сбросы, брошенные упавшим процессом
+        return f"{_setting('KEY_PREFIX')}:flushing:{int(time.time())}:{uuid.uuid4().hex}"
+
+    def take(self):
+        # RENAME атомарен: инкременты, пришедшие после него, попадут в новый хеш
+        flushing = self._flushing_key()
+        try:
+            self._redis.rename(self._hash, flushing)
+        except self._response_error:
+            return {}
+        self._flushing = flushing
+        return {key.decode(): int(value) for key, value in self._redis.hgetall(flushing).items()}
+
+    def done(self):
+        if self._flushing:
+            self._redis.delete(self._flushing)
+            self._flushing = None
+
+    def restore(self, pending):
+        pipe = self._redis.pipeline()
+        for key, amount in pending.items():
+            pipe.hincrby(self._hash, key, amount)
+        if self._flushing:
+            pipe.delete(self._flushing)
+        pipe.execute()
+        self._flushing = None
+
+    def recover(self):
+        """Возвращает в буфер хеши сбросов старше ORPHAN_AFTER, возвращает их количество"""
+        cutoff = time.time() - _setting('ORPHAN_AFTER')
+        recovered = 0
+        for name in self._redis.scan_iter(match=f"{_setting('KEY_PREFIX')}:flushing:*"):
+            name = name.decode()
+            try:
+                started = int(name.rsplit(':', 2)[-2])
+            except ValueError:
+                # Ключ старого формата (без времени)
+                started = 0
+            if started > cutoff:
+                continue
+            # Забираем хеш себе: если его уже забрал другой процесс, RENAME не найдет ключ.
+            # При сбое после RENAME хеш снова станет брошенным и будет подобран позже
+            claimed = self._flushing_key()
+            try:
+                self._redis.rename(name, claimed)
+            except self._response_error:
+                continue
+            values = self._redis.hgetall(claimed)
+            pipe = self._redis.pipeline(transaction=True)
+            for key, amount in values.items():
+                pipe.hincrby(self._hash, key, int(amount))
+            pipe.delete(claimed)
+            pipe.execute()
+            recovered += 1
+        return recovered
+
+
+BACKENDS = {
+    'local': LocalCounterBuffer,
+    'redis': RedisCounterBuffer,
+}
+
+_buffer = None
+_buffer_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_flusher = None
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = BACKENDS[_setting('BACKEND')]()
+    return _buffer
+
+
+def _apply(pending):
+    groups = defaultdict(list)
+    for key, amount in pending.items():
+        if amount:
+            model, pk, field = _parse_key(key)
+            groups[(model, field, amount)].append(pk)
+
+    with transaction.atomic():
+        for (model, field, amount), pks in groups.items():
+            for start in range(0, len(pks), UPDATE_BATCH_SIZE):
+                batch = pks[start:start + UPDATE_BATCH_SIZE]
+                model.objects.filter(pk__in=batch).update(**{field: F(field) + amount})
+                counter_applied.send(sender=model, pks=batch, field=field, amount=amount)
+
+
+def is_shared():
+    """Буфер общий для всех процессов (его может сбросить любой процесс)"""
+    return _setting('BACKEND') == 'redis'
+
+
+def recover():
+    """Возвращает в буфер инкременты сбросов, брошенных упавшими процессами"""
+    return get_buffer().recover()
+
+
+def flush():
+    """Сбрасывает накопленные инкременты в БД, возвращает их сумму"""
+    buffer = get_buffer()
+    with _flush_lock:
+        pending = buffer.take()
+        if not pending:
+            return 0
+        try:
+            _apply(pending)
+        except Exception:
+            # Ничего не теряем: возвращаем инкременты в буфер до следующей попытки
+            buffer.restore(pending)
+            raise
+        buffer.done()
+    return sum(pending.values())
+
+
+def _flush_loop(interval):
+    while True:
+        time.sleep(interval)
+        close_old_connections()
+        try:
+            flush()
+        except Exception:
+            logger.exception('Не удалось сбросить счетчики в БД')
+
+
+def _flush_on_exit():
+    try:
+        flush()
+    except Exception:
+        logger.exception('Не удалось сбросить счетчики при остановке процесса')
+
+
+def _ensure_flusher():
+    global _flusher
+    if _flusher is not None:
+        return
+    with _buffer_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(
+                target=_flush_loop, args=(_setting('FLUSH_INTERVAL'),),
+                name='counters-flush', daemon=True
+            )
+            _flusher.start()
+            atexit.register(_flush_on_exit)
+
+
+# --- Публичный API ---
+
+def increment(instance, field, amount=1):
+    """Увеличивает счетчик field объекта instance без немедленной записи в БД"""
+    if not _setting('FLUSH_INTERVAL'):
+        with transaction.atomic():
+            type(instance).objects.filter(pk=instance.pk).update(**{field: F(field) + amount})
+            counter_applied.send(sender=type(instance), pks=[instance.pk], field=field, amount=amount)
+        return
+    get_buffer().add(_key(instance, field), amount)
+    _ensure_flusher()
+
+
+def pending(instance, field):
+    """Инкременты field, еще не записанные в БД"""
+    return get_buffer().get([_key(instance, field)])[_key(instance, field)]
+
+
+def apply_pending(instances, *fields):
+    """
+    Добавляет к значениям полей объектов еще не записанные инкременты
+    (одним обращением к буферу), возвращает те же объекты.
+    """
+    instances = list(instances)
+    keys = [_key(instance, field) for instance in instances for field in fields]
+    values = get_buffer().get(keys) if keys else {}
+    for instance in instances:
+        for field in fields:
+            setattr(instance, field, getattr(instance, field) + values[_key(instance, field)])
+    return instances
@@ -0,0 +1,65 @@
+# Построение копий изображений в отдельном процессе (см. core/images.py)
+#
+# Модуль не импортирует Django, чтобы дочерние процессы пула стартовали
+# быстро и не требовали настройки проекта.
+
+import os
+import uuid
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+FORMATS = {
+    'webp': 'WEBP',
+    'jpg': 'JPEG',
+}
+
+
+def _flatten(img):
+    """RGB для JPEG: прозрачность заменяется белым фоном"""
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB')
+
+
+def _save_atomic(img, path, ext, quality):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    if ext == 'webp':
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+        img.save(tmp_path, FORMATS[ext], quality=quality[ext], method=4)
+    else:
+        _flatten(img).save(tmp_path, FORMATS[ext], quality=quality[ext], optimize=True, progressive=True)
+    os.replace(tmp_path, path)
+
+
+def render_variants(source, targets, quality):
+    """
+    Копии изображения source: targets — [(ширина, {расширение: путь})] по
+    возрастанию ширины, quality — {расширение: качество}. Копий крупнее
+    оригинала не делается. Возвращает список построенных ширин (пустой,
+    если изображение не открылось).
+    """
+    try:
+        with Image.open(source) as f:
+            # Поворот по EXIF применяем к пикселям — сами метаданные в копии не попадают
+            original = ImageOps.exif_transpose(f)
+            original.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError):
+        return []
+
+    widths = []
+    for width, paths in targets:
+        size = min(width, original.width)
+        height = max(1, round(original.height * size / original.width))
+        resized = original.resize((size, height), Image.LANCZOS) if size != original.width else original
+        for ext, path in paths.items():
+            _save_atomic(resized, path, ext, quality)
+        widths.append(width)
+        if width >= original.width:
+            break
+    return widths
@@ -0,0 +1,172 @@
+# Уменьшенные копии изображений (обложки, баннеры, скриншоты)
+#
+# Для каждого загруженного изображения рядом с оригиналом сохраняются копии
+# нескольких ширин в WebP и JPEG без метаданных:
+#   games/covers/cover.png -> games/covers/cover.png.w320.webp, games/covers/cover.png.w320.jpg, ...
+# Копий крупнее оригинала не делается: последняя копия может быть уже своей
+# номинальной ширины (это сам оригинал, пережатый без метаданных).
+# Шаблонный тег {% responsive_image %} (core/templatetags/images.py) выводит
+# их через <picture> и srcset, так что браузер скачивает копию под размер
+# карточки, а не оригинал. Для изображений без копий выводится оригинал.
+#
+# Копии строятся после коммита в пуле процессов (process()), общем с
+# аватарами (accounts/avatars.py): запрос загрузки не ждет декодирования и
+# перекодирования. Команда generate_image_variants строит их сразу.
+#
+# Список готовых ширин кешируется на CACHE_TIMEOUT. Пустой список — копии еще
+# строятся или кеш процесса не узнал о них (LocMemCache) — хранится только
+# EMPTY_CACHE_TIMEOUT секунд, чтобы страницы не отдавали оригинал сутки.
+#
+# Настройки (settings.IMAGE_VARIANTS):
+#   ASYNC        — False: строить копии сразу в текущем процессе
+#   WORKERS      — число процессов пула обработки изображений
+#   WIDTHS       — ширины копий, px
+#   WEBP_QUALITY — качество WebP
+#   JPEG_QUALITY — качество JPEG
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connections
+
+from .image_worker import FORMATS, render_variants
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ASYNC': True,
+    'WORKERS': 2,
+    'WIDTHS': (160, 320, 640, 1280),
+    'WEBP_QUALITY': 80,
+    'JPEG_QUALITY': 82,
+}
+
+CACHE_TIMEOUT = 24 * 60 * 60
+EMPTY_CACHE_TIMEOUT = 30
+
+
+def _setting(name):
+    return getattr(settings, 'IMAGE_VARIANTS', {}).get(name, DEFAULTS[name])
+
+
+def variant_name(name, width, ext):
+    # Расширение оригинала сохраняется в имени: cover.png и cover.jpg не пересекутся
+    return f'{name}.w{width}.{ext}'
+
+
+def variant_url(name, width, ext):
+    return default_storage.url(variant_name(name, width, ext))
+
+
+def _cache_key(name):
+    return f'image-variants:{name}'
+
+
+def _scan(name):
+    """Ширины копий, которые есть в хранилище"""
+    return [
+        width for width in _setting('WIDTHS')
+        if all(default_storage.exists(variant_name(name, width, ext)) for ext in FORMATS)
+    ]
+
+
+def _remember(name, widths):
+    cache.set(_cache_key(name), widths, CACHE_TIMEOUT if widths else EMPTY_CACHE_TIMEOUT)
+
+
+def available_widths(name):
+    """Ширины готовых копий изображения (результат кешируется)"""
+    if not name:
+        return []
+    widths = cache.get(_cache_key(name))
+    if widths is None:
+        widths = _scan(name)
+        _remember(name, widths)
+    return widths
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Пул процессов обработки изображений (копии обложек, скриншотов, аватаров)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn, а не fork: в процессе уже работают фоновые потоки
+                # (счетчики, журнал скачиваний)
+                _executor = ProcessPoolExecutor(
+                    max_workers=_setting('WORKERS'),
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+    return _executor
+
+
+def _render_args(name):
+    targets = [
+        (width, {ext: default_storage.path(variant_name(name, width, ext)) for ext in FORMATS})
+        for width in _setting('WIDTHS')
+    ]
+    quality = {'webp': _setting('WEBP_QUALITY'), 'jpg': _setting('JPEG_QUALITY')}
+    return default_storage.path(name), targets, quality
+
+
+def _done(name, widths):
+    if not widths:
+        logger.warning('Не удалось открыть изображение %s', name)
+        return []
+    _remember(name, widths)
+    return widths
+
+
+def _on_done(name, future):
+    try:
+        _done(name, future.result())
+    except Exception:
+        logger.exception('Не удалось построить копии изображения %s', name)
+    finally:
+        # Колбэк выполняется в служебном потоке пула — не держим его соединение с БД
+        connections.close_all()
+
+
+def generate_variants(name):
+    """
+    Создает копии изображения name всех ширин (не больше оригинала) в
+    текущем процессе, возвращает список ширин.
+    """
+    return _done(name, render_variants(*_render_args(name)))
+
+
+def process(name):
+    """Строит копии изображения name в пуле процессов (или сразу, если ASYNC выключен)"""
+    if not _setting('ASYNC'):
+        generate_variants(name)
+        return
+    future = get_executor().submit(render_variants, *_render_args(name))
+    future.add_done_callback(lambda future: _on_done(name, future))
+
+
+def delete_variants(name):
+    if not name:
+        return
+    # Не по кешу: копии могли появиться после того, как его заполнили
+    for width in _setting('WIDTHS'):
+        for ext in FORMATS:
+            default_storage.delete(variant_name(name, width, ext))
+    cache.delete(_cache_key(name))
+
+
+def srcset(name, ext):
+    """Значение атрибута srcset для копий формата ext"""
+    return ', '.join(
+        f'{variant_url(name, width, ext)} {width}w'
+        for width in available_widths(name)
+    )
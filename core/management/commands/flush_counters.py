@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Сбрасывает накопленные счетчики просмотров и скачиваний в БД '
+        '(только для COUNTERS["BACKEND"] = "redis")'
+    )
+
+    def handle(self, *args, **options):
+        if not counters.is_shared():
+            # Локальный буфер живет в процессе сайта — у команды он всегда пуст
+            raise CommandError(
+                'Буфер счетчиков локальный (COUNTERS["BACKEND"] = "local"): его сбрасывают '
+                'сами процессы сайта. Команда работает только с BACKEND = "redis".'
+            )
+        recovered = counters.recover()
+        total = counters.flush()
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано инкрементов: {total} (возвращено брошенных сбросов: {recovered})'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает статистику платформы и разработчиков по исходным таблицам'
+
+    def handle(self, *args, **options):
+        fixed = stats.reconcile()
+        self.stdout.write(self.style.SUCCESS(f'Статистика пересчитана, исправлено разработчиков: {fixed}'))
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_stats(apps, schema_editor):
+    from core import stats
+
+    stats.reconcile(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0002_user_avatar_placeholder'),
+        ('games', '0011_trending'),
+        ('social', '0002_populate_game_ratings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeveloperStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='developer_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('published_games', models.PositiveIntegerField(default=0, verbose_name='Опубликованных игр')),
+                ('draft_games', models.PositiveIntegerField(default=0, verbose_name='Черновиков')),
+                ('downloads', models.PositiveBigIntegerField(default=0, verbose_name='Скачиваний всех игр')),
+                ('published_downloads', models.PositiveBigIntegerField(db_index=True, default=0, verbose_name='Скачиваний опубликованных игр')),
+            ],
+            options={
+                'verbose_name': 'Статистика разработчика',
+                'verbose_name_plural': 'Статистика разработчиков',
+            },
+        ),
+        migrations.CreateModel(
+            name='PlatformStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_games', models.PositiveIntegerField(default=0, verbose_name='Опубликованных игр')),
+                ('total_developers', models.PositiveIntegerField(default=0, verbose_name='Разработчиков')),
+                ('total_downloads', models.PositiveBigIntegerField(default=0, verbose_name='Скачиваний опубликованных игр')),
+                ('total_reviews', models.PositiveIntegerField(default=0, verbose_name='Публичных отзывов')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Статистика платформы',
+                'verbose_name_plural': 'Статистика платформы',
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
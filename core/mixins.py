@@ -0,0 +1,18 @@
+# Общие примеси моделей
+
+
+class CounterFieldsMixin:
+    """
+    Поля COUNTER_FIELDS меняются запросами в БД (приращения F(), фоновые
+    пересчеты): обычное сохранение объекта не должно перезаписывать их
+    значением, загруженным раньше. Явный update_fields не меняется.
+    """
+    COUNTER_FIELDS = ()
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
@@ -0,0 +1,45 @@
+from django.db import models
+
+from accounts.models import User
+
+
+class PlatformStats(models.Model):
+    """Сводная статистика платформы (одна строка, поддерживается core/stats.py)"""
+    total_games = models.PositiveIntegerField('Опубликованных игр', default=0)
+    total_developers = models.PositiveIntegerField('Разработчиков', default=0)
+    total_downloads = models.PositiveBigIntegerField('Скачиваний опубликованных игр', default=0)
+    total_reviews = models.PositiveIntegerField('Публичных отзывов', default=0)
+    
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Статистика платформы'
+        verbose_name_plural = 'Статистика платформы'
+    
+    def __str__(self):
+        return f"Игр: {self.total_games}, скачиваний: {self.total_downloads}"
+    
+    @classmethod
+    def load(cls):
+        return cls.objects.get_or_create(pk=1)[0]
+
+
+class DeveloperStats(models.Model):
+    """Сводная статистика разработчика (поддерживается core/stats.py)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='developer_stats')
+    published_games = models.PositiveIntegerField('Опубликованных игр', default=0)
+    draft_games = models.PositiveIntegerField('Черновиков', default=0)
+    downloads = models.PositiveBigIntegerField('Скачиваний всех игр', default=0)
+    published_downloads = models.PositiveBigIntegerField('Скачиваний опубликованных игр', default=0, db_index=True)
+    
+    class Meta:
+        verbose_name = 'Статистика разработчика'
+        verbose_name_plural = 'Статистика разработчиков'
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.published_games} игр, {self.published_downloads} скачиваний"
+    
+    @classmethod
+    def for_user(cls, user):
+        """Статистика пользователя; если ее еще нет — нулевая (не сохраняется)"""
+        return cls.objects.filter(user=user).first() or cls(user=user)
@@ -0,0 +1,117 @@
+# Общий кеш страниц с персонализацией на клиенте
+#
+# Главная, каталог и страница игры одинаковы для всех посетителей, кроме
+# нескольких мест: меню пользователя, число непрочитанных уведомлений,
+# отметки списка желаний, персональные рекомендации. Такие страницы
+# (SharedPageMixin) рендерятся как для анонимного посетителя и кешируются
+# целиком по URL — одна копия на всех, в том числе вошедших пользователей.
+# Персональные места в шаблонах размечены атрибутами data-viewer*, их
+# заполняет скрипт base.html по ответу /viewer.json (core/views.py) — один
+# небольшой запрос с состоянием пользователя (core/viewer.py) вместо
+# рендера всей страницы.
+#
+# При рендере для кеша в контексте есть shared_page=True: шаблон выводит
+# варианты для гостя и для вошедшего пользователя, скрипт оставляет нужный.
+# Страница не кешируется и рендерится как обычно, если у запроса есть
+# ожидающие сообщения (messages) или ответ не 200.
+#
+# Изменения игр, файлов, отзывов и жанров после коммита меняют версию кеша
+# (core/signals.py); остальное (счетчики, статистика) устаревает не дольше
+# чем на TIMEOUT секунд. Версия и страницы лежат в кеше Django, поэтому
+# сброс сразу виден всем процессам только при общем кеше (Redis, Memcached;
+# settings_production включает RedisCache по переменной REDIS_URL). С
+# LocMemCache у каждого процесса свои копии страниц и своя версия: процесс,
+# обработавший изменение, сбрасывает только свои, остальные отдают старую
+# страницу до TIMEOUT секунд.
+#
+# Настройки (settings.PAGE_CACHE):
+#   ENABLED — False: страницы рендерятся для каждого запроса
+#   TIMEOUT — сколько секунд страница хранится в кеше
+
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'TIMEOUT': 60,
+}
+
+VERSION_KEY = 'page-cache:version'
+
+
+def _setting(name):
+    return getattr(settings, 'PAGE_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def invalidate():
+    """Сбрасывает все закешированные страницы"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def _key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{cache.get(VERSION_KEY, 0)}:{path}'
+
+
+def _has_messages(request):
+    storage = getattr(request, '_messages', None)
+    return storage is not None and len(storage) > 0
+
+
+def cacheable(request):
+    return _setting('ENABLED') and request.method in ('GET', 'HEAD') and not _has_messages(request)
+
+
+class SharedPageMixin:
+    """
+    Представление, страница которого кешируется одна на всех посетителей.
+    Все, что зависит от пользователя, шаблон размечает для /viewer.json.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        # Версию читаем до рендера: изменение во время рендера не потеряется
+        key = _key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            self.shared_page_hit(entry['meta'])
+            response = HttpResponse(entry['content'], content_type=entry['content_type'])
+            response['X-Page-Cache'] = 'hit'
+            return response
+
+        user = request.user
+        request.user = AnonymousUser()
+        request.shared_page = True
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+        finally:
+            request.user = user
+            request.shared_page = False
+
+        if response.status_code == 200 and not response.streaming:
+            cache.set(key, {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'meta': self.shared_page_meta(),
+            }, _setting('TIMEOUT'))
+            response['X-Page-Cache'] = 'miss'
+        return response
+
+    def shared_page_meta(self):
+        """Данные, сохраняемые вместе со страницей (передаются в shared_page_hit)"""
+        return {}
+
+    def shared_page_hit(self, meta):
+        """Вызывается, когда страница отдана из кеша без выполнения представления"""
@@ -0,0 +1,188 @@
+# Keyset (курсорная) пагинация
+#
+# Вместо OFFSET страница выбирается условием по ключу сортировки последней
+# показанной записи, поэтому 500-я страница стоит столько же, сколько первая,
+# а COUNT(*) не выполняется вовсе (общее количество — по запросу и примерно).
+
+import base64
+import binascii
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+
+
+APPROXIMATE_COUNT_TIMEOUT = 300
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPage:
+    """Страница keyset-пагинации (интерфейс близок к django.core.paginator.Page)"""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None, total=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Пагинатор по ключу сортировки.
+
+    ordering — кортеж полей, последнее из которых должно быть уникальным
+    (обычно 'id'/'-id'), например ('-created_at', '-id').
+    """
+
+    def __init__(self, queryset, ordering, per_page, with_total=False):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.with_total = with_total
+
+    @property
+    def signature(self):
+        return hashlib.md5(','.join(self.ordering).encode()).hexdigest()[:8]
+
+    def encode_cursor(self, direction, obj):
+        values = [_encode_value(getattr(obj, field.lstrip('-'))) for field in self.ordering]
+        payload = json.dumps([self.signature, direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            signature, direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError, binascii.Error):
+            raise InvalidCursor(cursor)
+        if signature != self.signature or direction not in ('n', 'p') or len(values) != len(self.ordering):
+            raise InvalidCursor(cursor)
+        return direction, [self._to_python(field, value) for field, value in zip(self.ordering, values)]
+
+    def _to_python(self, field, value):
+        name = field.lstrip('-')
+        try:
+            model_field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Аннотация (например, search_rank)
+            return value
+        try:
+            return model_field.to_python(value)
+        except ValidationError:
+            raise InvalidCursor(value)
+
+    def _seek(self, values, forward):
+        """Условие «строго после» (или «строго до») ключа values"""
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            descending = field.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[i]})
+            for prev_field, prev_value in zip(self.ordering[:i], values[:i]):
+                step &= Q(**{prev_field.lstrip('-'): prev_value})
+            condition |= step
+        return condition
+
+    def _reversed_ordering(self):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering)
+
+    def page(self, cursor=None):
+        direction, values = 'n', None
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                direction, values = 'n', None
+
+        forward = direction == 'n'
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward))
+        queryset = queryset.order_by(*(self.ordering if forward else self._reversed_ordering()))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        if not forward and not has_more:
+            # Назад дошли до начала: вместо неполной страницы — первая целиком
+            return self.page()
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        if forward:
+            has_next, has_previous = has_more, values is not None
+        else:
+            has_next, has_previous = True, has_more
+
+        return KeysetPage(
+            rows,
+            self,
+            next_cursor=self.encode_cursor('n', rows[-1]) if rows and has_next else None,
+            previous_cursor=self.encode_cursor('p', rows[0]) if rows and has_previous else None,
+            total=approximate_count(self.queryset) if self.with_total else None,
+        )
+
+
+def approximate_count(queryset):
+    """
+    Примерное количество строк.
+
+    На PostgreSQL берется оценка планировщика (EXPLAIN), на остальных СУБД —
+    точный COUNT, закешированный на несколько минут.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    key = 'approximate_count:' + hashlib.md5(str(queryset.order_by().query).encode()).hexdigest()
+    return cache.get_or_set(key, queryset.count, APPROXIMATE_COUNT_TIMEOUT)
+
+
+def cursor_query_string(request, param='cursor'):
+    """GET-параметры текущего запроса без курсора (для ссылок «Назад/Далее»)"""
+    query = request.GET.copy()
+    for name in (param, 'page'):
+        query.pop(name, None)
+    return query.urlencode()
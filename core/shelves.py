@@ -0,0 +1,145 @@
+# Кеш полок главной страницы
+#
+# Полка (новые, популярные, рекомендуемые игры, жанры) хранится в кеше как
+# список id с «мягким» сроком SOFT_TTL; сама запись живет HARD_TTL. Когда
+# мягкий срок истек, запись пересобирает ровно один процесс — тот, кто взял
+# блокировку cache.add (single-flight); остальные в это время отдают
+# устаревший список. Если записи нет совсем (холодный кеш), остальные ждут
+# сборщика до WAIT секунд и только потом строят полку сами, не сохраняя ее.
+# Так одновременное истечение полок при всплеске трафика не превращается в
+# лавину одинаковых запросов к БД.
+#
+# Изменения игр, жанров и популярности помечают полки устаревшими
+# (invalidate, сигналы в core/signals.py) — они пересобираются при
+# следующем запросе, а до того отдается прежний список.
+#
+# Игры всех полок загружаются одним запросом по объединению id (hydrate).
+#
+# Настройки (settings.SHELVES):
+#   SOFT_TTL     — через сколько секунд полка пересобирается
+#   HARD_TTL     — сколько секунд хранится устаревшая полка
+#   LOCK_TIMEOUT — на сколько секунд берется блокировка пересборки
+#   WAIT         — сколько секунд ждать сборщика при холодном кеше
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+
+DEFAULTS = {
+    'SOFT_TTL': 60,
+    'HARD_TTL': 60 * 60,
+    'LOCK_TIMEOUT': 30,
+    'WAIT': 0.5,
+}
+
+POLL_INTERVAL = 0.05
+
+
+def _setting(name):
+    return getattr(settings, 'SHELVES', {}).get(name, DEFAULTS[name])
+
+
+def _published_games():
+    from games.models import Game
+
+    return Game.objects.filter(is_published=True)
+
+
+def _genres():
+    from games.models import Genre
+
+    rows = (
+        Genre.objects.annotate(games_count=Count('games', filter=Q(games__is_published=True)))
+        .filter(games_count__gt=0)
+        .order_by('-games_count')
+        .values_list('pk', 'games_count')[:8]
+    )
+    return [list(row) for row in rows]
+
+
+# Полка: функция, возвращающая список id (для жанров — пары [id, число игр])
+SHELVES = {
+    'featured': lambda: list(_published_games().filter(featured=True).values_list('pk', flat=True)[:6]),
+    'new': lambda: list(_published_games().order_by('-created_at').values_list('pk', flat=True)[:8]),
+    'popular': lambda: list(_published_games().order_by('-trending_score', '-id').values_list('pk', flat=True)[:8]),
+    'genres': _genres,
+}
+
+
+def _key(name):
+    return f'shelf:{name}'
+
+
+def _lock_key(name):
+    return f'shelf-lock:{name}'
+
+
+def _rebuild(name):
+    value = SHELVES[name]()
+    cache.set(_key(name), {'value': value, 'expires': time.time() + _setting('SOFT_TTL')}, _setting('HARD_TTL'))
+    return value
+
+
+def _rebuild_locked(name):
+    try:
+        return _rebuild(name)
+    finally:
+        cache.delete(_lock_key(name))
+
+
+def get(name):
+    """Содержимое полки name (список id)"""
+    entry = cache.get(_key(name))
+    if entry is not None:
+        if entry['expires'] > time.time():
+            return entry['value']
+        if cache.add(_lock_key(name), 1, _setting('LOCK_TIMEOUT')):
+            return _rebuild_locked(name)
+        return entry['value']
+
+    if cache.add(_lock_key(name), 1, _setting('LOCK_TIMEOUT')):
+        return _rebuild_locked(name)
+    deadline = time.monotonic() + _setting('WAIT')
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(_key(name))
+        if entry is not None:
+            return entry['value']
+    return SHELVES[name]()
+
+
+def invalidate(*names):
+    """Помечает полки устаревшими: пересборка при следующем запросе, до нее — прежний список"""
+    for name in names or SHELVES:
+        entry = cache.get(_key(name))
+        if entry is not None:
+            entry['expires'] = 0
+            cache.set(_key(name), entry, _setting('HARD_TTL'))
+
+
+def hydrate(shelves):
+    """
+    {полка: список id} -> {полка: список опубликованных игр в том же порядке},
+    одним запросом на все полки.
+    """
+    ids = {pk for value in shelves.values() for pk in value}
+    games = _published_games().select_related('developer').in_bulk(ids)
+    return {name: [games[pk] for pk in value if pk in games] for name, value in shelves.items()}
+
+
+def genres():
+    """Жанры полки «Популярные жанры» с числом игр (games_count)"""
+    from games.models import Genre
+
+    rows = get('genres')
+    by_id = Genre.objects.in_bulk([pk for pk, _ in rows])
+    result = []
+    for pk, games_count in rows:
+        genre = by_id.get(pk)
+        if genre is not None:
+            genre.games_count = games_count
+            result.append(genre)
+    return result
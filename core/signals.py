@@ -0,0 +1,162 @@
+# Сигналы приложения core: сводная статистика (core/stats.py), полки главной (core/shelves.py)
+# и общий кеш страниц (core/page_cache.py)
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from accounts.models import User
+from games.models import Game, GameFile, GameImage, Genre
+from social.models import Review
+from . import page_cache, shelves, stats
+from .context_processors import invalidate_genres_menu
+from .counters import counter_applied
+
+
+def _game_contribution(developer_id, is_published, download_count):
+    return (developer_id, is_published, 1, download_count)
+
+
+def _negate(contribution):
+    developer_id, is_published, games, downloads = contribution
+    return (developer_id, is_published, -games, -downloads)
+
+
+@receiver(pre_save, sender=Game)
+def remember_game_stats(sender, instance, raw=False, **kwargs):
+    instance._previous_stats = None
+    if raw or not instance.pk:
+        return
+    previous = Game.objects.filter(pk=instance.pk).values_list(
+        'developer_id', 'is_published', 'download_count'
+    ).first()
+    if previous is not None:
+        instance._previous_stats = _game_contribution(*previous)
+
+
+@receiver(post_save, sender=Game)
+def update_game_stats(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_stats', None)
+    download_count = instance.download_count
+    if previous and update_fields is not None and 'download_count' not in update_fields:
+        # Счетчик не записывался (Game.COUNTER_FIELDS) — в БД осталось прежнее значение
+        download_count = previous[3]
+    current = _game_contribution(instance.developer_id, instance.is_published, download_count)
+    if previous == current:
+        return
+    changes = [current]
+    if previous:
+        changes.append(_negate(previous))
+    stats.apply_games(changes)
+
+
+@receiver(post_delete, sender=Game)
+def remove_game_stats(sender, instance, **kwargs):
+    stats.apply_games([
+        _negate(_game_contribution(instance.developer_id, instance.is_published, instance.download_count))
+    ])
+
+
+@receiver(counter_applied, sender=Game)
+def add_game_downloads(sender, pks, field, amount, **kwargs):
+    if field != 'download_count':
+        return
+    games = Game.objects.filter(pk__in=pks).values_list('developer_id', 'is_published')
+    stats.apply_games([(developer_id, is_published, 0, amount) for developer_id, is_published in games])
+
+
+@receiver(pre_save, sender=User)
+def remember_developer_flag(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._previous_is_developer = None
+    if raw or not instance.pk:
+        return
+    if update_fields is not None and 'is_developer' not in update_fields:
+        instance._previous_is_developer = instance.is_developer
+        return
+    instance._previous_is_developer = User.objects.filter(pk=instance.pk).values_list(
+        'is_developer', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=User)
+def update_developer_count(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = bool(getattr(instance, '_previous_is_developer', None))
+    if previous != instance.is_developer:
+        stats.update_platform(total_developers=1 if instance.is_developer else -1)
+
+
+@receiver(post_delete, sender=User)
+def remove_developer_count(sender, instance, **kwargs):
+    # Игры пользователя удаляются каскадом раньше — их вклад уже снят
+    if instance.is_developer:
+        stats.update_platform(total_developers=-1)
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_visibility(sender, instance, raw=False, **kwargs):
+    instance._previous_is_public = None
+    if raw or not instance.pk:
+        return
+    instance._previous_is_public = Review.objects.filter(pk=instance.pk).values_list(
+        'is_public', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=Review)
+def update_review_count(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = bool(getattr(instance, '_previous_is_public', None))
+    if previous != instance.is_public:
+        stats.update_platform(total_reviews=1 if instance.is_public else -1)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_count(sender, instance, **kwargs):
+    if instance.is_public:
+        stats.update_platform(total_reviews=-1)
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def invalidate_game_shelves(sender, **kwargs):
+    if kwargs.get('raw'):
+        return
+    transaction.on_commit(lambda: shelves.invalidate('featured', 'new', 'popular', 'genres'))
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(m2m_changed, sender=Game.genres.through)
+def invalidate_genre_shelf(sender, **kwargs):
+    if kwargs.get('raw') or kwargs.get('action', 'post_add') not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    transaction.on_commit(lambda: shelves.invalidate('genres'))
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genres_menu_on_change(sender, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(invalidate_genres_menu)
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+@receiver(post_save, sender=GameFile)
+@receiver(post_delete, sender=GameFile)
+@receiver(post_save, sender=GameImage)
+@receiver(post_delete, sender=GameImage)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(m2m_changed, sender=Game.genres.through)
+def invalidate_page_cache(sender, **kwargs):
+    if kwargs.get('raw') or kwargs.get('action', 'post_add') not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    transaction.on_commit(page_cache.invalidate)
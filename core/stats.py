@@ -0,0 +1,118 @@
+# Сводная статистика платформы и разработчиков
+#
+# Главная страница, «Мои игры» и профиль разработчика читают готовые итоги
+# из PlatformStats (одна строка) и DeveloperStats (строка на разработчика)
+# вместо суммирования download_count по всем играм в Python.
+#
+# Итоги меняются приращениями F() в транзакции изменения источника
+# (сигналы в core/signals.py):
+#   * сохранение/удаление Game — количество игр и их скачиваний
+#     (учитывается смена разработчика и публикации);
+#   * запись счетчика download_count (core.counters.counter_applied);
+#   * смена User.is_developer и удаление пользователя;
+#   * сохранение/удаление публичного Review.
+# Обновления, прошедшие мимо сигналов (queryset.update, правки в БД),
+# исправляет reconcile() — команда reconcile_stats по расписанию.
+
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+
+UPDATE_BATCH_SIZE = 500
+
+
+def _increment(queryset, deltas):
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return True
+    return bool(queryset.update(**{field: F(field) + delta for field, delta in deltas.items()}))
+
+
+def update_platform(**deltas):
+    """Прибавляет deltas (поле: приращение) к PlatformStats"""
+    from .models import PlatformStats
+
+    if not _increment(PlatformStats.objects.filter(pk=1), deltas):
+        # Строки еще нет (новая БД): создаем ее по фактическим данным
+        reconcile()
+
+
+def apply_games(changes):
+    """
+    Применяет изменения игр: changes — список
+    (developer_id, is_published, игр +1/-1/0, приращение скачиваний).
+    """
+    from .models import DeveloperStats
+
+    platform = defaultdict(int)
+    developers = defaultdict(lambda: defaultdict(int))
+    for developer_id, is_published, games, downloads in changes:
+        values = developers[developer_id]
+        values['published_games' if is_published else 'draft_games'] += games
+        values['downloads'] += downloads
+        if is_published:
+            values['published_downloads'] += downloads
+            platform['total_games'] += games
+            platform['total_downloads'] += downloads
+
+    with transaction.atomic(savepoint=False):
+        for developer_id, deltas in developers.items():
+            if _increment(DeveloperStats.objects.filter(user_id=developer_id), deltas):
+                continue
+            # Строка создается с первой игрой; без строки вычитать нечего
+            # (например, ее уже удалил каскад вместе с пользователем)
+            if deltas['published_games'] + deltas['draft_games'] > 0:
+                DeveloperStats.objects.create(user_id=developer_id, **deltas)
+        update_platform(**platform)
+
+
+def reconcile(apps=global_apps):
+    """
+    Пересчитывает всю статистику по исходным таблицам, возвращает
+    количество исправленных строк DeveloperStats.
+    """
+    Game = apps.get_model('games', 'Game')
+    User = apps.get_model('accounts', 'User')
+    Review = apps.get_model('social', 'Review')
+    PlatformStats = apps.get_model('core', 'PlatformStats')
+    DeveloperStats = apps.get_model('core', 'DeveloperStats')
+
+    published = Q(is_published=True)
+    fields = ['published_games', 'draft_games', 'downloads', 'published_downloads']
+
+    with transaction.atomic():
+        existing = {stats.user_id: stats for stats in DeveloperStats.objects.select_for_update()}
+        rows = Game.objects.values('developer_id').annotate(
+            published_games=Count('id', filter=published),
+            draft_games=Count('id', filter=~published),
+            downloads=Sum('download_count'),
+            published_downloads=Sum('download_count', filter=published),
+        )
+        actual = {row['developer_id']: {field: row[field] or 0 for field in fields} for row in rows}
+        developer_ids = set(actual) | set(User.objects.filter(is_developer=True).values_list('pk', flat=True))
+
+        empty = dict.fromkeys(fields, 0)
+        drifted, missing = [], []
+        for developer_id in developer_ids | set(existing):
+            values = actual.get(developer_id, empty)
+            stats = existing.get(developer_id)
+            if stats is None:
+                missing.append(DeveloperStats(user_id=developer_id, **values))
+            elif any(getattr(stats, field) != values[field] for field in fields):
+                for field in fields:
+                    setattr(stats, field, values[field])
+                drifted.append(stats)
+        DeveloperStats.objects.bulk_create(missing, batch_size=UPDATE_BATCH_SIZE)
+        DeveloperStats.objects.bulk_update(drifted, fields, batch_size=UPDATE_BATCH_SIZE)
+
+        totals = Game.objects.filter(published).aggregate(games=Count('id'), downloads=Sum('download_count'))
+        PlatformStats.objects.update_or_create(pk=1, defaults={
+            'total_games': totals['games'],
+            'total_developers': User.objects.filter(is_developer=True).count(),
+            'total_downloads': totals['downloads'] or 0,
+            'total_reviews': Review.objects.filter(is_public=True).count(),
+        })
+    return len(drifted) + len(missing)
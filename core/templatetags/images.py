@@ -0,0 +1,43 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from core import images
+
+
+register = template.Library()
+
+# Ширина копии для атрибута src (браузеры без поддержки srcset)
+FALLBACK_WIDTH = 640
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', **attrs):
+    """
+    <picture> с копиями изображения в WebP и JPEG:
+
+        {% responsive_image game.cover_image sizes="(max-width: 768px) 100vw, 300px" class="card-img-top" alt=game.title %}
+
+    Атрибуты (class, style, alt, ...) переносятся на <img>. Если копий еще
+    нет, выводится обычный <img> с оригиналом.
+    """
+    if not image:
+        return ''
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+
+    widths = images.available_widths(image.name)
+    if not widths:
+        return format_html('<img src="{}"{}>', image.url, flatatt(attrs))
+
+    fallback = next((width for width in widths if width >= FALLBACK_WIDTH), widths[-1])
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        images.srcset(image.name, 'webp'),
+        sizes,
+        images.variant_url(image.name, fallback, 'jpg'),
+        images.srcset(image.name, 'jpg'),
+        sizes,
+        flatatt(attrs),
+    )
@@ -0,0 +1,14 @@
+from django import template
+
+
+register = template.Library()
+
+
+@register.filter
+def liked_by(obj, viewer):
+    """
+    Лайкнул ли текущий пользователь объект (без запросов, core/viewer.py):
+
+        {% load viewer %}{% if post|liked_by:viewer %} ... {% endif %}
+    """
+    return bool(viewer) and viewer.has_liked(obj)
@@ -0,0 +1,246 @@
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from games.models import Game
+from . import counters
+from .pagination import KeysetPaginator
+
+
+def make_game(developer, slug, **kwargs):
+    return Game.objects.create(
+        developer=developer, title=slug, slug=slug, description='', short_description='', **kwargs
+    )
+
+
+def _redis_available():
+    try:
+        import redis
+
+        url = getattr(settings, 'COUNTERS', {}).get('REDIS_URL', counters.DEFAULTS['REDIS_URL'])
+        return redis.Redis.from_url(url, socket_connect_timeout=0.5).ping()
+    except Exception:
+        return False
+
+
+class KeysetPaginatorTests(TestCase):
+    """Keyset-пагинация (core/pagination.py)"""
+
+    ORDERING = ('-created_at', '-id')
+
+    @classmethod
+    def setUpTestData(cls):
+        developer = User.objects.create_user(username='dev', email='dev@example.com', password='x')
+        now = timezone.now()
+        for i in range(12):
+            make_game(developer, f'game-{i}', is_published=True)
+        # Пары игр с одинаковым created_at: порядок внутри пары решает id
+        for game in Game.objects.all():
+            Game.objects.filter(pk=game.pk).update(created_at=now - timedelta(minutes=game.pk // 2))
+        cls.expected = list(Game.objects.order_by(*cls.ORDERING).values_list('pk', flat=True))
+
+    def paginator(self, per_page=5):
+        return KeysetPaginator(Game.objects.all(), self.ORDERING, per_page)
+
+    def ids(self, page):
+        return [game.pk for game in page]
+
+    def test_forward_walk_visits_every_row_once(self):
+        paginator = self.paginator()
+        seen, cursor = [], None
+        while True:
+            page = paginator.page(cursor)
+            seen.extend(self.ids(page))
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, self.expected)
+
+    def test_backward_returns_previous_page(self):
+        paginator = self.paginator()
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        third = paginator.page(second.next_cursor)
+
+        self.assertEqual(self.ids(paginator.page(third.previous_cursor)), self.ids(second))
+        back = paginator.page(second.previous_cursor)
+        self.assertEqual(self.ids(back), self.ids(first))
+        self.assertFalse(back.has_previous())
+
+    def test_backward_near_start_serves_full_first_page(self):
+        paginator = self.paginator()
+        cursor = paginator.encode_cursor('p', Game.objects.get(pk=self.expected[2]))
+        page = paginator.page(cursor)
+        self.assertEqual(self.ids(page), self.expected[:5])
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_first_and_last_page_flags(self):
+        paginator = self.paginator(per_page=12)
+        page = paginator.page()
+        self.assertEqual(self.ids(page), self.expected)
+        self.assertFalse(page.has_next())
+        self.assertFalse(page.has_previous())
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        paginator = self.paginator()
+        for cursor in ('garbage', 'e30', KeysetPaginator(Game.objects.all(), ('title', 'id'), 5).encode_cursor(
+            'n', Game.objects.first()
+        )):
+            self.assertEqual(self.ids(paginator.page(cursor)), self.expected[:5])
+
+    def test_page_query_count_does_not_depend_on_depth(self):
+        paginator = self.paginator(per_page=2)
+        page = paginator.page()
+        for _ in range(4):
+            page = paginator.page(page.next_cursor)
+        with self.assertNumQueries(1):
+            paginator.page(page.next_cursor)
+
+
+@override_settings(COUNTERS={'BACKEND': 'local', 'FLUSH_INTERVAL': 10})
+class CounterBufferTests(TestCase):
+    """Отложенная запись счетчиков (core/counters.py), буфер процесса"""
+
+    @classmethod
+    def setUpTestData(cls):
+        developer = User.objects.create_user(username='dev', email='dev@example.com', password='x')
+        cls.game = make_game(developer, 'game')
+        cls.other = make_game(developer, 'other')
+
+    def setUp(self):
+        # Свой буфер на тест и без фонового потока сброса
+        patches = [
+            mock.patch.object(counters, '_buffer', counters.LocalCounterBuffer()),
+            mock.patch.object(counters, '_ensure_flusher'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def views(self, game):
+        return Game.objects.values_list('view_count', flat=True).get(pk=game.pk)
+
+    def test_increment_is_buffered_until_flush(self):
+        for _ in range(3):
+            counters.increment(self.game, 'view_count')
+        counters.increment(self.other, 'view_count')
+
+        self.assertEqual(self.views(self.game), 0)
+        self.assertEqual(counters.pending(self.game, 'view_count'), 3)
+        self.assertEqual(counters.flush(), 4)
+        self.assertEqual((self.views(self.game), self.views(self.other)), (3, 1))
+        self.assertEqual(counters.pending(self.game, 'view_count'), 0)
+        self.assertEqual(counters.flush(), 0)
+
+    def test_flush_groups_updates_by_amount(self):
+        counters.increment(self.game, 'view_count', 2)
+        counters.increment(self.other, 'view_count', 2)
+        # Одно приращение для обеих игр — один UPDATE (плюс точки сохранения транзакции)
+        with self.assertNumQueries(3):
+            counters.flush()
+
+    def test_failed_flush_restores_increments(self):
+        counters.increment(self.game, 'view_count', 5)
+        with mock.patch.object(counters, '_apply', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                counters.flush()
+        self.assertEqual(self.views(self.game), 0)
+        self.assertEqual(counters.pending(self.game, 'view_count'), 5)
+
+        counters.increment(self.game, 'view_count')
+        self.assertEqual(counters.flush(), 6)
+        self.assertEqual(self.views(self.game), 6)
+
+    def test_pending_is_visible_during_flush(self):
+        counters.increment(self.game, 'view_count', 2)
+        buffer = counters.get_buffer()
+        buffer.take()
+        counters.increment(self.game, 'view_count')
+        # Забранные на сброс и новые инкременты видны вместе, пока сброс не завершен
+        self.assertEqual(counters.pending(self.game, 'view_count'), 3)
+        buffer.done()
+        self.assertEqual(counters.pending(self.game, 'view_count'), 1)
+
+    def test_apply_pending(self):
+        counters.increment(self.game, 'view_count', 2)
+        game, other = counters.apply_pending(
+            Game.objects.filter(pk__in=[self.game.pk, self.other.pk]).order_by('pk'), 'view_count'
+        )
+        self.assertEqual((game.view_count, other.view_count), (2, 0))
+
+    def test_stale_save_keeps_flushed_counters(self):
+        stale = Game.objects.get(pk=self.game.pk)
+        counters.increment(self.game, 'view_count', 4)
+        counters.flush()
+        stale.title = 'Переименована'
+        stale.save()
+        self.assertEqual(self.views(self.game), 4)
+
+    @override_settings(COUNTERS={'BACKEND': 'local', 'FLUSH_INTERVAL': 0})
+    def test_zero_interval_writes_immediately(self):
+        counters.increment(self.game, 'view_count')
+        self.assertEqual(self.views(self.game), 1)
+        self.assertEqual(counters.pending(self.game, 'view_count'), 0)
+
+    def test_flush_counters_command_requires_shared_buffer(self):
+        with self.assertRaises(CommandError):
+            call_command('flush_counters')
+
+
+@skipUnless(_redis_available(), 'нужен Redis (COUNTERS["REDIS_URL"])')
+class RedisCounterBufferTests(TestCase):
+    """Общий буфер счетчиков в Redis: сброс, возврат и подбор брошенных сбросов"""
+
+    def setUp(self):
+        self.prefix = f'test-counters-{uuid.uuid4().hex}'
+        override = override_settings(COUNTERS={
+            **getattr(settings, 'COUNTERS', {}),
+            'BACKEND': 'redis',
+            'KEY_PREFIX': self.prefix,
+            'ORPHAN_AFTER': 60,
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        self.buffer = counters.RedisCounterBuffer()
+        self.redis = self.buffer._redis
+        self.addCleanup(self.cleanup_keys)
+
+    def cleanup_keys(self):
+        for name in self.redis.scan_iter(match=f'{self.prefix}:*'):
+            self.redis.delete(name)
+
+    def test_take_isolates_later_increments(self):
+        self.buffer.add('games.game:1:view_count', 2)
+        self.assertEqual(self.buffer.take(), {'games.game:1:view_count': 2})
+        self.buffer.add('games.game:1:view_count', 1)
+        self.buffer.done()
+        self.assertEqual(self.buffer.get(['games.game:1:view_count']), {'games.game:1:view_count': 1})
+        self.assertEqual(list(self.redis.scan_iter(match=f'{self.prefix}:flushing:*')), [])
+
+    def test_restore_returns_increments(self):
+        self.buffer.add('games.game:1:view_count', 2)
+        pending = self.buffer.take()
+        self.buffer.add('games.game:1:view_count', 1)
+        self.buffer.restore(pending)
+        self.assertEqual(self.buffer.get(['games.game:1:view_count']), {'games.game:1:view_count': 3})
+        self.assertEqual(list(self.redis.scan_iter(match=f'{self.prefix}:flushing:*')), [])
+
+    def test_recover_claims_only_old_orphans(self):
+        old = f'{self.prefix}:flushing:{int(time.time()) - 3600}:dead'
+        fresh = f'{self.prefix}:flushing:{int(time.time())}:alive'
+        self.redis.hset(old, 'games.game:1:view_count', 5)
+        self.redis.hset(fresh, 'games.game:1:view_count', 7)
+
+        self.assertEqual(self.buffer.recover(), 1)
+        self.assertEqual(self.buffer.get(['games.game:1:view_count']), {'games.game:1:view_count': 5})
+        self.assertFalse(self.redis.exists(old))
+        self.assertTrue(self.redis.exists(fresh))
+        self.assertEqual(self.buffer.recover(), 0)
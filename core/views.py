@@ -1,64 +1,106 @@
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.generic import TemplateView
-from django.db.models import Count, Q
-from games.models import Game, Genre
-from accounts.models import User
-from social.models import Review, Post
+from accounts.avatars import avatar_url
+from games.models import Game
+from . import shelves, viewer
+from .models import PlatformStats
+from .page_cache import SharedPageMixin
 
 
-class HomeView(TemplateView):
+RECOMMENDED_GAMES = 4
+
+# Размер аватара в меню пользователя (base.html)
+NAVBAR_AVATAR_SIZE = 24
+
+# Не больше стольких id игр в одном запросе /viewer.json
+VIEWER_GAMES_LIMIT = 200
+
+
+def _recommended_games(user):
+    return Game.objects.filter(
+        recommended_for_users__user=user, is_published=True
+    ).select_related('developer').order_by('-recommended_for_users__score')[:RECOMMENDED_GAMES]
+
+
+class HomeView(SharedPageMixin, TemplateView):
     """Главная страница"""
     template_name = 'core/home.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Рекомендуемые игры
-        context['featured_games'] = Game.objects.filter(
-            featured=True, is_published=True
-        ).select_related('developer')[:6]
-        
-        # Новые игры
-        context['new_games'] = Game.objects.filter(
-            is_published=True
-        ).select_related('developer').order_by('-created_at')[:8]
+        # Полки игр берутся из кеша (core/shelves.py) и загружаются одним запросом:
+        # рекомендуемые, новые и популярные (с затуханием, games/trending.py)
+        games = shelves.hydrate({name: shelves.get(name) for name in ('featured', 'new', 'popular')})
+        context['featured_games'] = games['featured']
+        context['new_games'] = games['new']
+        context['popular_games'] = games['popular']
         
-        # Популярные игры
-        context['popular_games'] = Game.objects.filter(
-            is_published=True
-        ).select_related('developer').order_by('-download_count')[:8]
+        # Бесплатные игры (все игры теперь бесплатные) — те же новые игры
+        context['free_games'] = games['new'][:6]
         
-        # Бесплатные игры (все игры теперь бесплатные)
-        context['free_games'] = Game.objects.filter(
-            is_published=True
-        ).select_related('developer').order_by('-created_at')[:6]
+        # Персональные рекомендации (games/recommendations.py); в общей
+        # странице их подставляет скрипт по /viewer.json
+        if self.request.user.is_authenticated:
+            context['recommended_games'] = _recommended_games(self.request.user)
         
         # Жанры
-        context['genres'] = Genre.objects.annotate(
-            games_count=Count('games', filter=Q(games__is_published=True))
-        ).filter(games_count__gt=0).order_by('-games_count')[:8]
+        context['genres'] = shelves.genres()
         
-        # Последние отзывы
-        context['recent_reviews'] = Review.objects.filter(
-            is_public=True
-        ).select_related('user', 'game').order_by('-created_at')[:5]
-        
-        # Последние посты
-        context['recent_posts'] = Post.objects.filter(
-            is_published=True
-        ).select_related('author', 'game').order_by('-created_at')[:4]
-        
-        # Статистика платформы
-        context['stats'] = {
-            'total_games': Game.objects.filter(is_published=True).count(),
-            'total_developers': User.objects.filter(is_developer=True).count(),
-            'total_downloads': sum(game.download_count for game in Game.objects.filter(is_published=True)),
-            'total_reviews': Review.objects.filter(is_public=True).count(),
-        }
+        # Статистика платформы (готовые итоги, см. core/stats.py)
+        context['stats'] = PlatformStats.load()
         
         return context
 
 
+def _game_ids(value):
+    ids = set()
+    for part in value.split(',')[:VIEWER_GAMES_LIMIT]:
+        if part.isdigit():
+            ids.add(int(part))
+    return ids
+
+
+@never_cache
+@ensure_csrf_cookie
+def viewer_state_view(request):
+    """
+    Состояние пользователя для страниц из общего кеша (core/page_cache.py):
+    ?games=1,2,3 — какие из этих игр в списке желаний, ?recommended=1 —
+    персональные рекомендации. Заодно выставляет cookie csrftoken, которого
+    нет в закешированной странице.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return JsonResponse({'authenticated': False})
+
+    state = viewer.for_request(request)
+    data = {
+        'authenticated': True,
+        'username': user.username,
+        'profile_url': user.get_absolute_url(),
+        'avatar_url': avatar_url(user, NAVBAR_AVATAR_SIZE * 2),
+        'is_developer': user.is_developer,
+        'unread_notifications': user.unread_notifications_count,
+        'wishlist': sorted(state.wishlist & _game_ids(request.GET.get('games', ''))),
+    }
+    if request.GET.get('recommended'):
+        data['recommended'] = [
+            {
+                'title': game.title,
+                'url': game.get_absolute_url(),
+                'developer': game.developer.username,
+                'cover_url': game.cover_image.url if game.cover_image else '',
+                'in_wishlist': game.pk in state.wishlist,
+            }
+            for game in _recommended_games(user)
+        ]
+    return JsonResponse(data)
+
+
 def about_view(request):
     """Страница о платформе"""
     return render(request, 'core/about.html')
@@ -5,3 +5,6 @@ class GamesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'games'
     verbose_name = 'Игры'
+
+    def ready(self):
+        from . import signals  # noqa: F401
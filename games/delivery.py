@@ -0,0 +1,222 @@
+# Отдача файлов игр
+#
+# Django проверяет права и ведет статистику, а саму передачу файла можно
+# отдать веб-серверу, чтобы многогигабайтная сборка не занимала WSGI-воркер:
+#   'nginx'    — X-Accel-Redirect на internal location (см. nginx.conf)
+#   'sendfile' — X-Sendfile для Apache (mod_xsendfile) и lighttpd
+#   'python'   — файл читает сам Django (по умолчанию, для разработки)
+#
+# Условные запросы (If-None-Match) обрабатываются здесь для всех способов.
+# Range/If-Range при 'python' разбираются здесь же (206, multipart/byteranges),
+# при 'nginx'/'sendfile' — веб-сервером.
+#
+# Настройки (settings.FILE_DELIVERY):
+#   BACKEND      — один из ключей BACKENDS
+#   INTERNAL_URL — префикс internal location nginx, соответствующий MEDIA_ROOT
+
+import mimetypes
+import os
+import re
+import uuid
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+
+DEFAULTS = {
+    'BACKEND': 'python',
+    'INTERNAL_URL': '/protected/',
+}
+
+
+# Больше диапазонов в одном запросе не обслуживаем — отдаем файл целиком
+MAX_RANGES = 20
+RANGE_CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+
+
+def _setting(name):
+    return getattr(settings, 'FILE_DELIVERY', {}).get(name, DEFAULTS[name])
+
+
+# --- Range ---
+
+def parse_range(header, size):
+    """
+    Разбирает заголовок Range.
+
+    Возвращает None, если заголовок отсутствует или некорректен (отдаем весь
+    файл), пустой список, если ни один диапазон не попадает в файл (416),
+    иначе отсортированный список непересекающихся (start, end) включительно.
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    ranges = []
+    for spec in header[len('bytes='):].split(','):
+        match = RANGE_RE.match(spec)
+        if not match or match.groups() == ('', ''):
+            return None
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if last and int(last) < start:
+                return None
+        else:
+            start, end = max(size - int(last), 0), size - 1
+            if int(last) == 0:
+                continue
+        if start < size:
+            ranges.append((start, end))
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    # Объединяем пересекающиеся и соседние диапазоны
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _if_range_matches(request, etag, mtime):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # Для If-Range годится только сильное совпадение
+        return etag is not None and if_range == etag
+    timestamp = parse_http_date_safe(if_range)
+    return timestamp is not None and int(mtime) <= timestamp
+
+
+def _read_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _multipart(path, ranges, size, content_type, boundary):
+    for start, end in ranges:
+        yield (
+            f'--{boundary}\r\nContent-Type: {content_type}\r\n'
+            f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n'
+        ).encode()
+        yield from _read_range(path, start, end)
+        yield b'\r\n'
+    yield f'--{boundary}--\r\n'.encode()
+
+
+def _multipart_length(ranges, size, content_type, boundary):
+    length = len(f'--{boundary}--\r\n')
+    for start, end in ranges:
+        length += len((
+            f'--{boundary}\r\nContent-Type: {content_type}\r\n'
+            f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n'
+        ).encode())
+        length += end - start + 1 + 2
+    return length
+
+
+def _offload_response(field_file, filename):
+    """Пустой ответ с заголовками файла — тело отдаст веб-сервер"""
+    if not os.path.exists(field_file.path):
+        raise FileNotFoundError(field_file.path)
+    content_type, encoding = mimetypes.guess_type(filename)
+    response = HttpResponse(content_type=content_type or 'application/octet-stream')
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+class PythonDelivery:
+    def serve(self, request, field_file, filename, etag=None):
+        path = field_file.path
+        stat = os.stat(path)
+        size = stat.st_size
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+        ranges = None
+        if _if_range_matches(request, etag, stat.st_mtime):
+            ranges = parse_range(request.META.get('HTTP_RANGE'), size)
+
+        if ranges is None:
+            response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename)
+        elif not ranges:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            response = StreamingHttpResponse(_read_range(path, start, end), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Disposition'] = content_disposition_header(True, filename)
+        else:
+            boundary = uuid.uuid4().hex
+            response = StreamingHttpResponse(
+                _multipart(path, ranges, size, content_type, boundary),
+                status=206,
+                content_type=f'multipart/byteranges; boundary={boundary}',
+            )
+            response['Content-Length'] = str(_multipart_length(ranges, size, content_type, boundary))
+            response['Content-Disposition'] = content_disposition_header(True, filename)
+
+        response['Accept-Ranges'] = 'bytes'
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        return response
+
+
+class NginxDelivery:
+    def serve(self, request, field_file, filename, etag=None):
+        response = _offload_response(field_file, filename)
+        internal_url = _setting('INTERNAL_URL').rstrip('/') + '/'
+        response['X-Accel-Redirect'] = quote(internal_url + field_file.name)
+        return response
+
+
+class SendfileDelivery:
+    def serve(self, request, field_file, filename, etag=None):
+        response = _offload_response(field_file, filename)
+        response['X-Sendfile'] = field_file.path
+        return response
+
+
+BACKENDS = {
+    'python': PythonDelivery,
+    'nginx': NginxDelivery,
+    'sendfile': SendfileDelivery,
+}
+
+
+def _etag_matches(header, etag):
+    if header.strip() == '*':
+        return True
+    tags = [tag.strip() for tag in header.split(',')]
+    # If-None-Match сравнивается слабо: W/"x" совпадает с "x"
+    return etag in tags or f'W/{etag}' in tags
+
+
+def serve_file(request, field_file, filename=None, etag=None):
+    """
+    Ответ на скачивание файла выбранным способом.
+
+    etag — сильный ETag содержимого; FileNotFoundError если файла нет.
+    """
+    filename = filename or os.path.basename(field_file.name)
+    if etag and _etag_matches(request.META.get('HTTP_IF_NONE_MATCH', ''), etag):
+        response = HttpResponseNotModified()
+    else:
+        response = BACKENDS[_setting('BACKEND')]().serve(request, field_file, filename, etag)
+    if etag:
+        response['ETag'] = etag
+    return response
@@ -0,0 +1,272 @@
+# Асинхронная запись статистики скачиваний
+#
+# download_game только кладет событие в ограниченную очередь и сразу отдает
+# файл. Фоновый поток собирает события в пачки и пишет их bulk_create.
+# Если БД недоступна (или очередь переполнена), события дописываются в журнал
+# на диске и повторно загружаются при следующем запуске или восстановлении БД.
+#
+# Настройки (settings.DOWNLOAD_LOG):
+#   ASYNC          — False: писать синхронно, как раньше
+#   QUEUE_SIZE     — размер очереди
+#   PUT_TIMEOUT    — сколько запрос ждет места в очереди, прежде чем
+#                    сбросить событие в журнал
+#   BATCH_SIZE     — максимальный размер пачки
+#   BATCH_TIMEOUT  — сколько ждать наполнения пачки, секунд
+#   RETRY_INTERVAL — пауза перед повторной загрузкой журнала после ошибки БД
+#   JOURNAL_DIR    — каталог журнала
+#   DEDUP_WINDOW   — окно, в котором Range-запросы клиента к файлу считаются
+#                    одним скачиванием, секунд
+#
+# Окно хранится в кеше Django. Сегменты одного скачивания, попавшие в разные
+# процессы, распознаются только при общем кеше (Redis, Memcached;
+# settings_production включает RedisCache по REDIS_URL): с LocMemCache
+# каждый процесс засчитает свой сегмент отдельным скачиванием, и
+# download_count, статистика и популярность будут завышены.
+
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ASYNC': True,
+    'QUEUE_SIZE': 10000,
+    'PUT_TIMEOUT': 0.05,
+    'BATCH_SIZE': 200,
+    'BATCH_TIMEOUT': 1.0,
+    'RETRY_INTERVAL': 30,
+    'DEDUP_WINDOW': 6 * 60 * 60,
+    'JOURNAL_DIR': os.path.join(settings.BASE_DIR, 'var', 'download_journal'),
+}
+
+
+def _setting(name):
+    return getattr(settings, 'DOWNLOAD_LOG', {}).get(name, DEFAULTS[name])
+
+
+# --- Журнал ---
+
+def _journal_path():
+    return os.path.join(_setting('JOURNAL_DIR'), f'downloads-{os.getpid()}.jsonl')
+
+
+def _serialize(event):
+    data = dict(event)
+    data['created_at'] = data['created_at'].isoformat()
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _deserialize(line):
+    data = json.loads(line)
+    data['created_at'] = parse_datetime(data['created_at'])
+    return data
+
+
+def spill(events):
+    """Дописывает события в журнал процесса"""
+    if not events:
+        return
+    os.makedirs(_setting('JOURNAL_DIR'), exist_ok=True)
+    payload = ''.join(_serialize(event) + '\n' for event in events)
+    while True:
+        with open(_journal_path(), 'a', encoding='utf-8') as journal:
+            fcntl.flock(journal, fcntl.LOCK_EX)
+            # Файл могли забрать на загрузку, пока мы ждали блокировку
+            if os.fstat(journal.fileno()).st_nlink == 0:
+                continue
+            journal.write(payload)
+            journal.flush()
+            return
+
+
+def replay_journal():
+    """Загружает в БД события из журналов всех процессов, возвращает их количество"""
+    total = 0
+    for path in glob.glob(os.path.join(_setting('JOURNAL_DIR'), 'downloads-*.jsonl')):
+        claimed = os.path.join(_setting('JOURNAL_DIR'), f'replay-{uuid.uuid4().hex}.jsonl')
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            continue
+        with open(claimed, encoding='utf-8') as journal:
+            fcntl.flock(journal, fcntl.LOCK_EX)
+            events = [_deserialize(line) for line in journal if line.strip()]
+            batch_size = _setting('BATCH_SIZE')
+            for start in range(0, len(events), batch_size):
+                try:
+                    write_batch(events[start:start + batch_size])
+                except DatabaseError:
+                    # БД снова недоступна — незаписанный остаток возвращаем в журнал
+                    spill(events[start:])
+                    os.unlink(claimed)
+                    raise
+            os.unlink(claimed)
+        total += len(events)
+    return total
+
+
+# --- Запись в БД ---
+
+def write_batch(events):
+    """Пишет пачку событий одним bulk_create"""
+    from .models import Download
+
+    if not events:
+        return
+    try:
+        with transaction.atomic():
+            Download.objects.bulk_create([Download(**event) for event in events])
+    except IntegrityError:
+        # Игру или файл успели удалить — пишем по одному, пропуская такие события
+        for event in events:
+            try:
+                with transaction.atomic():
+                    Download.objects.create(**event)
+            except IntegrityError:
+                logger.warning('Пропущено скачивание удаленного объекта: %s', event)
+
+
+class DownloadLogWorker:
+    """Фоновый поток, разбирающий очередь событий"""
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=_setting('QUEUE_SIZE'))
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='download-log', daemon=True)
+        self._last_failure = None
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def put(self, event):
+        try:
+            self.queue.put(event, timeout=_setting('PUT_TIMEOUT'))
+        except queue.Full:
+            # Обратное давление: не держим запрос, сбрасываем событие на диск
+            spill([event])
+
+    def _next_batch(self):
+        batch = []
+        try:
+            batch.append(self.queue.get(timeout=_setting('BATCH_TIMEOUT')))
+        except queue.Empty:
+            return batch
+        deadline = time.monotonic() + _setting('BATCH_TIMEOUT')
+        while len(batch) < _setting('BATCH_SIZE'):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _replay(self):
+        if self._last_failure and time.monotonic() - self._last_failure < _setting('RETRY_INTERVAL'):
+            return
+        try:
+            replay_journal()
+            self._last_failure = None
+        except DatabaseError:
+            self._last_failure = time.monotonic()
+            logger.exception('Не удалось загрузить журнал скачиваний')
+
+    def _write(self, batch):
+        try:
+            write_batch(batch)
+        except DatabaseError:
+            self._last_failure = time.monotonic()
+            logger.exception('БД недоступна, %s скачиваний записано в журнал', len(batch))
+            spill(batch)
+
+    def _run(self):
+        self._replay()
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            close_old_connections()
+            if batch:
+                self._write(batch)
+            if self._last_failure:
+                self._replay()
+
+    def stop(self):
+        """Дописывает остаток очереди при остановке процесса"""
+        self._stopping.set()
+        self._thread.join(timeout=_setting('BATCH_TIMEOUT') * 2)
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            try:
+                write_batch(batch)
+            except DatabaseError:
+                spill(batch)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                worker = DownloadLogWorker()
+                worker.start()
+                _worker = worker
+    return _worker
+
+
+def is_new_download(request, game_file):
+    """
+    Нужно ли учитывать запрос как новое скачивание.
+
+    Полный GET учитывается всегда и открывает окно DEDUP_WINDOW; запросы
+    с Range (докачка, сегменты менеджеров загрузок) от того же клиента
+    внутри окна не учитываются. Между процессами — только при общем кеше.
+    """
+    if request.method != 'GET':
+        return False
+    client = request.user.pk if request.user.is_authenticated else request.META.get('REMOTE_ADDR', '')
+    key = f'download-seen:{game_file.pk}:{client}'
+    if 'HTTP_RANGE' not in request.META:
+        cache.set(key, 1, _setting('DEDUP_WINDOW'))
+        return True
+    return cache.add(key, 1, _setting('DEDUP_WINDOW'))
+
+
+def record_download(request, game, game_file):
+    """Регистрирует скачивание, не дожидаясь записи в БД"""
+    event = {
+        'user_id': request.user.pk if request.user.is_authenticated else None,
+        'game_id': game.pk,
+        'game_file_id': game_file.pk if game_file else None,
+        'ip_address': request.META.get('REMOTE_ADDR', ''),
+        'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+        'created_at': timezone.now(),
+    }
+    if not _setting('ASYNC'):
+        write_batch([event])
+        return
+    get_worker().put(event)
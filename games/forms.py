@@ -109,8 +109,10 @@ class GameSearchForm(forms.Form):
     SORT_CHOICES = [
         ('', 'По умолчанию'),
         ('-created_at', 'Новые'),
-        ('-download_count', 'Популярные'),
+        ('-trending_score', 'Популярные сейчас'),
+        ('-download_count', 'Больше всего скачиваний'),
         ('title', 'По алфавиту'),
+        ('-rating_score', 'По рейтингу'),
     ]
     
     q = forms.CharField(
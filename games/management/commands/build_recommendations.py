@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from games import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации «игроки также скачивали» и персональные рекомендации'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, help='Строк таблиц взаимодействий за один запрос')
+        parser.add_argument(
+            '--evaluate', action='store_true',
+            help='Только офлайн-оценка (hit rate leave-one-out), таблицы не меняются'
+        )
+        parser.add_argument('--sample', type=int, default=1000, help='Пользователей в выборке для оценки')
+        parser.add_argument('--seed', type=int, default=0, help='Зерно случайной выборки для оценки')
+
+    def handle(self, *args, **options):
+        if options['evaluate']:
+            report = recommendations.evaluate(
+                sample=options['sample'], seed=options['seed'], chunk_size=options['chunk_size']
+            )
+            if not report['users']:
+                self.stdout.write(self.style.WARNING('Недостаточно данных: нет пользователей с двумя и более играми'))
+                return
+            self.stdout.write(f"Пользователей в выборке: {report['users']}")
+            self.stdout.write(f"Взаимодействий: {report['interactions']}")
+            self.stdout.write(f"Hit rate@{report['top_n']}: {report['hit_rate']:.3f}")
+            self.stdout.write(f"Hit rate@{report['top_n']} (популярные игры): {report['baseline_hit_rate']:.3f}")
+            self.stdout.write(f"Покрытие каталога: {report['coverage']:.1%}")
+            return
+
+        games, users = recommendations.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Рекомендации: игр {games}, пользователей {users}'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from games import uploads
+
+
+class Command(BaseCommand):
+    help = 'Удаляет просроченные загрузки файлов игр и недокачанные файлы'
+
+    def handle(self, *args, **options):
+        total = uploads.cleanup_expired()
+        self.stdout.write(self.style.SUCCESS(f'Удалено загрузок: {total}'))
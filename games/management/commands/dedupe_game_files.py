@@ -0,0 +1,57 @@
+import hashlib
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from games import storage
+from games.models import GameFile, StoredBlob
+
+
+class Command(BaseCommand):
+    help = 'Переносит файлы игр, загруженные до появления хранилища по содержимому, и удаляет дубликаты'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать, сколько места освободится')
+
+    def _digest(self, path):
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(storage.READ_SIZE), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def handle(self, *args, **options):
+        moved = duplicates = freed = 0
+        seen = set(StoredBlob.objects.values_list('sha256', flat=True))
+        legacy = GameFile.objects.exclude(file__startswith=StoredBlob.DIRECTORY + '/').exclude(file='')
+        for game_file in legacy.iterator():
+            path = game_file.file.path
+            if not os.path.exists(path):
+                self.stdout.write(self.style.WARNING(f'Файл не найден: {game_file.file.name}'))
+                continue
+            size = os.path.getsize(path)
+            checksum = self._digest(path)
+            if checksum in seen:
+                duplicates += 1
+                freed += size
+            seen.add(checksum)
+            if options['dry_run']:
+                continue
+
+            with transaction.atomic():
+                blob = storage.ingest_path(path, checksum, size)
+                GameFile.objects.filter(pk=game_file.pk).update(
+                    file=blob.name,
+                    filename=game_file.filename or os.path.basename(game_file.file.name),
+                    file_size=blob.size,
+                    checksum=blob.sha256,
+                )
+            moved += 1
+
+        if options['dry_run']:
+            self.stdout.write(f'Дубликатов: {duplicates}, освободится {freed / 1024 / 1024:.1f} МБ')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено файлов: {moved}, удалено дубликатов: {duplicates} ({freed / 1024 / 1024:.1f} МБ)'
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core import images
+from games.signals import IMAGE_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'Строит уменьшенные копии (WebP/JPEG) обложек, баннеров и скриншотов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Пересоздать и уже существующие копии')
+
+    def handle(self, *args, **options):
+        total = 0
+        seen = set()
+        for model, fields in IMAGE_FIELDS.items():
+            for row in model.objects.values_list(*fields).iterator():
+                for name in filter(None, row):
+                    if name in seen:
+                        continue
+                    seen.add(name)
+                    if not options['force'] and images.available_widths(name):
+                        continue
+                    if images.generate_variants(name):
+                        total += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано изображений: {total}'))
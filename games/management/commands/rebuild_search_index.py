@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from games import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс каталога игр'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Размер пачки при индексации')
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        if isinstance(backend, search.FallbackSearchBackend):
+            self.stdout.write(self.style.WARNING(
+                'Полнотекстовый индекс недоступен для этой СУБД, используется поиск через icontains'
+            ))
+            return
+
+        total = search.rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано игр: {total}'))
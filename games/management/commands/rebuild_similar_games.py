@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from games import similarity
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает похожие игры по жанрам и тегам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale', action='store_true',
+            help='Только игры, у которых изменились жанры, теги или публикация (для запуска по cron)'
+        )
+
+    def handle(self, *args, **options):
+        if options['stale']:
+            games, links = similarity.update_stale()
+        else:
+            games, links = similarity.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано игр: {games}, связей: {links}'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from games import ratings
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованный рейтинг игр по отзывам и оценкам'
+
+    def handle(self, *args, **options):
+        total = ratings.reconcile()
+        self.stdout.write(self.style.SUCCESS(f'Исправлено игр: {total}'))
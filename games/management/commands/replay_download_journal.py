@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from games import download_log
+
+
+class Command(BaseCommand):
+    help = 'Загружает в БД скачивания, сохраненные в журнал при недоступности БД'
+
+    def handle(self, *args, **options):
+        total = download_log.replay_journal()
+        self.stdout.write(self.style.SUCCESS(f'Загружено скачиваний: {total}'))
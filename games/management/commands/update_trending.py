@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from games import trending
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает популярность игр с затуханием и топы недели и месяца'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Полный пересчет по скачиваниям за последние TRENDING["HORIZON"] дней'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            games = trending.rebuild()
+        else:
+            games = trending.update()
+        self.stdout.write(self.style.SUCCESS(f'Обновлена популярность игр: {games}'))
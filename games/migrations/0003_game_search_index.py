@@ -0,0 +1,72 @@
+# Полнотекстовый индекс каталога: FTS5 на SQLite, tsvector + GIN на PostgreSQL
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+
+    if connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                'CREATE VIRTUAL TABLE games_game_fts USING fts5('
+                'title, short_description, description, tags, tokenize = "unicode61")'
+            )
+        except OperationalError:
+            # SQLite собран без FTS5 — остается поиск через icontains
+            return
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE games_game_search ('
+            'game_id bigint PRIMARY KEY REFERENCES games_game (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX games_game_search_document_gin ON games_game_search USING gin (document)'
+        )
+    else:
+        return
+
+    # Индексируем уже существующие игры
+    from games import search
+
+    Game = apps.get_model('games', 'Game')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+
+    tags = {}
+    content_type = ContentType.objects.filter(app_label='games', model='game').first()
+    if content_type:
+        items = TaggedItem.objects.filter(content_type=content_type).values_list('object_id', 'tag__name')
+        for object_id, name in items:
+            tags.setdefault(object_id, []).append(name)
+
+    backend = (search.SQLiteSearchBackend() if connection.vendor == 'sqlite'
+               else search.PostgresSearchBackend())
+    fields = ('id', 'title', 'short_description', 'description')
+    backend.index(
+        search.SearchDocument(pk, title, short_description, description, ' '.join(tags.get(pk, [])))
+        for pk, title, short_description, description in Game.objects.values_list(*fields).iterator()
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS games_game_fts')
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE IF EXISTS games_game_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0002_add_related_name_to_genres'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0005_auto_20220424_2025'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
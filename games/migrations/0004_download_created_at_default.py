@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:27
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0003_game_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='download',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата скачивания'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0004_download_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamefile',
+            name='checksum',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='SHA-256'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('games', '0005_gamefile_checksum'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gamefile',
+            name='file_size',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='Размер файла (байты)'),
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='Имя файла')),
+                ('name', models.CharField(max_length=200, verbose_name='Название')),
+                ('platform', models.CharField(choices=[('windows', 'Windows'), ('mac', 'macOS'), ('linux', 'Linux'), ('android', 'Android'), ('ios', 'iOS'), ('web', 'Web')], max_length=20, verbose_name='Платформа')),
+                ('version', models.CharField(default='1.0', max_length=50, verbose_name='Версия')),
+                ('length', models.PositiveBigIntegerField(verbose_name='Размер (байты)')),
+                ('offset', models.PositiveBigIntegerField(default=0, verbose_name='Загружено (байты)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('expires_at', models.DateTimeField(verbose_name='Действует до')),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='games.game')),
+                ('game_file', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_session', to='games.gamefile')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Загрузка файла',
+                'verbose_name_plural': 'Загрузки файлов',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
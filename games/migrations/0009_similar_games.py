@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0008_game_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='similarity_stale',
+            field=models.BooleanField(db_index=True, default=True, editable=False, verbose_name='Похожие игры устарели'),
+        ),
+        migrations.CreateModel(
+            name='SimilarGame',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Сходство')),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_links', to='games.game')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='games.game')),
+            ],
+            options={
+                'verbose_name': 'Похожая игра',
+                'verbose_name_plural': 'Похожие игры',
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['game', '-score'], name='games_similar_game_score')],
+                'unique_together': {('game', 'similar')},
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('games', '0009_similar_games'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Оценка')),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_for_users', to='games.game')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Рекомендация пользователю',
+                'verbose_name_plural': 'Рекомендации пользователям',
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['user', '-score'], name='games_user_recommendation')],
+                'unique_together': {('user', 'game')},
+            },
+        ),
+        migrations.CreateModel(
+            name='GameRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Оценка')),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendation_links', to='games.game')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_for_games', to='games.game')),
+            ],
+            options={
+                'verbose_name': 'Рекомендация к игре',
+                'verbose_name_plural': 'Рекомендации к играм',
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['game', '-score'], name='games_recommendation_score')],
+                'unique_together': {('game', 'recommended')},
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def skip_past_views(apps, schema_editor):
+    # Просмотры до включения популярности не имеют времени — не считаем их всплеском
+    Game = apps.get_model('games', 'Game')
+    Game.objects.update(trending_views=models.F('view_count'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0010_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopGame',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('week', 'Неделя'), ('month', 'Месяц')], max_length=10, verbose_name='Период')),
+                ('position', models.PositiveIntegerField(verbose_name='Место')),
+                ('downloads', models.PositiveIntegerField(verbose_name='Скачиваний за период')),
+            ],
+            options={
+                'verbose_name': 'Игра в топе',
+                'verbose_name_plural': 'Топ игр',
+                'ordering': ['period', 'genre', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_download_id', models.BigIntegerField(default=0, verbose_name='Последнее учтенное скачивание')),
+                ('updated_at', models.DateTimeField(blank=True, null=True, verbose_name='Пересчитано')),
+            ],
+            options={
+                'verbose_name': 'Состояние популярности',
+                'verbose_name_plural': 'Состояние популярности',
+            },
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='trending_score',
+            field=models.FloatField(db_index=True, default=0, editable=False, verbose_name='Популярность сейчас'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='trending_views',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Учтено просмотров'),
+        ),
+        migrations.AddIndex(
+            model_name='download',
+            index=models.Index(fields=['created_at'], name='games_download_created'),
+        ),
+        migrations.AddField(
+            model_name='topgame',
+            name='game',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='top_positions', to='games.game'),
+        ),
+        migrations.AddField(
+            model_name='topgame',
+            name='genre',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='top_games', to='games.genre'),
+        ),
+        migrations.AddIndex(
+            model_name='topgame',
+            index=models.Index(fields=['period', 'genre', 'position'], name='games_top_position'),
+        ),
+        migrations.RunPython(skip_past_views, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,13 @@
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 from taggit.managers import TaggableManager
 from accounts.models import User
+from core.mixins import CounterFieldsMixin
 import os
+import uuid
 
 
 class Genre(models.Model):
@@ -28,7 +31,7 @@ class Genre(models.Model):
         super().save(*args, **kwargs)
 
 
-class Game(models.Model):
+class Game(CounterFieldsMixin, models.Model):
     """Модель игры"""
     
     # Основная информация
@@ -61,6 +64,24 @@ class Game(models.Model):
     download_count = models.PositiveIntegerField('Количество скачиваний', default=0)
     view_count = models.PositiveIntegerField('Количество просмотров', default=0)
     
+    # Рейтинг по отзывам и оценкам (поддерживается games/ratings.py)
+    rating_sum = models.PositiveIntegerField('Сумма оценок', default=0, editable=False)
+    rating_count = models.PositiveIntegerField('Количество оценок', default=0, editable=False)
+    rating_average = models.FloatField('Средняя оценка', default=0, editable=False)
+    rating_score = models.FloatField('Взвешенный рейтинг', default=0, editable=False, db_index=True)
+    rating_1 = models.PositiveIntegerField('Оценок «1»', default=0, editable=False)
+    rating_2 = models.PositiveIntegerField('Оценок «2»', default=0, editable=False)
+    rating_3 = models.PositiveIntegerField('Оценок «3»', default=0, editable=False)
+    rating_4 = models.PositiveIntegerField('Оценок «4»', default=0, editable=False)
+    rating_5 = models.PositiveIntegerField('Оценок «5»', default=0, editable=False)
+    
+    # Список похожих игр нужно пересчитать (games/similarity.py)
+    similarity_stale = models.BooleanField('Похожие игры устарели', default=True, editable=False, db_index=True)
+    
+    # Популярность с затуханием по времени (поддерживается games/trending.py)
+    trending_score = models.FloatField('Популярность сейчас', default=0, editable=False, db_index=True)
+    trending_views = models.PositiveIntegerField('Учтено просмотров', default=0, editable=False)
+    
     # Даты
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Обновлено', auto_now=True)
@@ -70,6 +91,16 @@ class Game(models.Model):
         verbose_name_plural = 'Игры'
         ordering = ['-created_at']
     
+    # Поля, которые меняются запросами в БД, см. core/mixins.py: счетчики
+    # (core/counters.py), рейтинг (games/ratings.py), популярность
+    # (games/trending.py) и признак пересчета похожих игр
+    COUNTER_FIELDS = (
+        'download_count', 'view_count',
+        'rating_sum', 'rating_count', 'rating_average', 'rating_score',
+        'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5',
+        'trending_score', 'trending_views', 'similarity_stale',
+    )
+    
     def __str__(self):
         return self.title
     
@@ -79,18 +110,22 @@ class Game(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        if self._state.adding and not self.rating_count:
+            from .ratings import bayesian_score
+            self.rating_score = bayesian_score(0, 0)
         super().save(*args, **kwargs)
     
     @property
     def average_rating(self):
-        reviews = self.reviews.all()
-        if reviews:
-            return sum(review.rating for review in reviews) / len(reviews)
-        return 0
+        return self.rating_average
     
     @property
-    def rating_count(self):
-        return self.reviews.count()
+    def rating_histogram(self):
+        """[(оценка, количество, процент)] от 5 до 1"""
+        return [
+            (stars, count, round(100 * count / self.rating_count) if self.rating_count else 0)
+            for stars, count in ((stars, getattr(self, f'rating_{stars}')) for stars in range(5, 0, -1))
+        ]
     
     @property
     def platforms(self):
@@ -112,7 +147,7 @@ class Game(models.Model):
         return True
 
 
-class GameFile(models.Model):
+class GameFile(CounterFieldsMixin, models.Model):
     """Файлы игры"""
     
     PLATFORM_CHOICES = [
@@ -127,9 +162,11 @@ class GameFile(models.Model):
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='files')
     name = models.CharField('Название', max_length=200)
     file = models.FileField('Файл', upload_to='games/files/')
+    filename = models.CharField('Имя файла', max_length=255, blank=True, editable=False)
     platform = models.CharField('Платформа', max_length=20, choices=PLATFORM_CHOICES)
     version = models.CharField('Версия', max_length=50, default='1.0')
-    file_size = models.PositiveIntegerField('Размер файла (байты)', default=0)
+    file_size = models.PositiveBigIntegerField('Размер файла (байты)', default=0)
+    checksum = models.CharField('SHA-256', max_length=64, blank=True, editable=False)
     download_count = models.PositiveIntegerField('Количество скачиваний', default=0)
     
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
@@ -139,17 +176,116 @@ class GameFile(models.Model):
         verbose_name_plural = 'Файлы игр'
         ordering = ['-created_at']
     
+    # Счетчик скачиваний копится в core/counters.py и сбрасывается приращениями
+    COUNTER_FIELDS = ('download_count',)
+    
     def __str__(self):
         return f"{self.game.title} - {self.name} ({self.platform})"
     
     def save(self, *args, **kwargs):
-        if self.file and not self.file_size:
-            self.file_size = self.file.size
+        from .storage import ingest_file, release
+        
+        previous = None
+        if self.pk:
+            previous = GameFile.objects.filter(pk=self.pk).values_list('file', 'checksum').first()
+        
+        # Новый файл (из формы или админки) кладется в хранилище по содержимому;
+        # размер и контрольная сумма считаются за тот же проход
+        ingested = False
+        if self.file and not self.file._committed:
+            self.filename = os.path.basename(self.file.name)
+            blob = ingest_file(self.file.file)
+            self.file.name = blob.name
+            self.file._committed = True
+            self.file_size = blob.size
+            self.checksum = blob.sha256
+            ingested = True
+        
         super().save(*args, **kwargs)
+        
+        # Новая загрузка уже взяла свою ссылку — прежняя снимается, даже если
+        # содержимое совпало и имя файла не изменилось
+        if previous and (ingested or previous[0] != self.file.name) and StoredBlob.owns(previous[0]):
+            release(previous[1])
+    
+    @property
+    def download_name(self):
+        return self.filename or os.path.basename(self.file.name)
     
     @property
     def file_size_mb(self):
         return round(self.file_size / (1024 * 1024), 2)
+    
+    @property
+    def etag(self):
+        """
+        Сильный ETag по содержимому файла. У файлов, загруженных до появления
+        контрольных сумм, его нет (None) — их заполняет dedupe_game_files.
+        """
+        if not self.checksum:
+            return None
+        return f'"{self.checksum}"'
+
+
+class StoredBlob(models.Model):
+    """Содержимое файла игры в хранилище с адресацией по SHA-256 (см. games/storage.py)"""
+    sha256 = models.CharField('SHA-256', max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField('Размер (байты)')
+    ref_count = models.PositiveIntegerField('Количество ссылок', default=0)
+    
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Содержимое файла'
+        verbose_name_plural = 'Содержимое файлов'
+    
+    def __str__(self):
+        return f"{self.sha256} ({self.ref_count})"
+    
+    DIRECTORY = 'games/blobs'
+    
+    @property
+    def name(self):
+        return f"{self.DIRECTORY}/{self.sha256[:2]}/{self.sha256[2:4]}/{self.sha256}"
+    
+    @classmethod
+    def owns(cls, name):
+        """Лежит ли файл с таким именем в хранилище по содержимому"""
+        return bool(name) and name.startswith(cls.DIRECTORY + '/')
+
+
+class UploadSession(models.Model):
+    """Сессия возобновляемой загрузки файла игры (см. games/uploads.py)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='upload_sessions')
+    
+    # Данные будущего GameFile
+    filename = models.CharField('Имя файла', max_length=255)
+    name = models.CharField('Название', max_length=200)
+    platform = models.CharField('Платформа', max_length=20, choices=GameFile.PLATFORM_CHOICES)
+    version = models.CharField('Версия', max_length=50, default='1.0')
+    
+    length = models.PositiveBigIntegerField('Размер (байты)')
+    offset = models.PositiveBigIntegerField('Загружено (байты)', default=0)
+    game_file = models.OneToOneField(
+        GameFile, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_session'
+    )
+    
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    expires_at = models.DateTimeField('Действует до')
+    
+    class Meta:
+        verbose_name = 'Загрузка файла'
+        verbose_name_plural = 'Загрузки файлов'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.length})"
+    
+    @property
+    def is_complete(self):
+        return self.offset >= self.length
 
 
 class GameImage(models.Model):
@@ -178,11 +314,13 @@ class Download(models.Model):
     ip_address = models.GenericIPAddressField('IP адрес')
     user_agent = models.TextField('User Agent', blank=True)
     
-    created_at = models.DateTimeField('Дата скачивания', auto_now_add=True)
+    # Не auto_now_add: события пишутся пачками с задержкой и хранят свое время
+    created_at = models.DateTimeField('Дата скачивания', default=timezone.now)
     
     class Meta:
         verbose_name = 'Скачивание'
         verbose_name_plural = 'Скачивания'
+        indexes = [models.Index(fields=['created_at'], name='games_download_created')]
         ordering = ['-created_at']
     
     def __str__(self):
@@ -205,3 +343,92 @@ class Wishlist(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.game.title}"
+
+
+class SimilarGame(models.Model):
+    """Похожая игра (рассчитывается заранее, см. games/similarity.py)"""
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='similar_links')
+    similar = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='similar_to')
+    score = models.FloatField('Сходство')
+    
+    class Meta:
+        verbose_name = 'Похожая игра'
+        verbose_name_plural = 'Похожие игры'
+        unique_together = ('game', 'similar')
+        indexes = [models.Index(fields=['game', '-score'], name='games_similar_game_score')]
+        ordering = ['-score']
+    
+    def __str__(self):
+        return f"{self.game.title} → {self.similar.title} ({self.score:.3f})"
+
+
+class GameRecommendation(models.Model):
+    """«Игроки также скачивали» (рассчитывается заранее, см. games/recommendations.py)"""
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='recommendation_links')
+    recommended = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='recommended_for_games')
+    score = models.FloatField('Оценка')
+    
+    class Meta:
+        verbose_name = 'Рекомендация к игре'
+        verbose_name_plural = 'Рекомендации к играм'
+        unique_together = ('game', 'recommended')
+        indexes = [models.Index(fields=['game', '-score'], name='games_recommendation_score')]
+        ordering = ['-score']
+    
+    def __str__(self):
+        return f"{self.game.title} → {self.recommended.title} ({self.score:.3f})"
+
+
+class UserRecommendation(models.Model):
+    """Персональная рекомендация игры (рассчитывается заранее, см. games/recommendations.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='game_recommendations')
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='recommended_for_users')
+    score = models.FloatField('Оценка')
+    
+    class Meta:
+        verbose_name = 'Рекомендация пользователю'
+        verbose_name_plural = 'Рекомендации пользователям'
+        unique_together = ('user', 'game')
+        indexes = [models.Index(fields=['user', '-score'], name='games_user_recommendation')]
+        ordering = ['-score']
+    
+    def __str__(self):
+        return f"{self.user.username} → {self.game.title} ({self.score:.3f})"
+
+
+class TrendingState(models.Model):
+    """Состояние инкрементального пересчета популярности (одна строка, см. games/trending.py)"""
+    last_download_id = models.BigIntegerField('Последнее учтенное скачивание', default=0)
+    updated_at = models.DateTimeField('Пересчитано', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Состояние популярности'
+        verbose_name_plural = 'Состояние популярности'
+    
+    def __str__(self):
+        return f"{self.last_download_id} ({self.updated_at})"
+
+
+class TopGame(models.Model):
+    """Позиция в топе недели или месяца, общем или по жанру (см. games/trending.py)"""
+    
+    PERIOD_CHOICES = [
+        ('week', 'Неделя'),
+        ('month', 'Месяц'),
+    ]
+    
+    period = models.CharField('Период', max_length=10, choices=PERIOD_CHOICES)
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name='top_games', null=True, blank=True)
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='top_positions')
+    position = models.PositiveIntegerField('Место')
+    downloads = models.PositiveIntegerField('Скачиваний за период')
+    
+    class Meta:
+        verbose_name = 'Игра в топе'
+        verbose_name_plural = 'Топ игр'
+        indexes = [models.Index(fields=['period', 'genre', 'position'], name='games_top_position')]
+        ordering = ['period', 'genre', 'position']
+    
+    def __str__(self):
+        genre = self.genre.name if self.genre else 'все жанры'
+        return f"{self.get_period_display()}, {genre}: {self.position}. {self.game.title}"
@@ -0,0 +1,130 @@
+# Денормализованный рейтинг игр
+#
+# Сумма, количество, средняя оценка, гистограмма 1–5 и байесовский рейтинг
+# хранятся в полях Game и меняются приращениями в той же транзакции, что и
+# сама оценка (сигналы в social/signals.py). Учитываются публичные отзывы
+# (social.Review) и простые оценки (social.GameRating); если пользователь
+# оставил и то и другое, учитываются обе.
+#
+# Байесовский рейтинг (PRIOR_WEIGHT * PRIOR_MEAN + сумма) / (PRIOR_WEIGHT + количество)
+# не дает игре с единственной пятеркой обогнать игру с сотней четверок.
+#
+# Настройки (settings.RATINGS):
+#   PRIOR_MEAN   — априорная средняя оценка
+#   PRIOR_WEIGHT — вес априорной оценки (в «голосах»)
+
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+
+
+DEFAULTS = {
+    'PRIOR_MEAN': 3.0,
+    'PRIOR_WEIGHT': 10,
+}
+
+STARS = range(1, 6)
+
+UPDATE_BATCH_SIZE = 500
+
+
+def _setting(name):
+    return getattr(settings, 'RATINGS', {}).get(name, DEFAULTS[name])
+
+
+def bayesian_score(total, count):
+    weight = _setting('PRIOR_WEIGHT')
+    return (weight * _setting('PRIOR_MEAN') + total) / (weight + count) if weight + count else 0.0
+
+
+def _score_updates():
+    """Выражения для средней и байесовской оценки по уже обновленным сумме и количеству"""
+    weight = _setting('PRIOR_WEIGHT')
+    total = Cast(F('rating_sum'), FloatField())
+    return {
+        'rating_average': Case(
+            When(rating_count=0, then=Value(0.0)),
+            default=total / F('rating_count'),
+            output_field=FloatField(),
+        ),
+        'rating_score': Case(
+            When(rating_count=0, then=Value(float(_setting('PRIOR_MEAN')) if weight else 0.0)),
+            default=(Value(weight * _setting('PRIOR_MEAN')) + total) / (Value(weight) + F('rating_count')),
+            output_field=FloatField(),
+        ),
+    }
+
+
+def apply(changes):
+    """
+    Применяет приращения оценок: changes — список (game_id, оценка, +1/-1).
+    По одному UPDATE на игру, в текущей транзакции.
+    """
+    from .models import Game
+
+    per_game = defaultdict(lambda: defaultdict(int))
+    for game_id, rating, delta in changes:
+        per_game[game_id][rating] += delta
+
+    with transaction.atomic(savepoint=False):
+        for game_id, deltas in per_game.items():
+            deltas = {rating: delta for rating, delta in deltas.items() if delta}
+            if not deltas:
+                continue
+            updates = {
+                'rating_sum': F('rating_sum') + sum(rating * delta for rating, delta in deltas.items()),
+                'rating_count': F('rating_count') + sum(deltas.values()),
+            }
+            for rating, delta in deltas.items():
+                updates[f'rating_{rating}'] = F(f'rating_{rating}') + delta
+            queryset = Game.objects.filter(pk=game_id)
+            queryset.update(**updates)
+            queryset.update(**_score_updates())
+
+
+def _source_aggregates(model, queryset_filter):
+    aggregates = {f'c{stars}': Count('id', filter=Q(rating=stars)) for stars in STARS}
+    return (
+        model.objects.filter(queryset_filter)
+        .values('game_id')
+        .annotate(total=Sum('rating'), count=Count('id'), **aggregates)
+    )
+
+
+def reconcile(apps=global_apps):
+    """
+    Пересчитывает рейтинг всех игр по таблицам оценок, исправляя накопившиеся
+    расхождения. Возвращает количество исправленных игр.
+    """
+    Game = apps.get_model('games', 'Game')
+    Review = apps.get_model('social', 'Review')
+    GameRating = apps.get_model('social', 'GameRating')
+
+    actual = defaultdict(lambda: {'rating_sum': 0, 'rating_count': 0, **{f'rating_{s}': 0 for s in STARS}})
+    for model, condition in ((Review, Q(is_public=True)), (GameRating, Q())):
+        for row in _source_aggregates(model, condition):
+            values = actual[row['game_id']]
+            values['rating_sum'] += row['total']
+            values['rating_count'] += row['count']
+            for stars in STARS:
+                values[f'rating_{stars}'] += row[f'c{stars}']
+
+    fields = ['rating_sum', 'rating_count'] + [f'rating_{stars}' for stars in STARS]
+    empty = dict.fromkeys(fields, 0)
+    drifted = []
+    for game in Game.objects.only('pk', *fields).iterator():
+        values = actual.get(game.pk, empty)
+        if any(getattr(game, field) != values[field] for field in fields):
+            for field in fields:
+                setattr(game, field, values[field])
+            drifted.append(game)
+
+    with transaction.atomic():
+        Game.objects.bulk_update(drifted, fields, batch_size=UPDATE_BATCH_SIZE)
+        # Средняя и байесовская оценки пересчитываются у всех: мог измениться PRIOR_*
+        Game.objects.update(**_score_updates())
+    return len(drifted)
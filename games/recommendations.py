@@ -0,0 +1,259 @@
+# Рекомендации «игроки также скачивали» и персональные рекомендации
+#
+# Пакетный расчет по взаимодействиям пользователей с играми: скачивания,
+# список желаний и высокие оценки (GameRating) складываются в разреженную
+# матрицу пользователь × игра (вес пары — максимум по источникам).
+#
+#   * Для игр: совместная встречаемость C = Bᵀ·B по бинарной матрице B,
+#     сходство C[i, j] / (sqrt(n_i · n_j) + SHRINKAGE) — косинус со сжатием,
+#     чтобы пары с парой общих игроков не попадали наверх. Хранится TOP_N
+#     игр с поддержкой не меньше MIN_SUPPORT (GameRecommendation).
+#   * Для пользователей: сумма сходств с играми, с которыми он уже
+#     взаимодействовал, с учетом весов; уже знакомые игры исключаются
+#     (UserRecommendation).
+#
+# Таблицы взаимодействий читаются кусками по CHUNK_SIZE строк (keyset по id),
+# а произведения матриц считаются пачками по BATCH_SIZE строк, поэтому
+# память ограничена числом уникальных пар, а не числом скачиваний.
+#
+# evaluate() — офлайн-оценка: для выборки пользователей одна игра
+# откладывается, модель строится без нее и проверяется, попала ли она в
+# TOP_N (hit rate), в сравнении с рекомендацией самых популярных игр.
+#
+# Настройки (settings.RECOMMENDATIONS):
+#   TOP_N       — длина списков
+#   CHUNK_SIZE  — строк таблиц взаимодействий за один запрос
+#   BATCH_SIZE  — строк матрицы за один шаг умножения
+#   MIN_SUPPORT — минимум общих пользователей у пары игр
+#   SHRINKAGE   — сжатие сходства для пар с малой поддержкой
+#   WEIGHTS     — веса источников: download, wishlist, rating
+#   MIN_RATING  — оценка, начиная с которой GameRating считается интересом
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from scipy import sparse
+
+from accounts.models import User
+from .models import Download, Game, GameRecommendation, UserRecommendation, Wishlist
+
+
+DEFAULTS = {
+    'TOP_N': 12,
+    'CHUNK_SIZE': 100000,
+    'BATCH_SIZE': 1024,
+    'MIN_SUPPORT': 2,
+    'SHRINKAGE': 10.0,
+    'WEIGHTS': {'download': 1.0, 'wishlist': 2.0, 'rating': 3.0},
+    'MIN_RATING': 4,
+}
+
+INSERT_BATCH_SIZE = 1000
+
+
+def _setting(name):
+    return getattr(settings, 'RECOMMENDATIONS', {}).get(name, DEFAULTS[name])
+
+
+def _chunks(queryset, fields, chunk_size):
+    """Строки queryset кусками по chunk_size (keyset по id, без OFFSET)"""
+    last = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last).order_by('pk').values_list('pk', *fields)[:chunk_size])
+        if not rows:
+            return
+        last = rows[-1][0]
+        yield rows
+
+
+def _sources():
+    from social.models import GameRating
+
+    weights = _setting('WEIGHTS')
+    return [
+        (Download.objects.filter(user__isnull=False), weights['download']),
+        (Wishlist.objects.all(), weights['wishlist']),
+        (GameRating.objects.filter(rating__gte=_setting('MIN_RATING')), weights['rating']),
+    ]
+
+
+def build_interactions(chunk_size=None):
+    """Разреженная матрица пользователь × игра (индексы — id)"""
+    chunk_size = chunk_size or _setting('CHUNK_SIZE')
+    shape = (
+        (User.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1,
+        (Game.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1,
+    )
+    matrix = sparse.csr_matrix(shape, dtype=np.float32)
+    for queryset, weight in _sources():
+        for rows in _chunks(queryset, ('user_id', 'game_id'), chunk_size):
+            users = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+            games = np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+            chunk = sparse.csr_matrix(
+                (np.ones(len(rows), dtype=np.float32), (users, games)), shape=shape
+            )
+            # Повторные скачивания не усиливают интерес: вес пары — вес источника
+            chunk.data[:] = weight
+            matrix = matrix.maximum(chunk)
+    return matrix
+
+
+def _published_mask(size):
+    mask = np.zeros(size, dtype=bool)
+    ids = np.fromiter(Game.objects.filter(is_published=True).values_list('pk', flat=True), dtype=np.int64)
+    mask[ids[ids < size]] = True
+    return mask
+
+
+def _top(columns, scores, top_n):
+    if len(scores) > top_n:
+        best = np.argpartition(-scores, top_n)[:top_n]
+        columns, scores = columns[best], scores[best]
+    order = np.argsort(-scores, kind='stable')
+    return [(int(columns[i]), float(scores[i])) for i in order]
+
+
+def item_neighbours(interactions, published):
+    """{game_id: [(game_id, score), ...]} по совместной встречаемости"""
+    top_n = _setting('TOP_N')
+    min_support = _setting('MIN_SUPPORT')
+    shrinkage = _setting('SHRINKAGE')
+    batch_size = _setting('BATCH_SIZE')
+
+    binary = interactions.copy()
+    binary.data[:] = 1
+    by_game = binary.T.tocsr()
+    counts = np.diff(by_game.indptr).astype(np.float64)
+    games = np.flatnonzero((counts > 0) & published)
+
+    result = {}
+    for start in range(0, len(games), batch_size):
+        batch = games[start:start + batch_size]
+        cooccurrence = (by_game[batch] @ binary).tocsr()
+        for offset, game in enumerate(batch):
+            begin, end = cooccurrence.indptr[offset], cooccurrence.indptr[offset + 1]
+            columns = cooccurrence.indices[begin:end]
+            support = cooccurrence.data[begin:end]
+            keep = (columns != game) & (support >= min_support) & published[columns]
+            columns, support = columns[keep], support[keep]
+            if not len(columns):
+                continue
+            scores = support / (np.sqrt(counts[game] * counts[columns]) + shrinkage)
+            result[int(game)] = _top(columns, scores, top_n)
+    return result
+
+
+def _similarity_matrix(neighbours, size):
+    rows, columns, data = [], [], []
+    for game, items in neighbours.items():
+        for other, score in items:
+            rows.append(game)
+            columns.append(other)
+            data.append(score)
+    return sparse.csr_matrix((data, (rows, columns)), shape=(size, size), dtype=np.float32)
+
+
+def user_recommendations(interactions, neighbours, users=None):
+    """Генератор (user_id, [(game_id, score), ...]) пачками пользователей"""
+    top_n = _setting('TOP_N')
+    batch_size = _setting('BATCH_SIZE')
+    similarity = _similarity_matrix(neighbours, interactions.shape[1])
+    if users is None:
+        users = np.flatnonzero(np.diff(interactions.indptr))
+
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        history = interactions[batch]
+        scores = (history @ similarity).tocsr()
+        for offset, user in enumerate(batch):
+            begin, end = scores.indptr[offset], scores.indptr[offset + 1]
+            columns, values = scores.indices[begin:end], scores.data[begin:end]
+            seen = history.indices[history.indptr[offset]:history.indptr[offset + 1]]
+            keep = ~np.isin(columns, seen) & (values > 0)
+            yield int(user), _top(columns[keep], values[keep], top_n)
+
+
+def rebuild(chunk_size=None):
+    """Пересчитывает обе таблицы рекомендаций, возвращает (игр, пользователей)"""
+    interactions = build_interactions(chunk_size)
+    published = _published_mask(interactions.shape[1])
+    neighbours = item_neighbours(interactions, published)
+
+    with transaction.atomic():
+        GameRecommendation.objects.all().delete()
+        GameRecommendation.objects.bulk_create(
+            [
+                GameRecommendation(game_id=game, recommended_id=other, score=score)
+                for game, items in neighbours.items()
+                for other, score in items
+            ],
+            batch_size=INSERT_BATCH_SIZE,
+        )
+
+        users = 0
+        batch = []
+        UserRecommendation.objects.all().delete()
+        for user, items in user_recommendations(interactions, neighbours):
+            batch.extend(UserRecommendation(user_id=user, game_id=game, score=score) for game, score in items)
+            users += bool(items)
+            if len(batch) >= INSERT_BATCH_SIZE:
+                UserRecommendation.objects.bulk_create(batch)
+                batch = []
+        UserRecommendation.objects.bulk_create(batch)
+    return len(neighbours), users
+
+
+def evaluate(sample=1000, seed=0, chunk_size=None):
+    """
+    Leave-one-out оценка: hit rate@TOP_N модели и популярного базиса,
+    покрытие каталога. Таблицы рекомендаций не меняются.
+    """
+    top_n = _setting('TOP_N')
+    rng = np.random.default_rng(seed)
+    interactions = build_interactions(chunk_size)
+    published = _published_mask(interactions.shape[1])
+
+    per_user = np.diff(interactions.indptr)
+    candidates = np.flatnonzero(per_user >= 2)
+    users = np.sort(rng.choice(candidates, size=min(sample, len(candidates)), replace=False))
+    if not len(users):
+        return {'users': 0, 'top_n': top_n}
+
+    held_out = {}
+    for user in users:
+        items = interactions.indices[interactions.indptr[user]:interactions.indptr[user + 1]]
+        held_out[int(user)] = int(rng.choice(items))
+    mask = sparse.csr_matrix(
+        (np.ones(len(held_out), dtype=np.float32), (list(held_out), list(held_out.values()))),
+        shape=interactions.shape,
+    )
+    train = (interactions - interactions.multiply(mask)).tocsr()
+    train.eliminate_zeros()
+
+    neighbours = item_neighbours(train, published)
+    hits = 0
+    recommended = set()
+    for user, items in user_recommendations(train, neighbours, users):
+        games = [game for game, _ in items]
+        recommended.update(games)
+        hits += held_out[user] in games
+
+    # Базис: самые популярные игры, которых у пользователя еще нет
+    popularity = np.asarray((train > 0).sum(axis=0)).ravel().astype(np.float64)
+    popularity[~published] = -1
+    ranked = np.argsort(-popularity, kind='stable')
+    baseline_hits = 0
+    for user in users:
+        seen = set(train.indices[train.indptr[user]:train.indptr[user + 1]].tolist())
+        top = [int(game) for game in ranked[:top_n + len(seen)] if game not in seen][:top_n]
+        baseline_hits += held_out[int(user)] in top
+
+    return {
+        'users': len(users),
+        'top_n': top_n,
+        'interactions': int(interactions.nnz),
+        'hit_rate': hits / len(users),
+        'baseline_hit_rate': baseline_hits / len(users),
+        'coverage': len(recommended) / max(int(published.sum()), 1),
+    }
@@ -0,0 +1,330 @@
+# Полнотекстовый поиск по каталогу игр
+#
+# SQLite: виртуальная таблица FTS5 games_game_fts (rowid = id игры), в которую
+# пишутся уже застемленные русские слова — встроенный токенайзер SQLite
+# русскую морфологию не знает.
+# PostgreSQL: таблица games_game_search с колонкой tsvector и GIN-индексом,
+# стемминг выполняет сам PostgreSQL (конфигурация 'russian').
+# Остальные СУБД используют прежний поиск через icontains.
+
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+SearchDocument = namedtuple('SearchDocument', 'game_id title short_description description tags')
+
+FTS_TABLE = 'games_game_fts'
+PG_TABLE = 'games_game_search'
+
+# Веса колонок FTS5 при ранжировании (bm25), в порядке колонок: название, краткое описание, описание, теги
+SQLITE_WEIGHTS = (10.0, 3.0, 1.0, 5.0)
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+# --- Стемминг (Snowball, русский) ---
+
+RU_VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    (('в', 'вши', 'вшись'), True),
+    (('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'), False),
+)
+REFLEXIVE = ((('ся', 'сь'), False),)
+ADJECTIVE = ((('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым',
+               'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею'), False),)
+PARTICIPLE = (
+    (('ем', 'нн', 'вш', 'ющ', 'щ'), True),
+    (('ивш', 'ывш', 'ующ'), False),
+)
+VERB = (
+    (('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет', 'ют', 'ны', 'ть',
+      'ешь', 'нно'), True),
+    (('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым',
+      'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую',
+      'ю'), False),
+)
+NOUN = ((('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией', 'ей',
+          'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы',
+          'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я'), False),)
+SUPERLATIVE = ((('ейш', 'ейше'), False),)
+DERIVATIONAL = ((('ост', 'ость'), False),)
+
+
+def _strip_ending(word, groups):
+    """Отрезает самое длинное подходящее окончание, возвращает None если его нет"""
+    best = None
+    for endings, after_a in groups:
+        for ending in endings:
+            if not word.endswith(ending) or (best and len(ending) <= len(best)):
+                continue
+            if after_a and not word[:-len(ending)].endswith(('а', 'я')):
+                continue
+            best = ending
+    if best is None:
+        return None
+    return word[:-len(best)]
+
+
+def _region_start(word, start):
+    for i in range(start + 1, len(word)):
+        if word[i] not in RU_VOWELS and word[i - 1] in RU_VOWELS:
+            return i + 1
+    return len(word)
+
+
+def stem_ru(word):
+    """Русский стеммер Snowball"""
+    word = word.lower().replace('ё', 'е')
+    rv = next((i + 1 for i, ch in enumerate(word) if ch in RU_VOWELS), len(word))
+    r2 = _region_start(word, _region_start(word, 0))
+    prefix, rest = word[:rv], word[rv:]
+
+    # Шаг 1
+    stripped = _strip_ending(rest, PERFECTIVE_GERUND)
+    if stripped is None:
+        unreflexive = _strip_ending(rest, REFLEXIVE)
+        if unreflexive is not None:
+            rest = unreflexive
+        stripped = _strip_ending(rest, ADJECTIVE)
+        if stripped is not None:
+            participle = _strip_ending(stripped, PARTICIPLE)
+            if participle is not None:
+                stripped = participle
+        else:
+            stripped = _strip_ending(rest, VERB)
+            if stripped is None:
+                stripped = _strip_ending(rest, NOUN)
+    if stripped is not None:
+        rest = stripped
+
+    # Шаг 2
+    if rest.endswith('и'):
+        rest = rest[:-1]
+
+    # Шаг 3: словообразовательные окончания только в R2
+    stripped = _strip_ending(rest, DERIVATIONAL)
+    if stripped is not None and len(prefix) + len(stripped) >= r2:
+        rest = stripped
+
+    # Шаг 4
+    if rest.endswith('нн'):
+        rest = rest[:-1]
+    else:
+        stripped = _strip_ending(rest, SUPERLATIVE)
+        if stripped is not None:
+            rest = stripped[:-1] if stripped.endswith('нн') else stripped
+        elif rest.endswith('ь'):
+            rest = rest[:-1]
+
+    return prefix + rest
+
+
+def tokenize(text):
+    """Разбивает текст на нормализованные слова"""
+    tokens = []
+    for word in WORD_RE.findall((text or '').lower()):
+        if any('а' <= ch <= 'я' or ch == 'ё' for ch in word):
+            word = stem_ru(word)
+        tokens.append(word)
+    return tokens
+
+
+def normalize(text):
+    return ' '.join(tokenize(text))
+
+
+# --- Бэкенды ---
+
+def _empty(queryset):
+    return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class FallbackSearchBackend:
+    """Поиск через icontains (для СУБД без полнотекстового индекса)"""
+
+    def filter(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(short_description__icontains=query) |
+            Q(tags__name__icontains=query)
+        ).distinct().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    def index(self, documents):
+        pass
+
+    def remove(self, game_ids):
+        pass
+
+    def clear(self):
+        pass
+
+
+class SQLiteSearchBackend:
+    """FTS5 + bm25"""
+
+    def _match(self, query):
+        tokens = tokenize(query)
+        return ' '.join('"%s"*' % token.replace('"', '""') for token in tokens)
+
+    def filter(self, queryset, query):
+        match = self._match(query)
+        if not match:
+            return _empty(queryset)
+        weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (match,))
+        ).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = games_game.id',
+            (match,),
+            output_field=FloatField(),
+        ))
+
+    def index(self, documents):
+        documents = list(documents)
+        if not documents:
+            return
+        self.remove([doc.game_id for doc in documents])
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, short_description, description, tags) '
+                f'VALUES (%s, %s, %s, %s, %s)',
+                [
+                    (doc.game_id, normalize(doc.title), normalize(doc.short_description),
+                     normalize(doc.description), normalize(doc.tags))
+                    for doc in documents
+                ]
+            )
+
+    def remove(self, game_ids):
+        game_ids = list(game_ids)
+        if not game_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(game_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', game_ids)
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+
+class PostgresSearchBackend:
+    """tsvector + GIN, ранжирование ts_rank_cd"""
+
+    DOCUMENT_SQL = (
+        "setweight(to_tsvector('russian', %s), 'A') || "
+        "setweight(to_tsvector('russian', %s), 'B') || "
+        "setweight(to_tsvector('russian', %s), 'C') || "
+        "setweight(to_tsvector('russian', %s), 'D')"
+    )
+
+    def _tsquery(self, query):
+        return ' & '.join(f'{word}:*' for word in WORD_RE.findall(query.lower()))
+
+    def filter(self, queryset, query):
+        tsquery = self._tsquery(query)
+        if not tsquery:
+            return _empty(queryset)
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT game_id FROM {PG_TABLE} WHERE document @@ to_tsquery('russian', %s)",
+                (tsquery,)
+            )
+        ).annotate(search_rank=RawSQL(
+            f"SELECT ts_rank_cd(document, to_tsquery('russian', %s)) FROM {PG_TABLE} "
+            f"WHERE game_id = games_game.id",
+            (tsquery,),
+            output_field=FloatField(),
+        ))
+
+    def index(self, documents):
+        documents = list(documents)
+        if not documents:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {PG_TABLE} (game_id, document) VALUES (%s, {self.DOCUMENT_SQL}) '
+                f'ON CONFLICT (game_id) DO UPDATE SET document = EXCLUDED.document',
+                [
+                    (doc.game_id, doc.title, doc.tags, doc.short_description, doc.description)
+                    for doc in documents
+                ]
+            )
+
+    def remove(self, game_ids):
+        game_ids = list(game_ids)
+        if not game_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {PG_TABLE} WHERE game_id = ANY(%s)', [game_ids])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {PG_TABLE}')
+
+
+_backend = None
+
+
+def get_backend():
+    """Бэкенд поиска для текущей СУБД"""
+    global _backend
+    if _backend is None:
+        tables = connection.introspection.table_names(include_views=True)
+        if connection.vendor == 'sqlite' and FTS_TABLE in tables:
+            _backend = SQLiteSearchBackend()
+        elif connection.vendor == 'postgresql' and PG_TABLE in tables:
+            _backend = PostgresSearchBackend()
+        else:
+            _backend = FallbackSearchBackend()
+    return _backend
+
+
+# --- Публичный API ---
+
+def search_games(queryset, query):
+    """Фильтрует queryset игр по запросу и добавляет аннотацию search_rank"""
+    return get_backend().filter(queryset, query)
+
+
+def build_document(game):
+    return SearchDocument(
+        game.pk, game.title, game.short_description, game.description,
+        ' '.join(tag.name for tag in game.tags.all())
+    )
+
+
+def index_games(games):
+    """Обновляет индекс для переданных игр"""
+    get_backend().index(build_document(game) for game in games)
+
+
+def remove_games(game_ids):
+    get_backend().remove(game_ids)
+
+
+def rebuild_index(batch_size=500):
+    """Полностью перестраивает индекс, возвращает количество проиндексированных игр"""
+    from .models import Game
+
+    backend = get_backend()
+    backend.clear()
+
+    total = 0
+    batch = []
+    games = Game.objects.prefetch_related('tags').order_by('pk')
+    for game in games.iterator(chunk_size=batch_size):
+        batch.append(build_document(game))
+        if len(batch) >= batch_size:
+            backend.index(batch)
+            total += len(batch)
+            batch = []
+    backend.index(batch)
+    return total + len(batch)
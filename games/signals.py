@@ -0,0 +1,97 @@
+# Сигналы приложения games
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from core import images
+from . import search, storage
+from .models import Game, GameFile, GameImage, StoredBlob
+
+
+# Поля с изображениями, для которых строятся уменьшенные копии (core/images.py)
+IMAGE_FIELDS = {
+    Game: ('cover_image', 'banner_image'),
+    GameImage: ('image',),
+}
+
+
+def mark_similarity_stale(game_ids):
+    """Похожие игры для game_ids пересчитает rebuild_similar_games --stale"""
+    Game.objects.filter(pk__in=game_ids, similarity_stale=False).update(similarity_stale=True)
+
+
+@receiver(post_save, sender=Game)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    """Переиндексирует игру после сохранения"""
+    if raw:
+        return
+    search.index_games([instance])
+    mark_similarity_stale([instance.pk])
+
+
+@receiver(post_delete, sender=Game)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_games([instance.pk])
+
+
+@receiver(m2m_changed, sender=Game.tags.through)
+def update_search_index_on_tags(sender, instance, action, **kwargs):
+    """Теги входят в поисковый документ — переиндексируем при их изменении"""
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, Game):
+        search.index_games([instance])
+        mark_similarity_stale([instance.pk])
+
+
+@receiver(m2m_changed, sender=Game.genres.through)
+def mark_similarity_stale_on_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        mark_similarity_stale([instance.pk])
+    elif pk_set:
+        # Изменение со стороны жанра (genre.games.add(...))
+        mark_similarity_stale(pk_set)
+
+
+@receiver(post_delete, sender=GameFile)
+def release_stored_blob(sender, instance, **kwargs):
+    """Снимает ссылку на содержимое файла; файл удаляется вместе с последней ссылкой"""
+    if StoredBlob.owns(instance.file.name):
+        storage.release(instance.checksum)
+
+
+@receiver(pre_save, sender=Game)
+@receiver(pre_save, sender=GameImage)
+def remember_image_names(sender, instance, raw=False, **kwargs):
+    """Запоминает прежние имена изображений, чтобы заметить замену"""
+    fields = IMAGE_FIELDS[sender]
+    instance._previous_images = {}
+    if instance.pk and not raw:
+        instance._previous_images = sender.objects.filter(pk=instance.pk).values(*fields).first() or {}
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_save, sender=GameImage)
+def update_image_variants(sender, instance, raw=False, **kwargs):
+    """Строит копии нового изображения и удаляет копии замененного"""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_images', {})
+    for field in IMAGE_FIELDS[sender]:
+        name = getattr(instance, field).name or ''
+        old_name = previous.get(field) or ''
+        if name == old_name:
+            continue
+        if name:
+            transaction.on_commit(lambda name=name: images.process(name))
+        if old_name:
+            transaction.on_commit(lambda name=old_name: images.delete_variants(name))
+
+
+@receiver(post_delete, sender=Game)
+@receiver(post_delete, sender=GameImage)
+def delete_image_variants(sender, instance, **kwargs):
+    for field in IMAGE_FIELDS[sender]:
+        name = getattr(instance, field).name
+        if name:
+            transaction.on_commit(lambda name=name: images.delete_variants(name))
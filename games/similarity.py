@@ -0,0 +1,175 @@
+# Расчет похожих игр
+#
+# Каждая опубликованная игра — разреженный вектор признаков: жанры и теги
+# (теги взвешены по IDF, чтобы редкий тег значил больше частого). Сходство —
+# косинус между векторами; к нему примешивается «качество» кандидата
+# (скачивания и рейтинг), чтобы среди одинаково похожих выше были лучшие.
+# Для каждой игры сохраняются TOP_K соседей в SimilarGame, страница игры
+# читает их одним запросом по индексу (game, -score).
+#
+# Матрица сходства считается пачками строк (BATCH_SIZE x N, разреженное
+# произведение), поэтому память не растет как N².
+#
+# Пересчет — командой rebuild_similar_games: полностью или только для игр,
+# которые сохранялись или у которых изменились жанры и теги
+# (Game.similarity_stale, отмечается сигналами). Изменения скачиваний и
+# рейтинга учитываются при полном пересчете.
+#
+# Настройки (settings.SIMILAR_GAMES):
+#   TOP_K          — сколько соседей хранить
+#   BATCH_SIZE     — строк матрицы сходства за один шаг
+#   GENRE_WEIGHT   — вес жанров относительно тегов
+#   TAG_WEIGHT     — вес тегов
+#   QUALITY_WEIGHT — доля «качества» кандидата в итоговой оценке (0..1)
+
+import numpy as np
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from scipy import sparse
+
+from .models import Game, SimilarGame
+
+
+DEFAULTS = {
+    'TOP_K': 12,
+    'BATCH_SIZE': 512,
+    'GENRE_WEIGHT': 1.0,
+    'TAG_WEIGHT': 1.0,
+    'QUALITY_WEIGHT': 0.15,
+}
+
+INSERT_BATCH_SIZE = 1000
+
+
+def _setting(name):
+    return getattr(settings, 'SIMILAR_GAMES', {}).get(name, DEFAULTS[name])
+
+
+class FeatureMatrix:
+    """Нормированные векторы признаков опубликованных игр"""
+
+    def __init__(self):
+        games = list(
+            Game.objects.filter(is_published=True)
+            .order_by('pk')
+            .values_list('pk', 'download_count', 'rating_score')
+        )
+        self.ids = np.array([pk for pk, _, _ in games], dtype=np.int64)
+        self.index = {pk: i for i, pk in enumerate(self.ids.tolist())}
+
+        genre_pairs = Game.genres.through.objects.filter(game_id__in=self.index).values_list('game_id', 'genre_id')
+        content_type = ContentType.objects.get_for_model(Game)
+        tag_pairs = Game.tags.through.objects.filter(
+            content_type=content_type, object_id__in=self.index
+        ).values_list('object_id', 'tag_id')
+
+        genres = self._block(genre_pairs, idf=False) * _setting('GENRE_WEIGHT')
+        tags = self._block(tag_pairs, idf=True) * _setting('TAG_WEIGHT')
+        matrix = sparse.hstack([genres, tags], format='csr')
+
+        # Нормируем строки: скалярное произведение становится косинусом
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        self.matrix = sparse.diags(1.0 / norms) @ matrix
+        self.matrix = self.matrix.tocsr()
+        self.matrix_t = self.matrix.T.tocsc()
+
+        downloads = np.log1p(np.array([count for _, count, _ in games], dtype=np.float64))
+        ratings = np.array([score for _, _, score in games], dtype=np.float64)
+        self.quality = 0.5 * (downloads / downloads.max() if len(games) and downloads.max() else downloads)
+        self.quality += 0.5 * np.clip((ratings - 1) / 4, 0, 1)
+
+    def _block(self, pairs, idf):
+        rows, columns = [], []
+        column_index = {}
+        for game_id, feature_id in pairs:
+            rows.append(self.index[game_id])
+            columns.append(column_index.setdefault(feature_id, len(column_index)))
+        data = np.ones(len(rows), dtype=np.float64)
+        block = sparse.csr_matrix((data, (rows, columns)), shape=(len(self.ids), len(column_index)))
+        if idf and len(column_index):
+            document_frequency = np.bincount(columns, minlength=len(column_index))
+            weights = np.log((1 + len(self.ids)) / (1 + document_frequency)) + 1
+            block = block @ sparse.diags(weights)
+        return block.tocsr()
+
+    def neighbours(self, rows):
+        """{game_id: [(similar_id, score), ...]} для строк rows"""
+        top_k = _setting('TOP_K')
+        quality_weight = _setting('QUALITY_WEIGHT')
+        result = {}
+        rows = np.asarray(rows, dtype=np.int64)
+        for start in range(0, len(rows), _setting('BATCH_SIZE')):
+            batch = rows[start:start + _setting('BATCH_SIZE')]
+            similarity = (self.matrix[batch] @ self.matrix_t).tocsr()
+            for offset, row in enumerate(batch):
+                begin, end = similarity.indptr[offset], similarity.indptr[offset + 1]
+                columns = similarity.indices[begin:end]
+                scores = similarity.data[begin:end]
+                keep = (columns != row) & (scores > 0)
+                columns, scores = columns[keep], scores[keep]
+                scores = (1 - quality_weight) * scores + quality_weight * self.quality[columns]
+                if len(scores) > top_k:
+                    best = np.argpartition(-scores, top_k)[:top_k]
+                    columns, scores = columns[best], scores[best]
+                order = np.argsort(-scores, kind='stable')
+                result[int(self.ids[row])] = [
+                    (int(self.ids[columns[i]]), float(scores[i])) for i in order
+                ]
+        return result
+
+    def affected_rows(self, game_ids):
+        """Строки игр game_ids и всех игр, имеющих с ними общий признак"""
+        rows = [self.index[pk] for pk in game_ids if pk in self.index]
+        if not rows:
+            return []
+        overlap = self.matrix[rows] @ self.matrix_t
+        return sorted(set(rows) | set(overlap.indices.tolist()))
+
+
+def _store(neighbours):
+    objects = [
+        SimilarGame(game_id=game_id, similar_id=similar_id, score=score)
+        for game_id, items in neighbours.items()
+        for similar_id, score in items
+    ]
+    SimilarGame.objects.bulk_create(objects, batch_size=INSERT_BATCH_SIZE)
+    return len(objects)
+
+
+def rebuild():
+    """Полный пересчет, возвращает (игр, связей)"""
+    features = FeatureMatrix()
+    neighbours = features.neighbours(range(len(features.ids)))
+    with transaction.atomic():
+        SimilarGame.objects.all().delete()
+        links = _store(neighbours)
+        Game.objects.filter(similarity_stale=True).update(similarity_stale=False)
+    return len(neighbours), links
+
+
+def update_stale():
+    """
+    Пересчет только для игр с similarity_stale и их соседей по признакам,
+    возвращает (игр, связей).
+    """
+    stale = list(Game.objects.filter(similarity_stale=True).values_list('pk', flat=True))
+    if not stale:
+        return 0, 0
+    features = FeatureMatrix()
+    # Игры, у которых устаревшие сейчас в соседях, пересчитываем тоже:
+    # общих признаков может уже не остаться
+    listed_by = SimilarGame.objects.filter(similar_id__in=stale).values_list('game_id', flat=True)
+    rows = set(features.affected_rows(stale))
+    rows.update(features.index[pk] for pk in listed_by if pk in features.index)
+    rows = sorted(rows)
+    neighbours = features.neighbours(rows)
+    with transaction.atomic():
+        # Снятые с публикации игры не должны оставаться ничьими соседями
+        unpublished = [pk for pk in stale if pk not in features.index]
+        SimilarGame.objects.filter(similar_id__in=unpublished).delete()
+        SimilarGame.objects.filter(game_id__in=set(stale) | set(neighbours)).delete()
+        links = _store(neighbours)
+        Game.objects.filter(pk__in=stale).update(similarity_stale=False)
+    return len(neighbours), links
@@ -0,0 +1,119 @@
+# Хранилище файлов игр с адресацией по содержимому
+#
+# Файл сборки лежит в games/blobs/ab/cd/<sha256> и хранится один раз, сколько
+# бы GameFile (разные версии, платформы, повторные загрузки) на него ни
+# ссылались. StoredBlob.ref_count — число таких ссылок; когда последняя
+# ссылка удаляется, после коммита удаляется и файл.
+#
+# SHA-256 и размер считаются за один проход по загруженному файлу; если такое
+# содержимое уже есть, повторная запись на диск не выполняется.
+
+import hashlib
+import os
+import uuid
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import StoredBlob
+
+
+READ_SIZE = 1024 * 1024
+
+
+def _digest(file):
+    """SHA-256 и размер файла за один проход"""
+    hasher = hashlib.sha256()
+    size = 0
+    file.seek(0)
+    for chunk in file.chunks(READ_SIZE):
+        hasher.update(chunk)
+        size += len(chunk)
+    file.seek(0)
+    return hasher.hexdigest(), size
+
+
+def _write(file, path):
+    """Кладет содержимое загруженного файла по пути path"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if hasattr(file, 'temporary_file_path'):
+        # Большие загрузки уже лежат во временном файле — просто переносим
+        file_move_safe(file.temporary_file_path(), path, allow_overwrite=True)
+        return
+    # Пишем рядом и переименовываем, чтобы не оставить наполовину записанный blob
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp_path, 'wb') as target:
+        for chunk in file.chunks(READ_SIZE):
+            target.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def _acquire(sha256, size, store):
+    """
+    Увеличивает счетчик ссылок на содержимое (создает запись при первой
+    ссылке) и вызывает store(path), если файла еще нет на диске.
+    """
+    for _ in range(3):
+        try:
+            with transaction.atomic():
+                blob, created = StoredBlob.objects.select_for_update().get_or_create(
+                    sha256=sha256, defaults={'size': size}
+                )
+                StoredBlob.objects.filter(pk=sha256).update(ref_count=F('ref_count') + 1)
+                path = default_storage.path(blob.name)
+                if not os.path.exists(path):
+                    store(path)
+                blob.ref_count += 1
+                return blob
+        except IntegrityError:
+            # Ту же запись одновременно создал другой процесс — повторяем
+            continue
+    raise IntegrityError(f'Не удалось сохранить содержимое {sha256}')
+
+
+def ingest_file(file):
+    """Сохраняет загруженный файл (UploadedFile/File), возвращает StoredBlob"""
+    sha256, size = _digest(file)
+    return _acquire(sha256, size, lambda path: _write(file, path))
+
+
+def ingest_path(path, sha256, size):
+    """
+    Сохраняет файл, уже собранный на диске (с известным хешем), например
+    завершенную возобновляемую загрузку. Исходный файл переносится или удаляется.
+    """
+    def store(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+
+    blob = _acquire(sha256, size, store)
+    if os.path.exists(path):
+        # Такое содержимое уже было — дубликат не нужен
+        os.unlink(path)
+    return blob
+
+
+def release(sha256):
+    """Снимает ссылку на содержимое; последняя ссылка удаляет файл"""
+    with transaction.atomic():
+        blob = StoredBlob.objects.select_for_update().filter(pk=sha256).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            StoredBlob.objects.filter(pk=sha256).update(ref_count=F('ref_count') - 1)
+            return
+        name = blob.name
+        blob.delete()
+    # Файл удаляется только после коммита: при откате запись и GameFile
+    # вернутся, и содержимое должно остаться на диске
+    transaction.on_commit(lambda: _delete_unreferenced(sha256, name))
+
+
+def _delete_unreferenced(sha256, name):
+    """Удаляет файл, если за время до коммита на содержимое не появилась новая ссылка"""
+    with transaction.atomic():
+        if StoredBlob.objects.select_for_update().filter(pk=sha256).exists():
+            return
+        default_storage.delete(name)
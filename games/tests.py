@@ -0,0 +1,487 @@
+import base64
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from .delivery import parse_range
+from .models import Download, Game, GameFile, StoredBlob, UploadSession
+from social.models import GameRating, Review
+from . import ratings, search, uploads
+
+
+def make_user(username='dev', **kwargs):
+    return User.objects.create_user(username=username, email=f'{username}@example.com', password='x', **kwargs)
+
+
+def make_game(developer, title, **kwargs):
+    kwargs.setdefault('description', '')
+    kwargs.setdefault('short_description', '')
+    kwargs.setdefault('is_published', True)
+    return Game.objects.create(developer=developer, title=title, slug=kwargs.pop('slug', None) or title, **kwargs)
+
+
+class TempMediaMixin:
+    """MEDIA_ROOT во временном каталоге на время тестов класса"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media_root = tempfile.mkdtemp()
+        cls._media_override = override_settings(MEDIA_ROOT=cls._media_root)
+        cls._media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._media_override.disable()
+        shutil.rmtree(cls._media_root, ignore_errors=True)
+
+
+def make_file(game, content, name='build.zip', **kwargs):
+    game_file = GameFile(game=game, name=name, platform='windows', **kwargs)
+    game_file.file = SimpleUploadedFile(name, content)
+    game_file.save()
+    return game_file
+
+
+class SearchTests(TestCase):
+    """Полнотекстовый поиск по каталогу (games/search.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.developer = make_user(is_developer=True)
+
+    def search(self, query):
+        return list(
+            search.search_games(Game.objects.all(), query)
+            .order_by('-search_rank', 'id')
+            .values_list('title', flat=True)
+        )
+
+    def test_stemming_matches_other_word_forms(self):
+        make_game(self.developer, 'Космический корабль', slug='ship')
+        self.assertEqual(self.search('космические корабли'), ['Космический корабль'])
+
+    def test_prefix_match(self):
+        make_game(self.developer, 'Подземелья', slug='dungeons')
+        self.assertEqual(self.search('подзем'), ['Подземелья'])
+
+    def test_title_outranks_description(self):
+        make_game(self.developer, 'Ферма', description='Дракон прилетает редко', slug='farm')
+        make_game(self.developer, 'Дракон', description='Ферма у реки', slug='dragon')
+        self.assertEqual(self.search('дракон'), ['Дракон', 'Ферма'])
+
+    def test_tags_are_indexed(self):
+        game = make_game(self.developer, 'Без названия', slug='untitled')
+        game.tags.add('рогалик')
+        self.assertEqual(self.search('рогалик'), ['Без названия'])
+
+    def test_empty_query_finds_nothing(self):
+        make_game(self.developer, 'Игра', slug='game')
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_update_and_delete_keep_index_in_sync(self):
+        game = make_game(self.developer, 'Старое имя', slug='renamed')
+        game.title = 'Новое имя'
+        game.save()
+        self.assertEqual(self.search('старое'), [])
+        self.assertEqual(self.search('новое'), ['Новое имя'])
+
+        game.delete()
+        self.assertEqual(self.search('новое'), [])
+
+    def test_rebuild_index(self):
+        make_game(self.developer, 'Гонки', slug='racing')
+        search.get_backend().clear()
+        self.assertEqual(self.search('гонки'), [])
+
+        self.assertEqual(search.rebuild_index(), 1)
+        self.assertEqual(self.search('гонки'), ['Гонки'])
+
+
+class ParseRangeTests(TestCase):
+    """Разбор заголовка Range (games/delivery.py)"""
+
+    def test_single_and_open_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), [(0, 99)])
+        self.assertEqual(parse_range('bytes=900-', 1000), [(900, 999)])
+        self.assertEqual(parse_range('bytes=-100', 1000), [(900, 999)])
+        self.assertEqual(parse_range('bytes=990-2000', 1000), [(990, 999)])
+
+    def test_overlapping_and_adjacent_ranges_are_merged(self):
+        self.assertEqual(parse_range('bytes=50-99,0-49,200-299,250-260', 1000), [(0, 99), (200, 299)])
+
+    def test_unsatisfiable(self):
+        self.assertEqual(parse_range('bytes=1000-1100', 1000), [])
+        self.assertEqual(parse_range('bytes=-0', 1000), [])
+
+    def test_invalid_header_means_whole_file(self):
+        for header in (None, '', 'items=0-1', 'bytes=5-1', 'bytes=-', 'bytes=a-b'):
+            self.assertIsNone(parse_range(header, 1000), header)
+        self.assertIsNone(parse_range('bytes=' + ','.join(f'{i * 10}-{i * 10 + 1}' for i in range(21)), 1000))
+
+
+@override_settings(
+    FILE_DELIVERY={'BACKEND': 'python'},
+    DOWNLOAD_LOG={'ASYNC': False, 'DEDUP_WINDOW': 60},
+    COUNTERS={'BACKEND': 'local', 'FLUSH_INTERVAL': 0},
+)
+class DownloadTests(TempMediaMixin, TestCase):
+    """Скачивание файла: Range, If-Range, ETag и учет скачиваний"""
+
+    CONTENT = bytes(range(256)) * 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.game = make_game(make_user(is_developer=True), 'Игра', slug='game')
+        cls.game_file = make_file(cls.game, cls.CONTENT)
+        cls.url = f'/games/{cls.game.slug}/download/{cls.game_file.pk}/'
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def downloads(self):
+        return Download.objects.filter(game=self.game).count()
+
+    def test_full_download(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.CONTENT)
+        self.assertEqual(response['ETag'], f'"{self.game_file.checksum}"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('build.zip', response['Content-Disposition'])
+
+    def test_single_range(self):
+        response, body = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.CONTENT[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.CONTENT)}')
+        self.assertEqual(response['Content-Length'], '10')
+
+    def test_multiple_ranges(self):
+        response, body = self.get(HTTP_RANGE='bytes=0-1,100-101')
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response['Content-Type'].startswith('multipart/byteranges'))
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertIn(b'Content-Range: bytes 0-1/1024', body)
+        self.assertIn(b'Content-Range: bytes 100-101/1024', body)
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.get(HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_if_none_match(self):
+        response, body = self.get(HTTP_IF_NONE_MATCH=f'W/"{self.game_file.checksum}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(body, b'')
+        self.assertEqual(self.downloads(), 0)
+
+    def test_if_range_with_other_etag_sends_whole_file(self):
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.CONTENT)
+
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=f'"{self.game_file.checksum}"')
+        self.assertEqual(response.status_code, 206)
+
+    def test_file_without_checksum_has_no_etag(self):
+        GameFile.objects.filter(pk=self.game_file.pk).update(checksum='')
+        response, _ = self.get(HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_ranges_after_full_download_are_counted_once(self):
+        self.get()
+        self.get(HTTP_RANGE='bytes=0-99')
+        self.get(HTTP_RANGE='bytes=100-199')
+        self.assertEqual(self.downloads(), 1)
+        self.assertEqual(GameFile.objects.get(pk=self.game_file.pk).download_count, 1)
+
+        # Новый полный GET — новое скачивание
+        self.get()
+        self.assertEqual(self.downloads(), 2)
+
+
+class UploadTests(TempMediaMixin, TestCase):
+    """Возобновляемая загрузка по tus (games/uploads.py)"""
+
+    CONTENT = os.urandom(3000)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._uploads_override = override_settings(
+            CHUNKED_UPLOADS={'TEMP_DIR': os.path.join(cls._media_root, 'uploads')}
+        )
+        cls._uploads_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._uploads_override.disable()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.developer = make_user(is_developer=True)
+        cls.game = make_game(cls.developer, 'Игра', slug='game')
+
+    def setUp(self):
+        self.client.force_login(self.developer)
+
+    def create(self, length=None, **metadata):
+        metadata = {'filename': 'build.zip', 'platform': 'windows', **metadata}
+        encoded = ','.join(f'{key} {base64.b64encode(value.encode()).decode()}' for key, value in metadata.items())
+        response = self.client.post(
+            f'/games/{self.game.slug}/uploads/',
+            HTTP_TUS_RESUMABLE=uploads.TUS_VERSION,
+            HTTP_UPLOAD_LENGTH=str(len(self.CONTENT) if length is None else length),
+            HTTP_UPLOAD_METADATA=encoded,
+        )
+        self.assertEqual(response.status_code, 201)
+        return response['Location']
+
+    def patch(self, url, offset, data):
+        return self.client.generic(
+            'PATCH', url, data,
+            content_type='application/offset+octet-stream',
+            HTTP_TUS_RESUMABLE=uploads.TUS_VERSION,
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def offset(self, url):
+        return int(self.client.head(url, HTTP_TUS_RESUMABLE=uploads.TUS_VERSION)['Upload-Offset'])
+
+    def session(self):
+        return UploadSession.objects.get()
+
+    def test_chunks_assemble_into_game_file(self):
+        url = self.create()
+        self.assertEqual(self.offset(url), 0)
+
+        response = self.patch(url, 0, self.CONTENT[:1000])
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response['Upload-Offset'], '1000')
+        self.assertEqual(self.offset(url), 1000)
+
+        self.patch(url, 1000, self.CONTENT[1000:])
+        game_file = self.session().game_file
+        self.assertIsNotNone(game_file)
+        self.assertEqual(game_file.checksum, hashlib.sha256(self.CONTENT).hexdigest())
+        self.assertEqual(game_file.file_size, len(self.CONTENT))
+        self.assertEqual(game_file.filename, 'build.zip')
+        with game_file.file.open('rb') as f:
+            self.assertEqual(f.read(), self.CONTENT)
+        self.assertFalse(os.path.exists(uploads.part_path(self.session())))
+
+    def test_wrong_offset_is_rejected(self):
+        url = self.create()
+        self.patch(url, 0, self.CONTENT[:1000])
+        self.assertEqual(self.patch(url, 500, self.CONTENT[500:1000]).status_code, 409)
+        self.assertEqual(self.offset(url), 1000)
+
+    def test_wrong_content_type_is_rejected(self):
+        url = self.create()
+        response = self.client.generic('PATCH', url, b'x', content_type='text/plain', HTTP_UPLOAD_OFFSET='0')
+        self.assertEqual(response.status_code, 415)
+
+    def test_resume_after_interrupted_chunk(self):
+        self.create()
+        session = self.session()
+        # Клиент обещал весь файл, но соединение оборвалось на 1200 байтах
+        offset = uploads.append_chunk(session, 0, io.BytesIO(self.CONTENT[:1200]), len(self.CONTENT))
+        self.assertEqual(offset, 1200)
+
+        # Следующий кусок пришел в другой процесс: хеш восстанавливается по принятой части
+        uploads._hashers.clear()
+        uploads.append_chunk(self.session(), 1200, io.BytesIO(self.CONTENT[1200:]), None)
+        self.assertEqual(self.session().game_file.checksum, hashlib.sha256(self.CONTENT).hexdigest())
+
+    def test_chunk_extends_expiry(self):
+        self.create()
+        UploadSession.objects.update(expires_at=timezone.now() + timedelta(seconds=5))
+        uploads.append_chunk(self.session(), 0, io.BytesIO(self.CONTENT[:10]), 10)
+        self.assertGreater(self.session().expires_at, timezone.now() + timedelta(hours=1))
+
+    def test_failed_finalize_releases_blob(self):
+        self.create()
+        uploads.append_chunk(self.session(), 0, io.BytesIO(self.CONTENT[:1000]), 1000)
+        with mock.patch.object(UploadSession, 'save', side_effect=RuntimeError):
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(RuntimeError):
+                    uploads.append_chunk(self.session(), 1000, io.BytesIO(self.CONTENT[1000:]), None)
+
+        sha256 = hashlib.sha256(self.CONTENT).hexdigest()
+        self.assertFalse(StoredBlob.objects.filter(pk=sha256).exists())
+        self.assertFalse(GameFile.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self._media_root, 'games', 'blobs', sha256[:2], sha256[2:4])), [])
+
+    def test_cleanup_expired(self):
+        self.create()
+        part = uploads.part_path(self.session())
+        UploadSession.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(uploads.cleanup_expired(), 1)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(os.path.exists(part))
+
+    def test_other_users_upload_is_not_found(self):
+        url = self.create()
+        self.client.force_login(make_user('other'))
+        self.assertEqual(self.patch(url, 0, self.CONTENT).status_code, 404)
+
+
+class StoredBlobTests(TempMediaMixin, TestCase):
+    """Хранилище файлов игр по содержимому и счетчик ссылок (games/storage.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.game = make_game(make_user(is_developer=True), 'Игра', slug='game')
+
+    def blob(self, content):
+        return StoredBlob.objects.filter(pk=hashlib.sha256(content).hexdigest()).first()
+
+    def exists(self, content):
+        sha256 = hashlib.sha256(content).hexdigest()
+        return default_storage.exists(f'{StoredBlob.DIRECTORY}/{sha256[:2]}/{sha256[2:4]}/{sha256}')
+
+    def test_identical_content_is_stored_once(self):
+        first = make_file(self.game, b'same build', name='win.zip')
+        second = make_file(self.game, b'same build', name='linux.zip')
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(self.blob(b'same build').ref_count, 2)
+        self.assertEqual((first.download_name, second.download_name), ('win.zip', 'linux.zip'))
+
+    def test_last_reference_deletes_file_after_commit(self):
+        first = make_file(self.game, b'build')
+        second = make_file(self.game, b'build')
+
+        first.delete()
+        self.assertEqual(self.blob(b'build').ref_count, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertIsNone(self.blob(b'build'))
+        self.assertFalse(self.exists(b'build'))
+
+    def test_rolled_back_delete_keeps_file(self):
+        game_file = make_file(self.game, b'build')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    game_file.delete()
+                    raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.blob(b'build').ref_count, 1)
+        self.assertTrue(self.exists(b'build'))
+
+    def test_reupload_of_same_content_keeps_reference_count(self):
+        game_file = make_file(self.game, b'build')
+        game_file.file = SimpleUploadedFile('build.zip', b'build')
+        game_file.save()
+        self.assertEqual(self.blob(b'build').ref_count, 1)
+
+    def test_replacing_content_releases_previous_blob(self):
+        game_file = make_file(self.game, b'old build')
+        with self.captureOnCommitCallbacks(execute=True):
+            game_file.file = SimpleUploadedFile('build.zip', b'new build')
+            game_file.save()
+        self.assertIsNone(self.blob(b'old build'))
+        self.assertFalse(self.exists(b'old build'))
+        self.assertEqual(self.blob(b'new build').ref_count, 1)
+
+    def test_dedupe_moves_legacy_files(self):
+        for name in ('games/files/a.zip', 'games/files/b.zip'):
+            default_storage.save(name, ContentFile(b'legacy build'))
+            GameFile.objects.create(game=self.game, name=name, platform='windows', file=name)
+
+        call_command('dedupe_game_files', stdout=io.StringIO())
+
+        self.assertEqual(self.blob(b'legacy build').ref_count, 2)
+        self.assertEqual(
+            set(GameFile.objects.values_list('checksum', flat=True)), {hashlib.sha256(b'legacy build').hexdigest()}
+        )
+        self.assertFalse(default_storage.exists('games/files/a.zip'))
+        self.assertFalse(default_storage.exists('games/files/b.zip'))
+
+
+@override_settings(RATINGS={'PRIOR_MEAN': 3.0, 'PRIOR_WEIGHT': 10})
+class RatingTests(TestCase):
+    """Денормализованный рейтинг игр (games/ratings.py, social/signals.py)"""
+
+    FIELDS = ('rating_sum', 'rating_count', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.game = make_game(make_user(is_developer=True), 'Игра', slug='game')
+        cls.players = [make_user(f'player{i}') for i in range(3)]
+
+    def review(self, user, rating, **kwargs):
+        return Review.objects.create(user=user, game=self.game, title='Отзыв', content='', rating=rating, **kwargs)
+
+    def state(self):
+        return Game.objects.values(*self.FIELDS, 'rating_average', 'rating_score').get(pk=self.game.pk)
+
+    def test_reviews_and_ratings_are_counted_incrementally(self):
+        self.review(self.players[0], 5)
+        GameRating.objects.create(user=self.players[0], game=self.game, rating=4)
+        self.review(self.players[1], 1, is_public=False)
+
+        state = self.state()
+        self.assertEqual([state[field] for field in self.FIELDS], [9, 2, 0, 0, 0, 1, 1])
+        self.assertAlmostEqual(state['rating_average'], 4.5)
+        self.assertAlmostEqual(state['rating_score'], (10 * 3.0 + 9) / 12)
+
+    def test_update_and_delete_move_histogram(self):
+        review = self.review(self.players[0], 2)
+        review.rating = 4
+        review.save()
+        self.assertEqual((self.state()['rating_2'], self.state()['rating_4']), (0, 1))
+
+        review.is_public = False
+        review.save()
+        self.assertEqual(self.state()['rating_count'], 0)
+
+        review.is_public = True
+        review.save()
+        review.delete()
+        state = self.state()
+        self.assertEqual([state[field] for field in self.FIELDS], [0] * len(self.FIELDS))
+        self.assertEqual((state['rating_average'], state['rating_score']), (0.0, 3.0))
+
+    def test_bayesian_score_keeps_single_vote_below_many(self):
+        self.assertLess(ratings.bayesian_score(5, 1), ratings.bayesian_score(400, 100))
+
+    def test_reconcile_fixes_drift(self):
+        self.review(self.players[0], 5)
+        GameRating.objects.create(user=self.players[1], game=self.game, rating=3)
+        expected = self.state()
+        Game.objects.filter(pk=self.game.pk).update(rating_sum=100, rating_count=7, rating_5=0, rating_average=0)
+
+        self.assertEqual(ratings.reconcile(), 1)
+        self.assertEqual(self.state(), expected)
+        self.assertEqual(ratings.reconcile(), 0)
+
+    def test_reconcile_command(self):
+        Game.objects.filter(pk=self.game.pk).update(rating_sum=5, rating_count=1, rating_5=1)
+        out = io.StringIO()
+        call_command('reconcile_ratings', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(self.state()['rating_count'], 0)
@@ -0,0 +1,215 @@
+# Популярность игр с затуханием по времени
+#
+# Game.trending_score — сумма весов недавних событий, каждый из которых
+# затухает экспоненциально: вес * 2^(-возраст / HALF_LIFE). Скачивания
+# берутся из Download со своим временем (в том числе пришедшие с задержкой
+# из журнала), просмотры — приращение view_count с прошлого пересчета
+# (Game.trending_views), они считаются произошедшими в момент пересчета.
+#
+# update() работает инкрементально (команда update_trending по cron):
+# ненулевые оценки умножаются на затухание за прошедшее время одним UPDATE,
+# затем добавляются только новые скачивания (id больше
+# TrendingState.last_download_id) и новые просмотры. Затухшие почти до нуля
+# оценки обнуляются, чтобы UPDATE затухания не проходил по всему каталогу.
+# Скачивание из транзакции, завершившейся позже следующих по id, update()
+# может пропустить — его учтет rebuild(): полный пересчет по скачиваниям
+# за HORIZON (просмотры в нем не учитываются — их время неизвестно).
+#
+# Топы недели и месяца (общий и по каждому жанру) хранятся в TopGame и
+# перестраиваются вместе с пересчетом; полка читается одним диапазоном по
+# индексу (period, genre, position). Полка «Популярные игры» на главной и
+# сортировка каталога «Популярные сейчас» идут по индексу trending_score.
+#
+# Настройки (settings.TRENDING):
+#   HALF_LIFE       — период полураспада, часов
+#   DOWNLOAD_WEIGHT — вес скачивания
+#   VIEW_WEIGHT     — вес просмотра
+#   HORIZON         — глубина полного пересчета, дней
+#   TOP_SIZE        — длина топов недели и месяца
+#   CHUNK_SIZE      — строк Download за один запрос
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from core import shelves
+from .models import Download, Game, TopGame, TrendingState
+
+
+DEFAULTS = {
+    'HALF_LIFE': 72,
+    'DOWNLOAD_WEIGHT': 1.0,
+    'VIEW_WEIGHT': 0.05,
+    'HORIZON': 30,
+    'TOP_SIZE': 10,
+    'CHUNK_SIZE': 10000,
+}
+
+# Длительность периодов топов, дней
+PERIODS = {
+    'week': 7,
+    'month': 30,
+}
+
+# Оценка ниже этой считается нулевой
+MIN_SCORE = 0.01
+
+UPDATE_BATCH_SIZE = 500
+
+
+def _setting(name):
+    return getattr(settings, 'TRENDING', {}).get(name, DEFAULTS[name])
+
+
+def _decay(seconds):
+    return 0.5 ** (max(seconds, 0) / (_setting('HALF_LIFE') * 3600))
+
+
+def _download_scores(queryset, after, until, now):
+    """{game_id: сумма затухших весов} скачиваний queryset с id в (after, until]"""
+    weight = _setting('DOWNLOAD_WEIGHT')
+    scores = defaultdict(float)
+    last = after
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last, pk__lte=until)
+            .order_by('pk')
+            .values_list('pk', 'game_id', 'created_at')[:_setting('CHUNK_SIZE')]
+        )
+        if not rows:
+            return scores
+        last = rows[-1][0]
+        for _, game_id, created_at in rows:
+            scores[game_id] += weight * _decay((now - created_at).total_seconds())
+
+
+def _new_views():
+    """{game_id: view_count} игр, у которых появились неучтенные просмотры"""
+    return dict(
+        Game.objects.filter(view_count__gt=F('trending_views')).values_list('pk', 'view_count')
+    )
+
+
+def _add(scores, views):
+    """Добавляет оценки скачиваний и новых просмотров, возвращает количество игр"""
+    view_weight = _setting('VIEW_WEIGHT')
+    ids = sorted(set(scores) | set(views))
+    for start in range(0, len(ids), UPDATE_BATCH_SIZE):
+        games = list(
+            Game.objects.filter(pk__in=ids[start:start + UPDATE_BATCH_SIZE])
+            .only('pk', 'trending_score', 'trending_views')
+        )
+        for game in games:
+            game.trending_score += scores.get(game.pk, 0.0)
+            if game.pk in views:
+                game.trending_score += (views[game.pk] - game.trending_views) * view_weight
+                game.trending_views = views[game.pk]
+        # bulk_update не вызывает сигналы Game (поиск, похожие игры)
+        Game.objects.bulk_update(games, ['trending_score', 'trending_views'])
+    return len(ids)
+
+
+def _last_download_id():
+    return Download.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+
+
+def update():
+    """Инкрементальный пересчет, возвращает количество игр с новыми событиями"""
+    now = timezone.now()
+    with transaction.atomic():
+        state, _ = TrendingState.objects.select_for_update().get_or_create(pk=1)
+        if state.updated_at is None:
+            state = None
+        else:
+            factor = _decay((now - state.updated_at).total_seconds())
+            Game.objects.filter(trending_score__gt=0).update(trending_score=F('trending_score') * factor)
+            Game.objects.filter(trending_score__gt=0, trending_score__lt=MIN_SCORE).update(trending_score=0)
+
+            until = _last_download_id()
+            scores = _download_scores(Download.objects.all(), state.last_download_id, until, now)
+            touched = _add(scores, _new_views())
+
+            state.last_download_id = max(until, state.last_download_id)
+            state.updated_at = now
+            state.save()
+    if state is None:
+        # Первый запуск: начинаем с полного пересчета
+        return rebuild()
+    rebuild_tops(now)
+    shelves.invalidate('popular')
+    return touched
+
+
+def rebuild():
+    """Полный пересчет по скачиваниям за HORIZON, возвращает количество игр с оценкой"""
+    now = timezone.now()
+    with transaction.atomic():
+        state, _ = TrendingState.objects.select_for_update().get_or_create(pk=1)
+        Game.objects.filter(trending_score__gt=0).update(trending_score=0)
+        Game.objects.update(trending_views=F('view_count'))
+
+        until = _last_download_id()
+        recent = Download.objects.filter(created_at__gte=now - timedelta(days=_setting('HORIZON')))
+        scores = _download_scores(recent, 0, until, now)
+        touched = _add(scores, {})
+
+        state.last_download_id = until
+        state.updated_at = now
+        state.save()
+    rebuild_tops(now)
+    shelves.invalidate('popular')
+    return touched
+
+
+def rebuild_tops(now=None):
+    """Перестраивает топы недели и месяца, возвращает количество позиций"""
+    now = now or timezone.now()
+    top_size = _setting('TOP_SIZE')
+    positions = []
+    for period, days in PERIODS.items():
+        recent = Download.objects.filter(created_at__gte=now - timedelta(days=days), game__is_published=True)
+
+        overall = (
+            recent.values('game_id')
+            .annotate(downloads=Count('id'))
+            .order_by('-downloads', 'game_id')[:top_size]
+        )
+        positions.extend(
+            TopGame(period=period, genre=None, game_id=row['game_id'], position=position, downloads=row['downloads'])
+            for position, row in enumerate(overall, start=1)
+        )
+
+        per_genre = defaultdict(list)
+        rows = (
+            recent.filter(game__genres__isnull=False)
+            .values('game__genres', 'game_id')
+            .annotate(downloads=Count('id'))
+            .order_by('game__genres', '-downloads', 'game_id')
+        )
+        for row in rows:
+            games = per_genre[row['game__genres']]
+            if len(games) < top_size:
+                games.append(row)
+        positions.extend(
+            TopGame(period=period, genre_id=genre_id, game_id=row['game_id'], position=position, downloads=row['downloads'])
+            for genre_id, games in per_genre.items()
+            for position, row in enumerate(games, start=1)
+        )
+
+    with transaction.atomic():
+        TopGame.objects.all().delete()
+        TopGame.objects.bulk_create(positions, batch_size=UPDATE_BATCH_SIZE)
+    return len(positions)
+
+
+def top_games(period, genre=None):
+    """Игры топа period ('week' или 'month'), общего или жанра genre, по местам"""
+    return (
+        Game.objects.filter(top_positions__period=period, top_positions__genre=genre, is_published=True)
+        .select_related('developer')
+        .order_by('top_positions__position')
+    )
@@ -0,0 +1,257 @@
+# Возобновляемая загрузка файлов игр (подмножество протокола tus 1.0:
+# core, creation, termination)
+#
+#   POST   /games/<slug>/uploads/       — создать загрузку (Upload-Length, Upload-Metadata)
+#   HEAD   /games/uploads/<id>/         — узнать, сколько байт уже принято (Upload-Offset)
+#   PATCH  /games/uploads/<id>/         — дописать кусок с позиции Upload-Offset
+#   DELETE /games/uploads/<id>/         — отменить загрузку
+#
+# Тело PATCH читается из потока запроса кусками по READ_SIZE и сразу пишется
+# на диск, поэтому память на загрузку — O(размер куска), а не O(файла).
+# SHA-256 считается по мере поступления данных; после завершения файл
+# переносится в хранилище по содержимому (games/storage.py) и к игре
+# добавляется GameFile.
+#
+# Настройки (settings.CHUNKED_UPLOADS):
+#   TEMP_DIR  — каталог недокачанных файлов
+#   MAX_SIZE  — максимальный размер файла, байт
+#   EXPIRES   — сколько секунд незавершенная загрузка живет без новых данных
+#               (каждый принятый кусок продлевает срок)
+
+import base64
+import binascii
+import fcntl
+import hashlib
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import GameFile, UploadSession
+from .storage import ingest_path, release
+
+
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,termination'
+
+READ_SIZE = 1024 * 1024
+
+DEFAULTS = {
+    'TEMP_DIR': os.path.join(settings.BASE_DIR, 'var', 'uploads'),
+    'MAX_SIZE': 20 * 1024 ** 3,
+    'EXPIRES': 24 * 60 * 60,
+}
+
+# Сколько сессий держать с готовым хешем в памяти процесса
+MAX_CACHED_HASHERS = 256
+
+
+def _setting(name):
+    return getattr(settings, 'CHUNKED_UPLOADS', {}).get(name, DEFAULTS[name])
+
+
+def max_size():
+    return _setting('MAX_SIZE')
+
+
+class UploadError(Exception):
+    """Ошибка протокола; status — HTTP-код ответа"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_metadata(header):
+    """Upload-Metadata: 'key base64value,key2 base64value2'"""
+    metadata = {}
+    for pair in filter(None, (part.strip() for part in (header or '').split(','))):
+        key, _, value = pair.partition(' ')
+        try:
+            metadata[key] = base64.b64decode(value).decode('utf-8') if value else ''
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError(f'Некорректное значение метаданных {key}')
+    return metadata
+
+
+def part_path(session):
+    return os.path.join(_setting('TEMP_DIR'), f'{session.pk}.part')
+
+
+def _expires_at():
+    return timezone.now() + timedelta(seconds=_setting('EXPIRES'))
+
+
+# --- Инкрементальный хеш ---
+#
+# Объект hashlib нельзя сохранить в БД, поэтому он живет в памяти процесса.
+# Если следующий кусок пришел в другой процесс (или после перезапуска),
+# хеш восстанавливается однократным чтением уже принятой части файла.
+
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+def _take_hasher(session):
+    with _hashers_lock:
+        cached = _hashers.pop(session.pk, None)
+    if cached and cached[0] == session.offset:
+        return cached[1]
+
+    hasher = hashlib.sha256()
+    remaining = session.offset
+    if remaining:
+        with open(part_path(session), 'rb') as part:
+            while remaining > 0:
+                chunk = part.read(min(READ_SIZE, remaining))
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                remaining -= len(chunk)
+    return hasher
+
+
+def _put_hasher(session, offset, hasher):
+    with _hashers_lock:
+        _hashers[session.pk] = (offset, hasher)
+        while len(_hashers) > MAX_CACHED_HASHERS:
+            _hashers.pop(next(iter(_hashers)))
+
+
+def _drop_hasher(session):
+    with _hashers_lock:
+        _hashers.pop(session.pk, None)
+
+
+# --- Операции ---
+
+def create_session(user, game, length, metadata):
+    if length is None:
+        raise UploadError('Не указан Upload-Length')
+    if length > max_size():
+        raise UploadError('Файл слишком большой', status=413)
+
+    filename = get_valid_filename(os.path.basename(metadata.get('filename', ''))) or 'build.bin'
+    platform = metadata.get('platform', '')
+    if platform not in dict(GameFile.PLATFORM_CHOICES):
+        raise UploadError('Некорректная платформа')
+
+    session = UploadSession.objects.create(
+        user=user,
+        game=game,
+        filename=filename,
+        name=metadata.get('name') or filename,
+        platform=platform,
+        version=metadata.get('version') or '1.0',
+        length=length,
+        expires_at=_expires_at(),
+    )
+    os.makedirs(_setting('TEMP_DIR'), exist_ok=True)
+    open(part_path(session), 'wb').close()
+    if session.is_complete:
+        finalize(session, hashlib.sha256().hexdigest())
+    return session
+
+
+def append_chunk(session, offset, stream, content_length):
+    """
+    Дописывает тело PATCH-запроса в файл загрузки, возвращает новое смещение.
+
+    Если клиент оборвал соединение, принятые байты сохраняются — с этого
+    места загрузку можно продолжить.
+    """
+    if session.is_complete:
+        raise UploadError('Загрузка уже завершена', status=409)
+    if offset != session.offset:
+        raise UploadError('Upload-Offset не совпадает с принятым размером', status=409)
+
+    limit = session.length - offset
+    if content_length is not None:
+        limit = min(limit, content_length)
+
+    with open(part_path(session), 'r+b') as part:
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadError('Загрузка уже продолжается в другом запросе', status=423)
+
+        session.refresh_from_db(fields=['offset'])
+        if offset != session.offset:
+            raise UploadError('Upload-Offset не совпадает с принятым размером', status=409)
+
+        hasher = _take_hasher(session)
+        part.seek(offset)
+        # Хвост от оборванной ранее записи за пределами offset не нужен
+        part.truncate()
+        received = 0
+        try:
+            while received < limit:
+                chunk = stream.read(min(READ_SIZE, limit - received))
+                if not chunk:
+                    break
+                part.write(chunk)
+                hasher.update(chunk)
+                received += len(chunk)
+        finally:
+            part.flush()
+            os.fsync(part.fileno())
+            new_offset = offset + received
+            # Идущую загрузку cleanup_uploads не удалит, сколько бы она ни длилась
+            UploadSession.objects.filter(pk=session.pk).update(offset=new_offset, expires_at=_expires_at())
+            session.offset = new_offset
+            _put_hasher(session, new_offset, hasher)
+
+    if session.is_complete:
+        finalize(session, hasher.hexdigest())
+    return session.offset
+
+
+def finalize(session, checksum):
+    """Переносит собранный файл в хранилище и создает GameFile"""
+    # Перенос файла не откатывается вместе с транзакцией, поэтому ссылка на
+    # содержимое фиксируется отдельно, до нее, а при ошибке снимается
+    blob = ingest_path(part_path(session), checksum, session.length)
+    try:
+        with transaction.atomic():
+            game_file = GameFile(
+                game=session.game,
+                name=session.name,
+                filename=session.filename,
+                platform=session.platform,
+                version=session.version,
+                file_size=blob.size,
+                checksum=blob.sha256,
+            )
+            game_file.file.name = blob.name
+            game_file.save()
+            session.game_file = game_file
+            session.save(update_fields=['game_file'])
+    except Exception:
+        release(blob.sha256)
+        raise
+    finally:
+        _drop_hasher(session)
+    return game_file
+
+
+def terminate(session):
+    _drop_hasher(session)
+    try:
+        os.unlink(part_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+def cleanup_expired():
+    """Удаляет просроченные загрузки (и недокачанные файлы), возвращает их количество"""
+    expired = UploadSession.objects.filter(expires_at__lt=timezone.now())
+    count = 0
+    for session in expired.iterator():
+        terminate(session)
+        count += 1
+    return count
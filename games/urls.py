@@ -20,6 +20,10 @@ urlpatterns = [
     path('<slug:slug>/download/', views.download_game, name='download'),
     path('<slug:slug>/download/<int:file_id>/', views.download_game, name='download_file'),
     
+    # Возобновляемая загрузка файлов (tus)
+    path('<slug:slug>/uploads/', views.upload_create, name='upload_create'),
+    path('uploads/<uuid:upload_id>/', views.upload_detail, name='upload_detail'),
+    
     # Пользовательские списки
     path('my-games/', views.my_games, name='my_games'),
     path('wishlist/', views.wishlist_view, name='wishlist'),
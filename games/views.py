@@ -6,17 +6,32 @@ from django.views.generic import ListView, DetailView, CreateView, UpdateView, D
 from django.urls import reverse_lazy, reverse
 from django.http import JsonResponse, Http404, HttpResponse, FileResponse
 from django.db.models import Q, Count, Avg
-from django.core.paginator import Paginator
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
-from .models import Game, GameFile, GameImage, Genre, Download, Wishlist
+from core import counters, viewer
+from core.models import DeveloperStats
+from core.page_cache import SharedPageMixin
+from core.pagination import KeysetPaginator, cursor_query_string
+from .models import Game, GameFile, GameImage, Genre, Download, Wishlist, UploadSession
 from .forms import GameForm, GameFileForm, GameImageForm, GameSearchForm, GamePublishForm
+from . import delivery, download_log, search, trending, uploads
 import os
 import mimetypes
 
 
-class GameListView(ListView):
+# Допустимые сортировки каталога и их ключи для keyset-пагинации
+# (последнее поле уникально, чтобы курсор однозначно задавал позицию)
+SORT_ORDERINGS = {
+    '-created_at': ('-created_at', '-id'),
+    '-download_count': ('-download_count', '-id'),
+    '-trending_score': ('-trending_score', '-id'),
+    'title': ('title', 'id'),
+    '-rating_score': ('-rating_score', '-id'),
+}
+
+
+class GameListView(SharedPageMixin, ListView):
     """Список всех игр"""
     model = Game
     template_name = 'games/game_list.html'
@@ -26,15 +41,10 @@ class GameListView(ListView):
     def get_queryset(self):
         queryset = Game.objects.filter(is_published=True).select_related('developer')
         
-        # Поиск
+        # Поиск (полнотекстовый индекс, см. games/search.py)
         query = self.request.GET.get('q')
         if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query) |
-                Q(short_description__icontains=query) |
-                Q(tags__name__icontains=query)
-            ).distinct()
+            queryset = search.search_games(queryset, query)
         
         # Фильтрация по жанрам
         genres = self.request.GET.getlist('genres')
@@ -53,22 +63,31 @@ class GameListView(ListView):
         if self.request.GET.get('ios'):
             queryset = queryset.filter(ios_support=True)
         
-        # Сортировка
-        sort = self.request.GET.get('sort', '-created_at')
-        if sort:
-            queryset = queryset.order_by(sort)
+        # Сортировка: при поиске без явной сортировки — по релевантности
+        sort = self.request.GET.get('sort')
+        if query and not sort:
+            self.keyset_ordering = ('-search_rank', '-created_at', '-id')
+        else:
+            self.keyset_ordering = SORT_ORDERINGS.get(sort, SORT_ORDERINGS['-created_at'])
         
-        return queryset
+        return queryset.order_by(*self.keyset_ordering)
+    
+    def paginate_queryset(self, queryset, page_size):
+        """Keyset-пагинация вместо OFFSET + COUNT(*)"""
+        paginator = KeysetPaginator(queryset, self.keyset_ordering, page_size, with_total=True)
+        page = paginator.page(self.request.GET.get('cursor'))
+        return paginator, page, page.object_list, page.has_other_pages()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['pagination_query'] = cursor_query_string(self.request)
         context['search_form'] = GameSearchForm(self.request.GET)
         context['genres'] = Genre.objects.all()
         context['featured_games'] = Game.objects.filter(featured=True, is_published=True)[:5]
         return context
 
 
-class GameDetailView(DetailView):
+class GameDetailView(SharedPageMixin, DetailView):
     """Подробное описание игры"""
     model = Game
     template_name = 'games/game_detail.html'
@@ -77,25 +96,30 @@ class GameDetailView(DetailView):
     def get_object(self):
         game = get_object_or_404(Game, slug=self.kwargs['slug'])
         
-        # Увеличиваем счетчик просмотров
-        game.view_count += 1
-        game.save(update_fields=['view_count'])
+        # Увеличиваем счетчик просмотров (запись в БД отложена, см. core/counters.py)
+        counters.increment(game, 'view_count')
+        counters.apply_pending([game], 'view_count', 'download_count')
         
         return game
     
+    def shared_page_meta(self):
+        return {'game_id': self.object.pk}
+    
+    def shared_page_hit(self, meta):
+        # Страница отдана из общего кеша — просмотр все равно засчитывается
+        counters.increment(Game(pk=meta['game_id']), 'view_count')
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        game = self.get_object()
+        game = self.object
         
-        # Проверяем, купил ли пользователь игру
+        # Проверяем, купил ли пользователь игру (в общей странице — по /viewer.json)
         context['user_owns_game'] = False
         context['in_wishlist'] = False
         
         if self.request.user.is_authenticated:
             context['user_owns_game'] = game.user_can_download(self.request.user)
-            context['in_wishlist'] = Wishlist.objects.filter(
-                user=self.request.user, game=game
-            ).exists()
+            context['in_wishlist'] = game.pk in viewer.for_request(self.request).wishlist
         
         # Получаем файлы и скриншоты
         context['game_files'] = game.files.all().order_by('platform')
@@ -107,11 +131,15 @@ class GameDetailView(DetailView):
             game=game, is_public=True
         ).select_related('user').order_by('-created_at')[:10]
         
-        # Похожие игры
+        # Похожие игры рассчитываются заранее (games/similarity.py)
         context['similar_games'] = Game.objects.filter(
-            genres__in=game.genres.all(),
-            is_published=True
-        ).exclude(id=game.id).distinct()[:6]
+            similar_to__game=game, is_published=True
+        ).select_related('developer').order_by('-similar_to__score')[:6]
+        
+        # «Игроки также скачивали» (games/recommendations.py)
+        context['also_downloaded'] = Game.objects.filter(
+            recommended_for_games__game=game, is_published=True
+        ).select_related('developer').order_by('-recommended_for_games__score')[:6]
         
         return context
 
@@ -180,14 +208,14 @@ def my_games(request):
     
     games = Game.objects.filter(developer=request.user).order_by('-created_at')
     
-    # Статистика
-    total_downloads = sum(game.download_count for game in games)
+    # Статистика (готовые итоги, см. core/stats.py)
+    stats = DeveloperStats.for_user(request.user)
     
     context = {
         'games': games,
-        'total_downloads': total_downloads,
-        'published_count': games.filter(is_published=True).count(),
-        'draft_count': games.filter(is_published=False).count(),
+        'total_downloads': stats.downloads,
+        'published_count': stats.published_games,
+        'draft_count': stats.draft_games,
     }
     
     return render(request, 'games/my_games.html', context)
@@ -212,6 +240,88 @@ def add_game_file(request, slug):
     return render(request, 'games/add_file.html', {'form': form, 'game': game})
 
 
+def _tus_response(status=204, **headers):
+    response = HttpResponse(status=status)
+    response['Tus-Resumable'] = uploads.TUS_VERSION
+    for name, value in headers.items():
+        response[name.replace('_', '-')] = value
+    return response
+
+
+def _int_header(request, name):
+    value = request.META.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise uploads.UploadError(f'Некорректный заголовок {name}')
+
+
+@login_required
+def upload_create(request, slug):
+    """Создание возобновляемой загрузки файла игры (tus)"""
+    game = get_object_or_404(Game, slug=slug, developer=request.user)
+    
+    if request.method == 'OPTIONS':
+        return _tus_response(
+            Tus_Version=uploads.TUS_VERSION,
+            Tus_Extension=uploads.TUS_EXTENSIONS,
+            Tus_Max_Size=str(uploads.max_size()),
+        )
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Метод не разрешен'}, status=405)
+    
+    try:
+        session = uploads.create_session(
+            request.user, game,
+            _int_header(request, 'HTTP_UPLOAD_LENGTH'),
+            uploads.parse_metadata(request.META.get('HTTP_UPLOAD_METADATA')),
+        )
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    
+    return _tus_response(
+        status=201,
+        Location=request.build_absolute_uri(reverse('games:upload_detail', kwargs={'upload_id': session.pk})),
+        Upload_Offset=str(session.offset),
+    )
+
+
+@login_required
+def upload_detail(request, upload_id):
+    """Состояние, дозагрузка и отмена загрузки файла игры (tus)"""
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    
+    try:
+        if request.method == 'HEAD':
+            return _tus_response(
+                status=200,
+                Upload_Offset=str(session.offset),
+                Upload_Length=str(session.length),
+                Cache_Control='no-store',
+            )
+        
+        if request.method == 'PATCH':
+            if request.content_type != 'application/offset+octet-stream':
+                return JsonResponse({'error': 'Неподдерживаемый Content-Type'}, status=415)
+            offset = uploads.append_chunk(
+                session,
+                _int_header(request, 'HTTP_UPLOAD_OFFSET'),
+                request,
+                _int_header(request, 'CONTENT_LENGTH'),
+            )
+            return _tus_response(Upload_Offset=str(offset))
+        
+        if request.method == 'DELETE':
+            uploads.terminate(session)
+            return _tus_response()
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    
+    return JsonResponse({'error': 'Метод не разрешен'}, status=405)
+
+
 @login_required
 def add_game_image(request, slug):
     """Добавление скриншота игры"""
@@ -281,32 +391,25 @@ def download_game(request, slug, file_id=None):
             messages.error(request, 'Файлы для скачивания не найдены.')
             return redirect('games:detail', slug=game.slug)
     
-    # Записываем статистику скачивания
-    Download.objects.create(
-        user=request.user if request.user.is_authenticated else None,
-        game=game,
-        game_file=game_file,
-        ip_address=request.META.get('REMOTE_ADDR', ''),
-        user_agent=request.META.get('HTTP_USER_AGENT', '')
-    )
-    
-    # Обновляем счетчики
-    game.download_count += 1
-    game.save(update_fields=['download_count'])
-    
-    game_file.download_count += 1
-    game_file.save(update_fields=['download_count'])
-    
-    # Отдаем файл
+    # Отдаем файл (саму передачу может взять на себя веб-сервер, см. games/delivery.py)
     try:
-        return FileResponse(
-            open(game_file.file.path, 'rb'),
-            as_attachment=True,
-            filename=os.path.basename(game_file.file.name)
+        response = delivery.serve_file(
+            request, game_file.file, filename=game_file.download_name, etag=game_file.etag
         )
     except FileNotFoundError:
         messages.error(request, 'Файл не найден.')
         return redirect('games:detail', slug=game.slug)
+    
+    # Докачка и параллельные сегменты одного клиента считаются одним скачиванием
+    if response.status_code in (200, 206) and download_log.is_new_download(request, game_file):
+        # Записываем статистику скачивания (в фоне, см. games/download_log.py)
+        download_log.record_download(request, game, game_file)
+        
+        # Обновляем счетчики
+        counters.increment(game, 'download_count')
+        counters.increment(game_file, 'download_count')
+    
+    return response
 
 
 @login_required
@@ -377,12 +480,18 @@ def genre_detail(request, slug):
         genres=genre, is_published=True
     ).select_related('developer').order_by('-created_at')
     
-    paginator = Paginator(games, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(games, SORT_ORDERINGS['-created_at'], 12, with_total=True)
+    page_obj = paginator.page(request.GET.get('cursor'))
+    
+    top_week = list(trending.top_games('week', genre)[:5])
+    top_month = list(trending.top_games('month', genre)[:5])
     
     return render(request, 'games/genre_detail.html', {
         'genre': genre,
+        'top_week': top_week,
+        'top_month': top_month,
+        'tops': [('Топ недели', top_week), ('Топ месяца', top_month)],
         'games': page_obj,
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'pagination_query': cursor_query_string(request),
     })
@@ -0,0 +1,14 @@
+"""
+ASGI config for indiedev_platform project.
+
+Нужен для потока уведомлений (social:notification_stream):
+    uvicorn indiedev_platform.asgi:application
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'indiedev_platform.settings')
+
+application = get_asgi_application()
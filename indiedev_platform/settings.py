@@ -73,6 +73,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'indiedev_platform.wsgi.application'
+ASGI_APPLICATION = 'indiedev_platform.asgi.application'
 
 # Database
 DATABASES = {
@@ -164,8 +165,57 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 # File upload settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
+# Файлы больше порога пишутся во временный файл, а не держатся в памяти;
+# большие сборки загружаются по частям (CHUNKED_UPLOADS, games/uploads.py)
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB
+DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+
+CHUNKED_UPLOADS = {
+    'TEMP_DIR': BASE_DIR / 'var' / 'uploads',
+    'MAX_SIZE': 20 * 1024 ** 3,  # 20GB
+    'EXPIRES': 24 * 60 * 60,
+}
+
+# Уменьшенные копии обложек и скриншотов в WebP/JPEG (core/images.py)
+IMAGE_VARIANTS = {
+    'ASYNC': True,
+    'WORKERS': 2,  # процессов пула (общий с аватарами)
+    'WIDTHS': (160, 320, 640, 1280),
+    'WEBP_QUALITY': 80,
+    'JPEG_QUALITY': 82,
+}
+
+# Копии аватаров строятся в фоновом пуле процессов (accounts/avatars.py)
+AVATARS = {
+    'ASYNC': True,
+    'SIZES': (64, 128, 300),
+}
+
+# Байесовский рейтинг игр (games/ratings.py)
+RATINGS = {
+    'PRIOR_MEAN': 3.0,
+    'PRIOR_WEIGHT': 10,
+}
+
+# Похожие игры (games/similarity.py, команда rebuild_similar_games)
+SIMILAR_GAMES = {
+    'TOP_K': 12,
+    'QUALITY_WEIGHT': 0.15,
+}
+
+# Рекомендации «игроки также скачивали» (games/recommendations.py)
+RECOMMENDATIONS = {
+    'TOP_N': 12,
+    'MIN_SUPPORT': 2,
+    'WEIGHTS': {'download': 1.0, 'wishlist': 2.0, 'rating': 3.0},
+}
+
+# Популярность с затуханием и топы недели/месяца (games/trending.py)
+TRENDING = {
+    'HALF_LIFE': 72,
+    'VIEW_WEIGHT': 0.05,
+    'TOP_SIZE': 10,
+}
 
 # Email settings
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
@@ -177,6 +227,73 @@ CACHES = {
     }
 }
 
+# Кеш полок главной страницы (core/shelves.py)
+SHELVES = {
+    'SOFT_TTL': 60,  # секунд до пересборки; устаревшая полка отдается, пока ее пересобирают
+    'HARD_TTL': 60 * 60,
+}
+
+# Общий кеш главной, каталога и страниц игр; личное подставляется по /viewer.json (core/page_cache.py)
+PAGE_CACHE = {
+    'ENABLED': True,
+    # Секунд. Изменения игр, файлов, отзывов и жанров сбрасывают кеш сразу только
+    # при общем кеше (Redis); с LocMemCache другие процессы отдают старую страницу до TIMEOUT
+    'TIMEOUT': 60,
+}
+
+# Доставка уведомлений по SSE (social/push.py); 'redis' — если процессов несколько
+NOTIFICATIONS_PUSH = {
+    # True — только если /social/notifications/stream/ обслуживает uvicorn (nginx.conf):
+    # под WSGI каждая открытая вкладка навсегда заняла бы рабочий процесс
+    'ENABLED': os.environ.get('NOTIFICATIONS_PUSH_ENABLED') == '1',
+    'BACKEND': 'local',
+    'REDIS_URL': os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
+    'HEARTBEAT': 25,
+}
+
+# Группировка и хранение уведомлений (social/notifications.py)
+NOTIFICATIONS = {
+    'RECENT_ACTORS': 3,  # участников в тексте «X, Y, Z и еще N»
+    'READ_RETENTION': 90,  # дней хранения прочитанных (compact_notifications)
+}
+
+# Рассылка уведомлений об обновлениях подписчикам (social/fanout.py)
+FANOUT = {
+    'ASYNC': True,  # False — рассылать синхронно после коммита
+    'BATCH_SIZE': 500,  # уведомлений в одной транзакции
+}
+
+# Лента подписок (social/feed.py)
+FEED = {
+    'PULL_FOLLOWERS': 1000,  # с этого числа подписчиков посты автора не раскладываются по лентам
+    'RETENTION': 180,  # дней хранения записей лент (compact_feed)
+}
+
+# Отложенная запись счетчиков просмотров/скачиваний (core/counters.py)
+COUNTERS = {
+    'BACKEND': 'local',  # 'redis' — общий буфер для нескольких процессов (нужен для flush_counters)
+    'FLUSH_INTERVAL': 10,  # секунд; 0 — писать в БД сразу
+    'REDIS_URL': os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
+}
+
+# Отдача файлов игр (games/delivery.py): 'python', 'nginx' (X-Accel-Redirect) или 'sendfile'
+FILE_DELIVERY = {
+    'BACKEND': 'python',
+    'INTERNAL_URL': '/protected/',
+}
+
+# Асинхронная запись статистики скачиваний (games/download_log.py)
+DOWNLOAD_LOG = {
+    'ASYNC': True,
+    'QUEUE_SIZE': 10000,
+    'BATCH_SIZE': 200,
+    'BATCH_TIMEOUT': 1.0,
+    'JOURNAL_DIR': BASE_DIR / 'var' / 'download_journal',
+    # Range-запросы одного клиента в этом окне — одно скачивание; между процессами
+    # работает только с общим кешем (Redis), иначе каждый процесс считает свои сегменты
+    'DEDUP_WINDOW': 6 * 60 * 60,
+}
+
 # Security settings for production
 if not DEBUG:
     SECURE_BROWSER_XSS_FILTER = True
@@ -49,6 +49,23 @@ CORS_ALLOW_ALL_ORIGINS = True  # Временно для отладки
 # Статические файлы для продакшена
 STATIC_ROOT = '/var/www/indiedev_platform/static/'
 
+# Общий кеш для всех процессов Gunicorn: с LocMemCache у каждого процесса свой
+# кеш, и сброс кеша страниц (core/page_cache.py), меню жанров и других версий
+# видит только процесс, изменивший данные
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+
+# Файлы игр отдает nginx через X-Accel-Redirect (location /protected/ в nginx.conf)
+FILE_DELIVERY = {
+    'BACKEND': 'nginx',
+    'INTERNAL_URL': '/protected/',
+}
+
 # Логирование
 LOGGING = {
     'version': 1,
@@ -5,11 +5,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from core.views import HomeView
+from core.views import HomeView, viewer_state_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', HomeView.as_view(), name='home'),
+    path('viewer.json', viewer_state_view, name='viewer_state'),
     path('accounts/', include('accounts.urls')),
     path('games/', include('games.urls')),
     path('social/', include('social.urls')),
@@ -5,3 +5,6 @@ class SocialConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'social'
     verbose_name = 'Социальные функции'
+
+    def ready(self):
+        from . import signals  # noqa: F401
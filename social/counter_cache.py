@@ -0,0 +1,116 @@
+# Счетчики лайков и комментариев (кеш GenericRelation)
+#
+# Review, Post и Comment хранят likes_count, comments_count и replies_count
+# в своих полях, поэтому лента из N объектов получает их вместе с самими
+# объектами, без COUNT по универсальным таблицам Like и Comment на каждый.
+#
+# Счетчики меняются приращениями F() в той же транзакции, что и источник
+# (сигналы в social/signals.py):
+#   * Like — likes_count объекта, которому поставлен лайк;
+#   * публичный Comment — comments_count объекта и replies_count
+#     родительского комментария (смена is_public учитывается).
+# Объекты моделей без соответствующего поля (например, Game) не считаются.
+# Изменения мимо сигналов (queryset.update, правки в БД) исправляет
+# reconcile() — команда reconcile_counter_cache.
+#
+# Выборки лайков и комментариев объекта идут по индексам
+# (content_type, object_id).
+
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, F
+
+
+UPDATE_BATCH_SIZE = 500
+
+# Модель -> поля счетчиков
+FIELDS = {
+    'Review': ('likes_count', 'comments_count'),
+    'Post': ('likes_count', 'comments_count'),
+    'Comment': ('likes_count', 'replies_count'),
+}
+
+
+def _target(content_type_id, object_id, field):
+    model = ContentType.objects.get_for_id(content_type_id).model_class()
+    if model is None or model._meta.app_label != 'social' or field not in FIELDS.get(model.__name__, ()):
+        return []
+    return [(model, object_id, field)]
+
+
+def contributions(instance):
+    """[(модель, id, поле)] — счетчики, в которые засчитывается instance"""
+    from .models import Comment, Like
+
+    if isinstance(instance, Like):
+        return _target(instance.content_type_id, instance.object_id, 'likes_count')
+    if isinstance(instance, Comment) and instance.is_public:
+        result = _target(instance.content_type_id, instance.object_id, 'comments_count')
+        if instance.parent_id:
+            result.append((Comment, instance.parent_id, 'replies_count'))
+        return result
+    return []
+
+
+def apply(changes):
+    """Применяет приращения: changes — список (модель, id, поле, +1/-1)"""
+    per_object = defaultdict(int)
+    for model, object_id, field, delta in changes:
+        per_object[model, field, object_id] += delta
+
+    grouped = defaultdict(list)
+    for (model, field, object_id), delta in per_object.items():
+        if delta:
+            grouped[model, field, delta].append(object_id)
+
+    with transaction.atomic(savepoint=False):
+        for (model, field, delta), ids in grouped.items():
+            model.objects.filter(pk__in=ids).update(**{field: F(field) + delta})
+
+
+def reconcile(apps=global_apps):
+    """Пересчитывает счетчики по таблицам Like и Comment, возвращает количество исправленных объектов"""
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Like = apps.get_model('social', 'Like')
+    Comment = apps.get_model('social', 'Comment')
+
+    def per_target(queryset, content_type):
+        return dict(
+            queryset.filter(content_type=content_type)
+            .values('object_id')
+            .annotate(count=Count('id'))
+            .values_list('object_id', 'count')
+        )
+
+    fixed = 0
+    with transaction.atomic():
+        for name, fields in FIELDS.items():
+            model = apps.get_model('social', name)
+            content_type = ContentType.objects.get_for_model(model)
+            actual = {'likes_count': per_target(Like.objects.all(), content_type)}
+            if 'comments_count' in fields:
+                actual['comments_count'] = per_target(Comment.objects.filter(is_public=True), content_type)
+            if 'replies_count' in fields:
+                actual['replies_count'] = dict(
+                    Comment.objects.filter(is_public=True, parent__isnull=False)
+                    .values('parent_id')
+                    .annotate(count=Count('id'))
+                    .values_list('parent_id', 'count')
+                )
+
+            drifted = []
+            for obj in model.objects.only('pk', *fields).iterator():
+                changed = False
+                for field in fields:
+                    count = actual[field].get(obj.pk, 0)
+                    if getattr(obj, field) != count:
+                        setattr(obj, field, count)
+                        changed = True
+                if changed:
+                    drifted.append(obj)
+            model.objects.bulk_update(drifted, fields, batch_size=UPDATE_BATCH_SIZE)
+            fixed += len(drifted)
+    return fixed
@@ -0,0 +1,287 @@
+# Рассылка уведомлений game_update подписчикам
+#
+# Когда у опубликованной игры появляется новый файл или разработчик
+# публикует пост, в той же транзакции создается FanoutJob (уникальный по
+# источнику — повторная публикация не рассылает второй раз), а после
+# коммита задание уходит фоновому потоку. Запрос публикации возвращается
+# сразу, сколько бы ни было получателей.
+#
+# Получатели — подписчики разработчика и пользователи, у которых игра в
+# списке желаний (без самого автора). Они читаются кусками по CHUNK_SIZE по
+# возрастанию id, уведомления создаются bulk_create пачками по BATCH_SIZE.
+# После каждой пачки в той же транзакции сдвигается FanoutJob.cursor, поэтому
+# повтор после сбоя продолжает с места остановки и не создает дублей; если
+# задание подхватили два исполнителя, курсор под блокировкой строки
+# не даст второму записать ту же пачку.
+#
+# Письма уходят только пользователям с User.email_notifications, после
+# коммита пачки (при сбое между коммитом и отправкой письмо пачки может
+# не уйти — уведомление на сайте при этом уже есть).
+#
+# Задания, прерванные остановкой процесса, и зависшие дольше STALE_AFTER
+# подхватывает команда run_fanout (по cron).
+#
+# Тем же механизмом пост раскладывается по лентам подписчиков
+# (kind='timeline', social/feed.py).
+#
+# Настройки (settings.FANOUT):
+#   ASYNC       — False: рассылать синхронно после коммита (тесты, отладка)
+#   CHUNK_SIZE  — получателей за один запрос
+#   BATCH_SIZE  — уведомлений в одной транзакции
+#   STALE_AFTER — через сколько секунд без прогресса задание считается зависшим
+
+import atexit
+import logging
+import queue
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Follow, User
+from games.models import GameFile, Wishlist
+from . import feed, notifications
+from .models import FanoutJob, Notification, Post
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ASYNC': True,
+    'CHUNK_SIZE': 5000,
+    'BATCH_SIZE': 500,
+    'STALE_AFTER': 10 * 60,
+}
+
+
+def _setting(name):
+    return getattr(settings, 'FANOUT', {}).get(name, DEFAULTS[name])
+
+
+# --- Источники ---
+
+class NotificationSource:
+    """Уведомление game_update подписчикам автора и списку желаний игры"""
+    model = None
+
+    def audience(self, obj):
+        """Получатели рассылки (queryset пользователей, по возрастанию id)"""
+        author_id = self.author_id(obj)
+        condition = Q(pk__in=Follow.objects.filter(following_id=author_id).values('follower_id'))
+        game = self.game(obj)
+        if game is not None:
+            condition |= Q(pk__in=Wishlist.objects.filter(game=game).values('user_id'))
+        return User.objects.filter(condition, is_active=True).exclude(pk=author_id).order_by('pk')
+
+    def write(self, obj, recipients):
+        content_type = ContentType.objects.get_for_model(self.model)
+        content = self.notification(obj)
+        notifications.create_bulk([
+            Notification(
+                recipient_id=user_id,
+                sender_id=self.author_id(obj),
+                notification_type='game_update',
+                content_type=content_type,
+                object_id=obj.pk,
+                **content,
+            )
+            for user_id, _, _ in recipients
+        ])
+
+    def after_batch(self, obj, recipients):
+        _send_emails(recipients, self.notification(obj))
+
+
+class GameFileSource(NotificationSource):
+    """Новый файл (версия) опубликованной игры"""
+    model = GameFile
+
+    def load(self, object_id):
+        return GameFile.objects.select_related('game__developer').filter(pk=object_id).first()
+
+    def game(self, game_file):
+        return game_file.game
+
+    def author_id(self, game_file):
+        return game_file.game.developer_id
+
+    def notification(self, game_file):
+        game = game_file.game
+        return {
+            'title': f'Обновление {game.title}',
+            'message': f'Вышла версия {game_file.version} ({game_file.get_platform_display()}): {game_file.name}',
+            'action_url': game.get_absolute_url(),
+        }
+
+
+class PostSource(NotificationSource):
+    """Опубликованный пост разработчика"""
+    model = Post
+
+    def load(self, object_id):
+        return Post.objects.select_related('author', 'game').filter(pk=object_id, is_published=True).first()
+
+    def game(self, post):
+        return post.game
+
+    def author_id(self, post):
+        return post.author_id
+
+    def notification(self, post):
+        url = post.game.get_absolute_url() if post.game else reverse('accounts:profile', args=[post.author.username])
+        return {
+            'title': f'{post.author.username}: {post.title}',
+            'message': post.excerpt or post.content[:300],
+            'action_url': url,
+        }
+
+
+SOURCES = {
+    'game_file': GameFileSource(),
+    'post': PostSource(),
+    'timeline': feed.TimelineSource(),
+}
+
+
+# --- Выполнение ---
+
+def _send_emails(recipients, content):
+    messages = [
+        EmailMessage(content['title'], f"{content['message']}\n\n{content['action_url']}", to=[email])
+        for _, email, wants_email in recipients
+        if wants_email and email
+    ]
+    if not messages:
+        return
+    try:
+        get_connection(fail_silently=False).send_messages(messages)
+    except Exception:
+        logger.exception('Не удалось отправить %s писем рассылки', len(messages))
+
+
+def _write_batch(job, expected_cursor, source, obj, recipients):
+    """Записывает пачку и сдвигает курсор; False — задание уже ведет другой исполнитель"""
+    with transaction.atomic():
+        locked = FanoutJob.objects.select_for_update().get(pk=job.pk)
+        if locked.cursor != expected_cursor or locked.status != 'running':
+            return False
+        source.write(obj, recipients)
+        FanoutJob.objects.filter(pk=job.pk).update(
+            cursor=recipients[-1][0], sent=F('sent') + len(recipients), updated_at=timezone.now()
+        )
+    return True
+
+
+def run(job_id):
+    """Выполняет задание, если удалось его занять; возвращает количество получателей"""
+    claimed = FanoutJob.objects.filter(pk=job_id, status='pending').update(
+        status='running', attempts=F('attempts') + 1, updated_at=timezone.now()
+    )
+    if not claimed:
+        return 0
+    job = FanoutJob.objects.get(pk=job_id)
+    source = SOURCES[job.kind]
+    obj = source.load(job.object_id)
+
+    total = 0
+    if obj is not None:
+        recipients_queryset = source.audience(obj)
+        cursor = job.cursor
+        batch_size = _setting('BATCH_SIZE')
+        while True:
+            chunk = list(
+                recipients_queryset.filter(pk__gt=cursor)
+                .values_list('pk', 'email', 'email_notifications')[:_setting('CHUNK_SIZE')]
+            )
+            if not chunk:
+                break
+            for start in range(0, len(chunk), batch_size):
+                batch = chunk[start:start + batch_size]
+                if not _write_batch(job, cursor, source, obj, batch):
+                    logger.warning('Рассылка %s продолжается другим исполнителем', job.pk)
+                    return total
+                cursor = batch[-1][0]
+                total += len(batch)
+                source.after_batch(obj, batch)
+
+    FanoutJob.objects.filter(pk=job.pk, status='running').update(status='done', finished_at=timezone.now())
+    return total
+
+
+def run_pending():
+    """
+    Возвращает в очередь зависшие задания и выполняет все ожидающие,
+    возвращает количество выполненных заданий.
+    """
+    stale = timezone.now() - timedelta(seconds=_setting('STALE_AFTER'))
+    FanoutJob.objects.filter(status='running', updated_at__lt=stale).update(status='pending')
+    done = 0
+    for job_id in FanoutJob.objects.filter(status='pending').order_by('pk').values_list('pk', flat=True):
+        run(job_id)
+        done += 1
+    return done
+
+
+class FanoutWorker:
+    """Фоновый поток, выполняющий задания по одному"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='notification-fanout', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self._warn_unfinished)
+
+    def put(self, job_id):
+        self.queue.put(job_id)
+
+    def _run(self):
+        while True:
+            job_id = self.queue.get()
+            close_old_connections()
+            try:
+                run(job_id)
+            except Exception:
+                # Задание останется running и будет подхвачено run_fanout после STALE_AFTER
+                logger.exception('Рассылка %s прервана', job_id)
+
+    def _warn_unfinished(self):
+        if not self.queue.empty():
+            logger.warning('Остались невыполненные рассылки (%s), их выполнит run_fanout', self.queue.qsize())
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                worker = FanoutWorker()
+                worker.start()
+                _worker = worker
+    return _worker
+
+
+def enqueue(kind, obj):
+    """
+    Ставит рассылку об obj в очередь (в текущей транзакции, один раз на
+    источник); выполнение начинается после коммита.
+    """
+    job, created = FanoutJob.objects.get_or_create(kind=kind, object_id=obj.pk)
+    if not created:
+        return job
+    if _setting('ASYNC'):
+        transaction.on_commit(lambda: get_worker().put(job.pk))
+    else:
+        transaction.on_commit(lambda: run(job.pk))
+    return job
@@ -0,0 +1,196 @@
+# Лента постов от авторов, на которых подписан пользователь
+#
+# Гибридная раскладка:
+#   * пост обычного автора после публикации раскладывается по лентам
+#     подписчиков — строки TimelineEntry (fan-out on write, тем же заданием
+#     FanoutJob, что и рассылка уведомлений, kind='timeline');
+#   * посты автора, у которого подписчиков не меньше PULL_FOLLOWERS
+#     (User.feed_pull), не раскладываются — при чтении ленты они берутся
+#     из его постов по индексу (author, is_published, -published_at) и
+#     сливаются с лентой (fan-out on read).
+# Страница ленты — keyset по (published_at, id поста): одна выборка из
+# TimelineEntry по индексу (user, -published_at, -post), одна выборка
+# постов всех «больших» авторов из подписок (author IN подзапрос) и
+# загрузка постов страницы. Каждая выборка ограничена размером страницы,
+# поэтому стоимость не зависит от числа подписок.
+#
+# При подписке в ленту добавляются последние BACKFILL постов автора, при
+# отписке его записи удаляются. Автор переводится в режим чтения при
+# запросе, когда число подписчиков достигает порога; обратно автоматически
+# не переводится. Записи старше RETENTION дней удаляет compact() —
+# команда compact_feed.
+#
+# Настройки (settings.FEED):
+#   PULL_FOLLOWERS — с какого числа подписчиков посты автора читаются при запросе
+#   BACKFILL       — сколько постов автора добавляется в ленту при подписке
+#   RETENTION      — сколько дней хранятся записи лент
+
+from datetime import timedelta
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.pagination import InvalidCursor, KeysetPage, KeysetPaginator
+
+
+DEFAULTS = {
+    'PULL_FOLLOWERS': 1000,
+    'BACKFILL': 20,
+    'RETENTION': 180,
+}
+
+# Ключ сортировки ленты (поля Post)
+FEED_ORDERING = ('-published_at', '-id')
+
+INSERT_BATCH_SIZE = 500
+
+DELETE_BATCH_SIZE = 1000
+
+
+def _setting(name):
+    return getattr(settings, 'FEED', {}).get(name, DEFAULTS[name])
+
+
+def _entries(post, user_ids, TimelineEntry):
+    return [
+        TimelineEntry(user_id=user_id, post_id=post.pk, author_id=post.author_id, published_at=post.published_at)
+        for user_id in user_ids
+    ]
+
+
+class TimelineSource:
+    """Раскладка опубликованного поста по лентам подписчиков (для social/fanout.py)"""
+
+    def load(self, object_id):
+        from .models import Post
+
+        return Post.objects.filter(
+            pk=object_id, is_published=True, published_at__isnull=False, author__feed_pull=False
+        ).first()
+
+    def audience(self, post):
+        from accounts.models import Follow, User
+
+        return User.objects.filter(
+            pk__in=Follow.objects.filter(following_id=post.author_id).values('follower_id'), is_active=True
+        ).order_by('pk')
+
+    def write(self, post, recipients):
+        from .models import TimelineEntry
+
+        TimelineEntry.objects.bulk_create(
+            _entries(post, [user_id for user_id, _, _ in recipients], TimelineEntry),
+            batch_size=INSERT_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+    def after_batch(self, post, recipients):
+        pass
+
+
+def follow(follower_id, author):
+    """Подписка: последние посты автора в ленту и проверка порога чтения при запросе"""
+    from accounts.models import Follow, User
+    from .models import Post, TimelineEntry
+
+    if author.feed_pull:
+        return
+    if Follow.objects.filter(following=author).count() >= _setting('PULL_FOLLOWERS'):
+        User.objects.filter(pk=author.pk).update(feed_pull=True)
+        return
+    recent = (
+        Post.objects.filter(author=author, is_published=True, published_at__isnull=False)
+        .order_by(*FEED_ORDERING)[:_setting('BACKFILL')]
+    )
+    TimelineEntry.objects.bulk_create(
+        [entry for post in recent for entry in _entries(post, [follower_id], TimelineEntry)],
+        ignore_conflicts=True,
+    )
+
+
+def unfollow(follower_id, author_id):
+    """Отписка: записи автора уходят из ленты"""
+    from .models import TimelineEntry
+
+    TimelineEntry.objects.filter(user_id=follower_id, author_id=author_id).delete()
+
+
+def _after(cursor_values, date_field, id_field):
+    published_at, post_id = cursor_values
+    return Q(**{f'{date_field}__lt': published_at}) | Q(**{date_field: published_at, f'{id_field}__lt': post_id})
+
+
+def timeline(user, cursor=None, per_page=20):
+    """Страница ленты пользователя (KeysetPage постов, только «Далее»)"""
+    from accounts.models import Follow
+    from .models import Post, TimelineEntry
+
+    paginator = KeysetPaginator(Post.objects.all(), FEED_ORDERING, per_page)
+    values = None
+    if cursor:
+        try:
+            direction, values = paginator.decode_cursor(cursor)
+        except InvalidCursor:
+            values = None
+
+    size = per_page + 1
+    entries = TimelineEntry.objects.filter(user=user, post__is_published=True)
+    if values is not None:
+        entries = entries.filter(_after(values, 'published_at', 'post_id'))
+    keys = set(entries.order_by('-published_at', '-post').values_list('published_at', 'post_id')[:size])
+
+    pull_authors = Follow.objects.filter(follower=user, following__feed_pull=True).values('following_id')
+    posts = Post.objects.filter(author_id__in=pull_authors, is_published=True, published_at__isnull=False)
+    if values is not None:
+        posts = posts.filter(_after(values, 'published_at', 'id'))
+    keys.update(posts.order_by(*FEED_ORDERING).values_list('published_at', 'id')[:size])
+
+    keys = sorted(keys, reverse=True)[:size]
+    has_next = len(keys) > per_page
+    keys = keys[:per_page]
+    by_id = Post.objects.select_related('author', 'game').in_bulk([post_id for _, post_id in keys])
+    posts = [by_id[post_id] for _, post_id in keys if post_id in by_id]
+    return KeysetPage(
+        posts,
+        paginator,
+        next_cursor=paginator.encode_cursor('n', posts[-1]) if posts and has_next else None,
+    )
+
+
+def compact(days=None):
+    """Удаляет записи лент старше days (RETENTION) дней, возвращает их количество"""
+    from .models import TimelineEntry
+
+    cutoff = timezone.now() - timedelta(days=days if days is not None else _setting('RETENTION'))
+    expired = TimelineEntry.objects.filter(published_at__lt=cutoff).order_by('pk')
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('pk', flat=True)[:DELETE_BATCH_SIZE])
+        if not ids:
+            return deleted
+        count, _ = TimelineEntry.objects.filter(pk__in=ids).delete()
+        deleted += count
+
+
+def backfill(apps=global_apps):
+    """Заполняет ленты по текущим подпискам (последние BACKFILL постов авторов), возвращает количество записей"""
+    Follow = apps.get_model('accounts', 'Follow')
+    Post = apps.get_model('social', 'Post')
+    TimelineEntry = apps.get_model('social', 'TimelineEntry')
+
+    recent = {}
+    created = 0
+    with transaction.atomic():
+        for follower_id, author_id in Follow.objects.filter(following__feed_pull=False).values_list('follower_id', 'following_id').iterator():
+            if author_id not in recent:
+                recent[author_id] = list(
+                    Post.objects.filter(author_id=author_id, is_published=True, published_at__isnull=False)
+                    .order_by(*FEED_ORDERING)[:_setting('BACKFILL')]
+                )
+            entries = [entry for post in recent[author_id] for entry in _entries(post, [follower_id], TimelineEntry)]
+            TimelineEntry.objects.bulk_create(entries, batch_size=INSERT_BATCH_SIZE, ignore_conflicts=True)
+            created += len(entries)
+    return created
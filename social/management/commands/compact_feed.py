@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from social import feed
+
+
+class Command(BaseCommand):
+    help = 'Удаляет старые записи лент подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Возраст записей, дней (по умолчанию FEED["RETENTION"])')
+
+    def handle(self, *args, **options):
+        deleted = feed.compact(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Удалено записей: {deleted}'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from social import notifications
+
+
+class Command(BaseCommand):
+    help = 'Удаляет старые прочитанные уведомления'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Возраст уведомлений, дней (по умолчанию NOTIFICATIONS["READ_RETENTION"])')
+
+    def handle(self, *args, **options):
+        deleted = notifications.compact(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Удалено уведомлений: {deleted}'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from social import counter_cache
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики лайков, комментариев и ответов'
+
+    def handle(self, *args, **options):
+        fixed = counter_cache.reconcile()
+        self.stdout.write(self.style.SUCCESS(f'Исправлено объектов: {fixed}'))
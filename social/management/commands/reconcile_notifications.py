@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from social import notifications
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики непрочитанных уведомлений пользователей'
+
+    def handle(self, *args, **options):
+        fixed = notifications.reconcile_unread()
+        self.stdout.write(self.style.SUCCESS(f'Исправлено счетчиков: {fixed}'))
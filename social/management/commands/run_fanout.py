@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from social import fanout
+
+
+class Command(BaseCommand):
+    help = 'Выполняет ожидающие и зависшие рассылки уведомлений подписчикам'
+
+    def handle(self, *args, **options):
+        jobs = fanout.run_pending()
+        self.stdout.write(self.style.SUCCESS(f'Выполнено рассылок: {jobs}'))
@@ -0,0 +1,21 @@
+# Начальный расчет денормализованного рейтинга игр по существующим оценкам
+
+from django.db import migrations
+
+
+def populate_ratings(apps, schema_editor):
+    from games import ratings
+
+    ratings.reconcile(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0001_initial'),
+        ('games', '0008_game_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Начальный расчет счетчиков непрочитанных уведомлений
+
+from django.db import migrations
+
+
+def populate_unread(apps, schema_editor):
+    from social import notifications
+
+    notifications.reconcile_unread(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0002_populate_game_ratings'),
+        ('accounts', '0003_user_unread_notifications_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_unread, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0004_notification_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FanoutJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('game_file', 'Новый файл игры'), ('post', 'Новый пост')], max_length=20, verbose_name='Источник')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='ID источника')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Завершена')], default='pending', max_length=10, verbose_name='Статус')),
+                ('cursor', models.BigIntegerField(default=0, verbose_name='Курсор')),
+                ('sent', models.PositiveIntegerField(default=0, verbose_name='Создано уведомлений')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+            ],
+            options={
+                'verbose_name': 'Рассылка уведомлений',
+                'verbose_name_plural': 'Рассылки уведомлений',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='social_fanout_status')],
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+    ]
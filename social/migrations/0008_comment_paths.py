@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_paths(apps, schema_editor):
+    from social import threads
+
+    threads.rebuild_paths(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0007_counter_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Глубина'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Путь'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='root',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='social.comment'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['content_type', 'object_id', 'depth', '-created_at', '-id'], name='social_comment_roots'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['root', 'path'], name='social_comment_thread'),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
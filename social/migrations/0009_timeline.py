@@ -0,0 +1,80 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import F
+
+
+def populate_timelines(apps, schema_editor):
+    from social import feed
+
+    Post = apps.get_model('social', 'Post')
+    Post.objects.filter(is_published=True, published_at__isnull=True).update(published_at=F('created_at'))
+    feed.backfill(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('social', '0008_comment_paths'),
+        ('accounts', '0004_user_feed_pull'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('published_at', models.DateTimeField(verbose_name='Опубликовано')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи лент',
+                'ordering': ['-published_at', '-post'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='fanoutjob',
+            name='kind',
+            field=models.CharField(choices=[('game_file', 'Новый файл игры'), ('post', 'Новый пост'), ('timeline', 'Пост в ленты подписчиков')], max_length=20, verbose_name='Источник'),
+        ),
+        migrations.AlterField(
+            model_name='fanoutjob',
+            name='sent',
+            field=models.PositiveIntegerField(default=0, verbose_name='Получателей'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'is_published', '-published_at', '-id'], name='social_post_author_feed'),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='social.post'),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-published_at', '-post'], name='social_timeline_page'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'author'], name='social_timeline_author'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='timelineentry',
+            unique_together={('user', 'post')},
+        ),
+        migrations.RunPython(populate_timelines, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,15 @@
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 from django.utils.text import slugify
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.core.validators import MinValueValidator, MaxValueValidator
 from accounts.models import User
+from core.mixins import CounterFieldsMixin
 from games.models import Game
 
 
-class Review(models.Model):
+class Review(CounterFieldsMixin, models.Model):
     """Отзывы на игры"""
     
     RATING_CHOICES = [
@@ -36,6 +37,10 @@ class Review(models.Model):
     # Полезность отзыва
     helpful_count = models.PositiveIntegerField('Полезно', default=0)
     
+    # Счетчики лайков и публичных комментариев (social/counter_cache.py)
+    likes_count = models.PositiveIntegerField('Лайков', default=0, editable=False)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0, editable=False)
+    
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Обновлено', auto_now=True)
     
@@ -49,19 +54,18 @@ class Review(models.Model):
         unique_together = ('user', 'game')  # Один отзыв на игру
         ordering = ['-created_at']
     
+    COUNTER_FIELDS = ('likes_count', 'comments_count')
+    
     def __str__(self):
         return f"{self.title} - {self.user.username} ({self.rating}/5)"
     
+    def save(self, *args, **kwargs):
+        # Отзыв и рейтинг игры (social/signals.py) меняются в одной транзакции
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     def get_absolute_url(self):
         return reverse('social:review_detail', kwargs={'pk': self.pk})
-    
-    @property
-    def likes_count(self):
-        return self.likes.count()
-    
-    @property
-    def comments_count(self):
-        return self.comments.filter(is_public=True).count()
 
 
 class GameRating(models.Model):
@@ -83,9 +87,14 @@ class GameRating(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.game.title} ({self.rating}/5)"
+    
+    def save(self, *args, **kwargs):
+        # Оценка и рейтинг игры (social/signals.py) меняются в одной транзакции
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
 
-class Comment(models.Model):
+class Comment(CounterFieldsMixin, models.Model):
     """Комментарии (универсальные)"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     content = models.TextField('Комментарий')
@@ -98,8 +107,18 @@ class Comment(models.Model):
     # Иерархия комментариев
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
     
+    # Материализованный путь (social/threads.py): id предков и свой id по
+    # PATH_STEP цифр; ветка целиком читается одним запросом по (root, path)
+    root = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='+', editable=False)
+    path = models.CharField('Путь', max_length=255, blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField('Глубина', default=0, editable=False)
+    
     is_public = models.BooleanField('Публичный', default=True)
     
+    # Счетчики лайков и публичных ответов (social/counter_cache.py)
+    likes_count = models.PositiveIntegerField('Лайков', default=0, editable=False)
+    replies_count = models.PositiveIntegerField('Ответов', default=0, editable=False)
+    
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Обновлено', auto_now=True)
     
@@ -110,17 +129,40 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['-created_at']
+        indexes = [
+            # Комментарии объекта
+            models.Index(fields=['content_type', 'object_id', '-created_at'], name='social_comment_target'),
+            # Корневые комментарии объекта (keyset) и ветки по пути
+            models.Index(fields=['content_type', 'object_id', 'depth', '-created_at', '-id'], name='social_comment_roots'),
+            models.Index(fields=['root', 'path'], name='social_comment_thread'),
+        ]
+    
+    COUNTER_FIELDS = ('likes_count', 'replies_count')
+    
+    PATH_STEP = 10
+    # Ответы глубже прикрепляются к комментарию последнего уровня
+    MAX_DEPTH = 20
     
     def __str__(self):
         return f"{self.user.username}: {self.content[:50]}..."
     
-    @property
-    def likes_count(self):
-        return self.likes.count()
-    
-    @property
-    def replies_count(self):
-        return self.replies.filter(is_public=True).count()
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            # Родитель после создания не меняется: путь остается прежним
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            parent = None
+            if self.parent_id:
+                parent = Comment.objects.only('parent_id', 'root_id', 'path', 'depth').get(pk=self.parent_id)
+                if parent.depth >= self.MAX_DEPTH:
+                    self.parent_id = parent.parent_id
+                    parent.path, parent.depth = parent.path[:-self.PATH_STEP], parent.depth - 1
+            super().save(*args, **kwargs)
+            # Путь включает собственный id, поэтому дописывается после вставки
+            self.path = (parent.path if parent else '') + str(self.pk).zfill(self.PATH_STEP)
+            self.depth = parent.depth + 1 if parent else 0
+            self.root_id = parent.root_id if parent else self.pk
+            Comment.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth, root_id=self.root_id)
 
 
 class Like(models.Model):
@@ -139,12 +181,16 @@ class Like(models.Model):
         verbose_name_plural = 'Лайки'
         unique_together = ('user', 'content_type', 'object_id')
         ordering = ['-created_at']
+        indexes = [
+            # Лайки объекта
+            models.Index(fields=['content_type', 'object_id'], name='social_like_target'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} liked {self.content_object}"
 
 
-class Post(models.Model):
+class Post(CounterFieldsMixin, models.Model):
     """Посты разработчиков"""
     
     TYPE_CHOICES = [
@@ -174,6 +220,8 @@ class Post(models.Model):
     
     # Статистика
     view_count = models.PositiveIntegerField('Количество просмотров', default=0)
+    likes_count = models.PositiveIntegerField('Лайков', default=0, editable=False)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0, editable=False)
     
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Обновлено', auto_now=True)
@@ -187,6 +235,12 @@ class Post(models.Model):
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ['-is_pinned', '-created_at']
+        indexes = [
+            # Посты автора в ленте (social/feed.py)
+            models.Index(fields=['author', 'is_published', '-published_at', '-id'], name='social_post_author_feed'),
+        ]
+    
+    COUNTER_FIELDS = ('likes_count', 'comments_count')
     
     def __str__(self):
         return self.title
@@ -203,14 +257,6 @@ class Post(models.Model):
             self.published_at = timezone.now()
         
         super().save(*args, **kwargs)
-    
-    @property
-    def likes_count(self):
-        return self.likes.count()
-    
-    @property
-    def comments_count(self):
-        return self.comments.filter(is_public=True).count()
 
 
 class Notification(models.Model):
@@ -241,6 +287,11 @@ class Notification(models.Model):
     # Ссылка для перехода
     action_url = models.URLField('Ссылка', blank=True)
     
+    # Группировка однотипных событий («X и еще 41 ...», social/notifications.py)
+    group_key = models.CharField('Ключ группы', max_length=100, null=True, blank=True, editable=False)
+    actor_count = models.PositiveIntegerField('Участников', default=1)
+    recent_actors = models.JSONField('Последние участники', default=list, blank=True)
+    
     is_read = models.BooleanField('Прочитано', default=False)
     
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
@@ -248,6 +299,14 @@ class Notification(models.Model):
     class Meta:
         verbose_name = 'Уведомление'
         verbose_name_plural = 'Уведомления'
+        indexes = [
+            # Лента уведомлений (keyset по created_at, id) и непрочитанные
+            models.Index(fields=['recipient', '-created_at', '-id'], name='social_notification_inbox'),
+            models.Index(fields=['recipient', 'is_read', '-created_at', '-id'], name='social_notification_unread'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['recipient', 'group_key'], name='social_notification_group'),
+        ]
         ordering = ['-created_at']
     
     def __str__(self):
@@ -258,6 +317,67 @@ class Notification(models.Model):
         self.save(update_fields=['is_read'])
 
 
+class FanoutJob(models.Model):
+    """Рассылка подписчикам о новом файле игры или посте (см. social/fanout.py)"""
+    
+    KIND_CHOICES = [
+        ('game_file', 'Новый файл игры'),
+        ('post', 'Новый пост'),
+        ('timeline', 'Пост в ленты подписчиков'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Завершена'),
+    ]
+    
+    kind = models.CharField('Источник', max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField('ID источника')
+    status = models.CharField('Статус', max_length=10, choices=STATUS_CHOICES, default='pending')
+    
+    # id последнего обработанного получателя (получатели идут по возрастанию id)
+    cursor = models.BigIntegerField('Курсор', default=0)
+    sent = models.PositiveIntegerField('Получателей', default=0)
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+    finished_at = models.DateTimeField('Завершено', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Рассылка уведомлений'
+        verbose_name_plural = 'Рассылки уведомлений'
+        unique_together = ('kind', 'object_id')
+        indexes = [models.Index(fields=['status', 'updated_at'], name='social_fanout_status')]
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id}: {self.get_status_display()} ({self.sent})"
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписчика (см. social/feed.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    published_at = models.DateTimeField('Опубликовано')
+    
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        unique_together = ('user', 'post')
+        indexes = [
+            # Страница ленты (keyset по published_at, post) и отписка от автора
+            models.Index(fields=['user', '-published_at', '-post'], name='social_timeline_page'),
+            models.Index(fields=['user', 'author'], name='social_timeline_author'),
+        ]
+        ordering = ['-published_at', '-post']
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.post_id}"
+
+
 class ReportContent(models.Model):
     """Жалобы на контент"""
     
@@ -0,0 +1,358 @@
+# Уведомления
+#
+# Количество непрочитанных уведомлений хранится в
+# User.unread_notifications_count и меняется приращениями в транзакции
+# создания, прочтения и удаления уведомления (сигналы в social/signals.py),
+# поэтому шапка сайта показывает его без COUNT по таблице уведомлений.
+# Изменения мимо сигналов (queryset.update, правки в БД) исправляет
+# reconcile_unread() — команда reconcile_notifications.
+#
+# Лента читается keyset-пагинацией по индексам (recipient, -created_at, -id)
+# и (recipient, is_read, -created_at, -id); mark_read() отмечает прочитанными
+# пачку или все уведомления одним UPDATE. Новые уведомления доставляются в
+# открытые вкладки через SSE (social/push.py). Ключ доставки — пара
+# (created_at, id), а не id: поднятая группа сохраняет id, но получает новый
+# created_at, и после переподключения дочитывается по тому же индексу.
+#
+# Лайки, комментарии и подписки не создают строку на каждое событие:
+# notify_grouped() сворачивает события одного типа об одном объекте в одну
+# строку получателя (уникальный ключ recipient + group_key) с числом
+# участников и несколькими последними из них — «X, Y и еще 40 ...».
+# Новое событие обновляет эту строку под блокировкой, поднимает ее наверх
+# ленты и снова делает непрочитанной. actor_count — число различных
+# участников: снятый лайк и отписка убирают участника из группы
+# (withdraw_grouped(), пустая группа удаляется), поэтому лайк — снятие —
+# лайк не увеличивает счетчик. Повторный комментарий того же пользователя
+# (repeat=True) поднимает группу и делает ее непрочитанной — это новый
+# текст, который стоит прочитать, — но участника второй раз не считает.
+# Размер таблицы и ленты растет с числом различных объектов, а не с
+# активностью.
+#
+# Прочитанные уведомления старше READ_RETENTION удаляет compact() —
+# команда compact_notifications по расписанию.
+#
+# Настройки (settings.NOTIFICATIONS):
+#   RECENT_ACTORS  — сколько последних участников хранится в группе
+#   READ_RETENTION — через сколько дней удаляются прочитанные уведомления
+
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+
+DEFAULTS = {
+    'RECENT_ACTORS': 3,
+    'READ_RETENTION': 90,
+}
+
+UPDATE_BATCH_SIZE = 500
+
+DELETE_BATCH_SIZE = 1000
+
+# Тексты групп: заголовок и глагол (один участник, несколько)
+GROUPS = {
+    'like': ('Новые лайки', 'поставил лайк', 'поставили лайк'),
+    'comment': ('Новые комментарии', 'оставил комментарий', 'оставили комментарии'),
+    'follow': ('Новые подписчики', 'подписался на вас', 'подписались на вас'),
+}
+
+# Ключ keyset-пагинации ленты
+INBOX_ORDERING = ('-created_at', '-id')
+
+# Сколько пропущенных уведомлений отдается при переподключении к потоку
+MISSED_LIMIT = 50
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _setting(name):
+    return getattr(settings, 'NOTIFICATIONS', {}).get(name, DEFAULTS[name])
+
+
+def apply_unread(changes):
+    """Применяет приращения счетчика: changes — список (user_id, +1/-1)"""
+    from accounts.models import User
+
+    per_user = defaultdict(int)
+    for user_id, delta in changes:
+        per_user[user_id] += delta
+
+    with transaction.atomic(savepoint=False):
+        for user_id, delta in per_user.items():
+            if delta:
+                User.objects.filter(pk=user_id).update(
+                    unread_notifications_count=F('unread_notifications_count') + delta
+                )
+
+
+def create_bulk(objects):
+    """
+    Создает уведомления пачкой bulk_create (без сигналов): счетчики
+    непрочитанных увеличиваются одним UPDATE на каждое различное приращение,
+    доставка по SSE — после коммита. Возвращает созданные объекты.
+    """
+    from accounts.models import User
+    from .models import Notification
+    from . import push
+
+    with transaction.atomic(savepoint=False):
+        created = Notification.objects.bulk_create(objects, batch_size=UPDATE_BATCH_SIZE)
+        per_count = defaultdict(list)
+        for user_id, count in Counter(n.recipient_id for n in created if not n.is_read).items():
+            per_count[count].append(user_id)
+        for count, user_ids in per_count.items():
+            User.objects.filter(pk__in=user_ids).update(
+                unread_notifications_count=F('unread_notifications_count') + count
+            )
+    transaction.on_commit(lambda: push.publish_notifications(created))
+    return created
+
+
+def reconcile_unread(apps=global_apps):
+    """Пересчитывает счетчики непрочитанных, возвращает количество исправленных"""
+    User = apps.get_model('accounts', 'User')
+    Notification = apps.get_model('social', 'Notification')
+
+    with transaction.atomic():
+        actual = dict(
+            Notification.objects.filter(is_read=False)
+            .values('recipient_id')
+            .annotate(count=Count('id'))
+            .values_list('recipient_id', 'count')
+        )
+        drifted = []
+        users = User.objects.filter(unread_notifications_count__gt=0) | User.objects.filter(pk__in=actual)
+        for user in users.only('pk', 'unread_notifications_count').iterator():
+            count = actual.get(user.pk, 0)
+            if user.unread_notifications_count != count:
+                user.unread_notifications_count = count
+                drifted.append(user)
+        User.objects.bulk_update(drifted, ['unread_notifications_count'], batch_size=UPDATE_BATCH_SIZE)
+    return len(drifted)
+
+
+def inbox(user, unread_only=False):
+    """Уведомления пользователя в порядке ленты"""
+    from .models import Notification
+
+    queryset = Notification.objects.filter(recipient=user)
+    if unread_only:
+        queryset = queryset.filter(is_read=False)
+    return queryset.select_related('sender').order_by(*INBOX_ORDERING)
+
+
+def mark_read(user, ids=None):
+    """
+    Отмечает прочитанными уведомления ids (или все) одним UPDATE,
+    возвращает их количество.
+    """
+    from .models import Notification
+
+    with transaction.atomic():
+        queryset = Notification.objects.filter(recipient=user, is_read=False)
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        # UPDATE мимо сигналов: счетчик уменьшаем на число реально измененных строк
+        updated = queryset.update(is_read=True)
+        apply_unread([(user.pk, -updated)])
+    return updated
+
+
+def delivery_key(notification):
+    """Ключ доставки по SSE: (микросекунды created_at, id)"""
+    return (notification.created_at - EPOCH) // timedelta(microseconds=1), notification.pk
+
+
+def format_cursor(key):
+    """Значение Last-Event-ID для ключа доставки"""
+    return '{}-{}'.format(*key)
+
+
+def parse_cursor(value):
+    """Ключ доставки из Last-Event-ID или None"""
+    micros, sep, pk = value.partition('-')
+    if not sep or not micros.isdigit() or not pk.isdigit():
+        return None
+    return int(micros), int(pk)
+
+
+def missed_since(user_id, key):
+    """Уведомления новее ключа доставки key (для переподключившегося клиента), по возрастанию"""
+    from .models import Notification
+
+    micros, pk = key
+    created_at = EPOCH + timedelta(microseconds=micros)
+    return list(
+        Notification.objects.filter(recipient_id=user_id)
+        .filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+        .order_by('-created_at', '-id')[:MISSED_LIMIT]
+    )[::-1]
+
+
+def _describe(target):
+    title = getattr(target, 'title', None) or getattr(target, 'content', None) or str(target)
+    return title if len(title) <= 60 else title[:57] + '...'
+
+
+def _group_text(notification_type, actors, actor_count, target):
+    """(заголовок, сообщение) группы: «X, Y и еще N подписались на вас»"""
+    title, one, many = GROUPS[notification_type]
+    names = [username for _, username in actors]
+    others = actor_count - len(names)
+    if not names:
+        # Все последние участники ушли из группы
+        who = f'Еще {others}'
+    elif others > 0:
+        who = f"{', '.join(names)} и еще {others}"
+    elif len(names) > 1:
+        who = f"{', '.join(names[:-1])} и {names[-1]}"
+    else:
+        who = names[0]
+    message = f'{who} {one if actor_count == 1 else many}'
+    if target is not None:
+        message += f' «{_describe(target)}»'
+    return title, message
+
+
+def group_key(notification_type, target=None):
+    """Ключ группы: тип события и объект (для подписок — только тип)"""
+    if target is None:
+        return notification_type
+    from django.contrib.contenttypes.models import ContentType
+
+    content_type = ContentType.objects.get_for_model(target)
+    return f'{notification_type}:{content_type.pk}:{target.pk}'
+
+
+def notify_grouped(notification_type, recipient_id, actor, target=None, action_url='', repeat=False):
+    """
+    Добавляет событие actor в группу уведомлений получателя (создает ее
+    при первом событии), возвращает уведомление или None, если событие
+    уже учтено. repeat=True — actor уже участвует в группе (например,
+    второй комментарий): группа поднимается, но участник не считается
+    второй раз.
+    """
+    from .models import Notification
+    from . import push
+
+    if recipient_id == actor.pk:
+        return None
+    key = group_key(notification_type, target)
+    groups = Notification.objects.select_for_update().filter(recipient_id=recipient_id, group_key=key)
+
+    with transaction.atomic():
+        notification = groups.first()
+        if notification is None:
+            title, message = _group_text(notification_type, [[actor.pk, actor.username]], 1, target)
+            try:
+                with transaction.atomic():
+                    # Счетчик непрочитанных и доставку по SSE выполняют сигналы
+                    return Notification.objects.create(
+                        recipient_id=recipient_id,
+                        sender=actor,
+                        notification_type=notification_type,
+                        title=title,
+                        message=message,
+                        content_object=target,
+                        action_url=action_url,
+                        group_key=key,
+                        recent_actors=[[actor.pk, actor.username]],
+                    )
+            except IntegrityError:
+                # Группу одновременно создал другой запрос
+                notification = groups.get()
+
+        known = any(actor_id == actor.pk for actor_id, _ in notification.recent_actors)
+        if known and not repeat:
+            return None
+        was_read = notification.is_read
+        if not known and not repeat:
+            notification.actor_count += 1
+        notification.recent_actors = (
+            [[actor.pk, actor.username]]
+            + [entry for entry in notification.recent_actors if entry[0] != actor.pk]
+        )[:_setting('RECENT_ACTORS')]
+        notification.title, notification.message = _group_text(
+            notification_type, notification.recent_actors, notification.actor_count, target
+        )
+        notification.sender = actor
+        notification.is_read = False
+        notification.created_at = timezone.now()
+        # UPDATE мимо сигналов: счетчик — только если группа снова непрочитанная
+        Notification.objects.filter(pk=notification.pk).update(
+            actor_count=notification.actor_count,
+            recent_actors=notification.recent_actors,
+            title=notification.title,
+            message=notification.message,
+            sender=actor,
+            is_read=False,
+            created_at=notification.created_at,
+        )
+        if was_read:
+            apply_unread([(recipient_id, 1)])
+        # Поднятую группу доставляем всегда: текст новый, а число непрочитанных
+        # во вкладке растет, только если группа была прочитана
+        transaction.on_commit(lambda: push.publish(
+            recipient_id, push.serialize(notification, new_unread=was_read)
+        ))
+    return notification
+
+
+def withdraw_grouped(notification_type, recipient_id, actor_id, target=None):
+    """
+    Убирает участника из группы (снятый лайк, отписка): счетчик
+    уменьшается, последняя группа удаляется. Прочитанность и место в ленте
+    не меняются.
+    """
+    from .models import Notification
+
+    if recipient_id == actor_id:
+        return
+    key = group_key(notification_type, target)
+    with transaction.atomic():
+        notification = Notification.objects.select_for_update().filter(
+            recipient_id=recipient_id, group_key=key
+        ).first()
+        if notification is None:
+            return
+        if notification.actor_count <= 1:
+            # Счетчик непрочитанных уменьшает сигнал удаления
+            notification.delete()
+            return
+        notification.actor_count -= 1
+        notification.recent_actors = [
+            entry for entry in notification.recent_actors if entry[0] != actor_id
+        ]
+        notification.title, notification.message = _group_text(
+            notification_type, notification.recent_actors, notification.actor_count, target
+        )
+        Notification.objects.filter(pk=notification.pk).update(
+            actor_count=notification.actor_count,
+            recent_actors=notification.recent_actors,
+            title=notification.title,
+            message=notification.message,
+        )
+
+
+def compact(days=None):
+    """Удаляет прочитанные уведомления старше days (READ_RETENTION) дней, возвращает их количество"""
+    from .models import Notification
+
+    cutoff = timezone.now() - timedelta(days=days if days is not None else _setting('READ_RETENTION'))
+    expired = Notification.objects.filter(is_read=True, created_at__lt=cutoff).order_by('pk')
+    deleted = 0
+    last = 0
+    while True:
+        ids = list(expired.filter(pk__gt=last).values_list('pk', flat=True)[:DELETE_BATCH_SIZE])
+        if not ids:
+            return deleted
+        last = ids[-1]
+        # Уведомление могли снова сделать непрочитанным после выборки
+        count, _ = Notification.objects.filter(pk__in=ids, is_read=True).delete()
+        deleted += count
+
@@ -0,0 +1,188 @@
+# Доставка уведомлений в браузер (Server-Sent Events)
+#
+# Эндпоинт social:notification_stream — асинхронное представление; под
+# ASGI-сервером (uvicorn indiedev_platform.asgi:application) каждое открытое
+# соединение — это корутина, ожидающая свою asyncio.Queue, без потока и без
+# опроса БД, поэтому тысячи простаивающих соединений обходятся дешево.
+#
+# Процесс держит один общий подписчик (Hub) и раскладывает сообщения по
+# очередям соединений получателя:
+#   * BACKEND='local' — публикация внутри процесса (разработка, один процесс
+#     ASGI-сервера, в котором создаются и уведомления);
+#   * BACKEND='redis' — публикация в канал Redis, каждый процесс слушает
+#     все каналы одной подпиской PSUBSCRIBE, поэтому уведомление, созданное
+#     в любом процессе (WSGI, cron, воркер), дойдет до любого соединения.
+# Сообщения не хранятся: после переподключения клиент присылает
+# Last-Event-ID — ключ доставки (created_at, id), — и пропущенное, в том
+# числе поднятые группы, дочитывается из БД (missed_since).
+#
+# Под WSGI (runserver, Gunicorn) асинхронный поток читается синхронно до
+# конца и навсегда занимает рабочий процесс, поэтому поток выключен, пока
+# ENABLED не включен явно: эндпоинт отвечает 204 (браузер не
+# переподключается), а base.html не открывает EventSource. Включать, только
+# если /social/notifications/stream/ проксируется на ASGI-сервер (nginx.conf,
+# DEPLOYMENT.md).
+#
+# Настройки (settings.NOTIFICATIONS_PUSH):
+#   ENABLED    — поток обслуживает ASGI-сервер (uvicorn); по умолчанию выключен
+#   BACKEND    — 'local' или 'redis'
+#   REDIS_URL  — адрес Redis для BACKEND='redis'
+#   KEY_PREFIX — префикс каналов в Redis
+#   HEARTBEAT  — период комментария-«пульса» в потоке, секунд
+#   QUEUE_SIZE — сколько сообщений копится для медленного соединения
+
+import asyncio
+import contextlib
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+from . import notifications
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'BACKEND': 'local',
+    'REDIS_URL': 'redis://localhost:6379/0',
+    'KEY_PREFIX': 'notifications',
+    'HEARTBEAT': 25,
+    'QUEUE_SIZE': 100,
+}
+
+RECONNECT_INTERVAL = 5
+
+
+def _setting(name):
+    return getattr(settings, 'NOTIFICATIONS_PUSH', {}).get(name, DEFAULTS[name])
+
+
+def enabled():
+    return _setting('ENABLED')
+
+
+def heartbeat():
+    return _setting('HEARTBEAT')
+
+
+def _channel(user_id):
+    return f"{_setting('KEY_PREFIX')}:{user_id}"
+
+
+def serialize(notification, new_unread=None):
+    """
+    Сообщение потока. new_unread — увеличивает ли уведомление число
+    непрочитанных (по умолчанию — если оно не прочитано).
+    """
+    return {
+        'id': notification.pk,
+        'cursor': notifications.format_cursor(notifications.delivery_key(notification)),
+        'new_unread': not notification.is_read if new_unread is None else new_unread,
+        'type': notification.notification_type,
+        'title': notification.title,
+        'message': notification.message,
+        'url': notification.action_url,
+        'created_at': notification.created_at.isoformat(),
+    }
+
+
+class Hub:
+    """Подписки соединений процесса: user_id -> множество очередей"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._loop = None
+        self._listener = None
+
+    def _deliver(self, user_id, message):
+        for queue in self._subscribers.get(user_id, ()):
+            if queue.full():
+                # Медленный клиент: теряем самое старое, он дочитает его по Last-Event-ID
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    def deliver_threadsafe(self, user_id, message):
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, user_id, message)
+
+    async def _listen_redis(self):
+        import redis.asyncio as redis
+
+        pattern = _channel('*')
+        while True:
+            client = redis.Redis.from_url(_setting('REDIS_URL'))
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(pattern)
+                    async for item in pubsub.listen():
+                        if item['type'] != 'pmessage':
+                            continue
+                        user_id = int(item['channel'].decode().rsplit(':', 1)[1])
+                        self._deliver(user_id, json.loads(item['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Подписка на уведомления в Redis прервана')
+                await asyncio.sleep(RECONNECT_INTERVAL)
+            finally:
+                await client.aclose()
+
+    def _start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        if _setting('BACKEND') == 'redis':
+            self._listener = loop.create_task(self._listen_redis())
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, user_id):
+        """Очередь новых уведомлений пользователя на время соединения"""
+        self._start()
+        queue = asyncio.Queue(maxsize=_setting('QUEUE_SIZE'))
+        self._subscribers[user_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[user_id].discard(queue)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+
+hub = Hub()
+
+_redis = None
+_redis_lock = threading.Lock()
+
+
+def _redis_client():
+    global _redis
+    if _redis is None:
+        with _redis_lock:
+            if _redis is None:
+                import redis
+
+                _redis = redis.Redis.from_url(_setting('REDIS_URL'))
+    return _redis
+
+
+def publish(user_id, message):
+    """Отправляет сообщение всем открытым соединениям пользователя (из любого потока)"""
+    if _setting('BACKEND') == 'redis':
+        try:
+            _redis_client().publish(_channel(user_id), json.dumps(message, ensure_ascii=False))
+        except Exception:
+            # Доставка — best effort: уведомление уже в БД, клиент увидит его позже
+            logger.exception('Не удалось опубликовать уведомление пользователя %s', user_id)
+        return
+    hub.deliver_threadsafe(user_id, message)
+
+
+def publish_notifications(notifications):
+    for notification in notifications:
+        publish(notification.recipient_id, serialize(notification))
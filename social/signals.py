@@ -0,0 +1,227 @@
+# Сигналы приложения social
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.urls import NoReverseMatch, reverse
+
+from accounts.models import Follow, User
+from games import ratings
+from games.models import GameFile
+from . import counter_cache, fanout, feed, notifications, push
+from .models import Comment, GameRating, Like, Notification, Post, Review
+
+
+def _contribution(instance):
+    """(игра, оценка), которые объект вносит в рейтинг игры, или None"""
+    if isinstance(instance, Review) and not instance.is_public:
+        return None
+    return (instance.game_id, instance.rating)
+
+
+@receiver(pre_save, sender=Review)
+@receiver(pre_save, sender=GameRating)
+def remember_rating(sender, instance, raw=False, **kwargs):
+    instance._previous_contribution = None
+    if raw or not instance.pk:
+        return
+    previous = sender.objects.filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._previous_contribution = _contribution(previous)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=GameRating)
+def update_game_rating(sender, instance, raw=False, **kwargs):
+    """Переносит изменение оценки в рейтинг игры"""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_contribution', None)
+    current = _contribution(instance)
+    if previous == current:
+        return
+    changes = []
+    if previous:
+        changes.append((*previous, -1))
+    if current:
+        changes.append((*current, 1))
+    ratings.apply(changes)
+
+
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=GameRating)
+def remove_game_rating(sender, instance, **kwargs):
+    current = _contribution(instance)
+    if current:
+        ratings.apply([(*current, -1)])
+
+
+@receiver(pre_save, sender=Like)
+@receiver(pre_save, sender=Comment)
+def remember_counted(sender, instance, raw=False, **kwargs):
+    instance._previous_counted = []
+    if raw or not instance.pk:
+        return
+    previous = sender.objects.filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._previous_counted = counter_cache.contributions(previous)
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_save, sender=Comment)
+def update_counter_cache(sender, instance, raw=False, **kwargs):
+    """Переносит изменение лайка или комментария в счетчики объектов"""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_counted', [])
+    current = counter_cache.contributions(instance)
+    if previous == current:
+        return
+    counter_cache.apply(
+        [(*target, -1) for target in previous] + [(*target, 1) for target in current]
+    )
+
+
+@receiver(post_delete, sender=Like)
+@receiver(post_delete, sender=Comment)
+def remove_counter_cache(sender, instance, **kwargs):
+    counter_cache.apply([(*target, -1) for target in counter_cache.contributions(instance)])
+
+
+@receiver(post_save, sender=Notification)
+def push_notification(sender, instance, created=False, raw=False, **kwargs):
+    """Отправляет новое уведомление в открытые вкладки получателя после коммита"""
+    if created and not raw:
+        transaction.on_commit(lambda: push.publish_notifications([instance]))
+
+
+@receiver(pre_save, sender=Notification)
+def remember_notification_state(sender, instance, raw=False, **kwargs):
+    instance._previous_unread = None
+    if raw or not instance.pk:
+        return
+    previous = Notification.objects.filter(pk=instance.pk).values_list('recipient_id', 'is_read').first()
+    if previous is not None and not previous[1]:
+        instance._previous_unread = previous[0]
+
+
+@receiver(post_save, sender=Notification)
+def update_unread_count(sender, instance, raw=False, **kwargs):
+    """Переносит изменение уведомления в счетчик непрочитанных получателя"""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_unread', None)
+    current = None if instance.is_read else instance.recipient_id
+    if previous == current:
+        return
+    changes = []
+    if previous:
+        changes.append((previous, -1))
+    if current:
+        changes.append((current, 1))
+    notifications.apply_unread(changes)
+
+
+@receiver(post_delete, sender=Notification)
+def remove_unread_count(sender, instance, **kwargs):
+    if not instance.is_read:
+        notifications.apply_unread([(instance.recipient_id, -1)])
+
+
+@receiver(post_save, sender=GameFile)
+def fanout_game_file(sender, instance, created=False, raw=False, **kwargs):
+    """Новый файл опубликованной игры — уведомление подписчикам (social/fanout.py)"""
+    if created and not raw and instance.game.is_published:
+        fanout.enqueue('game_file', instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_published(sender, instance, raw=False, **kwargs):
+    instance._was_published = False
+    if not raw and instance.pk:
+        instance._was_published = bool(
+            Post.objects.filter(pk=instance.pk).values_list('is_published', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Post)
+def fanout_post(sender, instance, raw=False, **kwargs):
+    """Пост опубликован — уведомление подписчикам и запись в их ленты (один раз на пост)"""
+    if not raw and instance.is_published and not getattr(instance, '_was_published', False):
+        fanout.enqueue('post', instance)
+        # Посты «больших» авторов не раскладываются — лента читает их сама (social/feed.py)
+        if User.objects.filter(pk=instance.author_id, feed_pull=False).exists():
+            fanout.enqueue('timeline', instance)
+
+
+def _owner_id(target):
+    """Автор объекта, которому адресуются лайки и комментарии"""
+    for field in ('author_id', 'developer_id', 'user_id'):
+        owner_id = getattr(target, field, None)
+        if owner_id is not None:
+            return owner_id
+    return None
+
+
+def _notify_owner(notification_type, actor, target, repeat=False):
+    owner_id = _owner_id(target) if target is not None else None
+    if owner_id is None:
+        return
+    try:
+        url = target.get_absolute_url() if hasattr(target, 'get_absolute_url') else ''
+    except NoReverseMatch:
+        # У постов пока нет собственной страницы
+        url = ''
+    notifications.notify_grouped(notification_type, owner_id, actor, target, url, repeat=repeat)
+
+
+@receiver(post_save, sender=Like)
+def notify_like(sender, instance, created=False, raw=False, **kwargs):
+    """Лайк — в сгруппированное уведомление автору объекта"""
+    if created and not raw:
+        _notify_owner('like', instance.user, instance.content_object)
+
+
+@receiver(post_delete, sender=Like)
+def withdraw_like(sender, instance, **kwargs):
+    """Снятый лайк убирает участника из группы: повторный лайк не завышает счетчик"""
+    target = instance.content_object
+    owner_id = _owner_id(target) if target is not None else None
+    if owner_id is not None:
+        notifications.withdraw_grouped('like', owner_id, instance.user_id, target)
+
+
+@receiver(post_save, sender=Comment)
+def notify_comment(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Комментарий — автору объекта, ответ — автору родительского комментария.
+    Повторный комментарий поднимает группу, но не считается новым участником.
+    """
+    if created and not raw and instance.is_public:
+        if instance.parent_id:
+            target = instance.parent
+            earlier = Comment.objects.filter(parent_id=instance.parent_id)
+        else:
+            target = instance.content_object
+            earlier = Comment.objects.filter(
+                content_type_id=instance.content_type_id, object_id=instance.object_id, parent__isnull=True
+            )
+        repeat = earlier.filter(user_id=instance.user_id, is_public=True).exclude(pk=instance.pk).exists()
+        _notify_owner('comment', instance.user, target, repeat=repeat)
+
+
+@receiver(post_save, sender=Follow)
+def notify_follow(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        following = instance.following
+        notifications.notify_grouped(
+            'follow', following.pk, instance.follower,
+            action_url=reverse('accounts:profile', args=[following.username]),
+        )
+        feed.follow(instance.follower_id, following)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_from_feed(sender, instance, **kwargs):
+    feed.unfollow(instance.follower_id, instance.following_id)
+    notifications.withdraw_grouped('follow', instance.following_id, instance.follower_id)
+
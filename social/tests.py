@@ -0,0 +1,300 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Follow, User
+from games.models import Game, Wishlist
+from . import counter_cache, fanout, notifications, push, threads
+from .models import Comment, FanoutJob, Like, Notification, Post
+
+
+def make_user(username, **kwargs):
+    return User.objects.create_user(username=username, email=f'{username}@example.com', password='x', **kwargs)
+
+
+@override_settings(FANOUT={'ASYNC': False, 'BATCH_SIZE': 2, 'CHUNK_SIZE': 3})
+class FanoutTests(TestCase):
+    """Рассылка game_update подписчикам пачками с курсором (social/fanout.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = make_user('author', is_developer=True)
+        cls.game = Game.objects.create(
+            developer=cls.author, title='Игра', slug='game', description='', short_description='', is_published=True
+        )
+        cls.followers = [make_user(f'follower{i}') for i in range(4)]
+        for user in cls.followers:
+            Follow.objects.create(follower=user, following=cls.author)
+        # Подписчик со списком желаний получает одно уведомление, автор — ни одного
+        Wishlist.objects.create(user=cls.followers[0], game=cls.game)
+        cls.wisher = make_user('wisher', email_notifications=False)
+        Wishlist.objects.create(user=cls.wisher, game=cls.game)
+        Wishlist.objects.create(user=cls.author, game=cls.game)
+        cls.audience = sorted(user.pk for user in cls.followers + [cls.wisher])
+
+    def publish(self):
+        # В TestCase коммита нет: задание остается pending и выполняется вручную
+        post = Post.objects.create(author=self.author, game=self.game, title='Новости', slug='news', content='Текст')
+        return post, FanoutJob.objects.get(kind='post', object_id=post.pk)
+
+    def recipients(self):
+        return sorted(
+            Notification.objects.filter(notification_type='game_update').values_list('recipient_id', flat=True)
+        )
+
+    def test_run_notifies_audience_once(self):
+        post, job = self.publish()
+        self.assertEqual(fanout.run(job.pk), len(self.audience))
+
+        self.assertEqual(self.recipients(), self.audience)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.sent, job.cursor), ('done', 5, self.audience[-1]))
+        self.assertEqual(len(mail.outbox), 4)
+        # Повторный запуск и повторная публикация не рассылают второй раз
+        self.assertEqual(fanout.run(job.pk), 0)
+        post.save()
+        self.assertEqual(FanoutJob.objects.filter(kind='post').count(), 1)
+        self.assertEqual(len(self.recipients()), len(self.audience))
+
+    def test_interrupted_job_resumes_after_last_batch(self):
+        post, job = self.publish()
+        source = fanout.SOURCES['post']
+        write = source.write
+        calls = []
+
+        def failing_write(obj, recipients):
+            calls.append(recipients)
+            if len(calls) == 2:
+                raise RuntimeError
+            write(obj, recipients)
+
+        with mock.patch.object(source, 'write', side_effect=failing_write):
+            with self.assertRaises(RuntimeError):
+                fanout.run(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.sent, job.cursor), ('running', 2, self.audience[1]))
+        self.assertEqual(self.recipients(), self.audience[:2])
+
+        # Зависшее задание подхватывает run_pending и продолжает с курсора
+        FanoutJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        # Вместе с ним выполняется и раскладка поста по лентам (kind='timeline')
+        self.assertEqual(fanout.run_pending(), 2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.sent, job.attempts), ('done', 5, 2))
+        self.assertEqual(self.recipients(), self.audience)
+
+    def test_fresh_running_job_is_not_requeued(self):
+        _, job = self.publish()
+        FanoutJob.objects.filter(pk=job.pk).update(status='running')
+        fanout.run_pending()
+        self.assertEqual(FanoutJob.objects.get(pk=job.pk).status, 'running')
+        self.assertEqual(self.recipients(), [])
+
+    def test_batch_is_skipped_when_cursor_moved(self):
+        post, job = self.publish()
+        FanoutJob.objects.filter(pk=job.pk).update(status='running', cursor=self.audience[1])
+        batch = [(self.audience[0], '', False)]
+        self.assertFalse(fanout._write_batch(job, 0, fanout.SOURCES['post'], post, batch))
+        self.assertEqual(self.recipients(), [])
+
+
+class GroupedNotificationTests(TestCase):
+    """Группировка уведомлений и ключ доставки по SSE (social/notifications.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', is_developer=True)
+        cls.game = Game.objects.create(
+            developer=cls.owner, title='Игра', slug='game', description='', short_description='', is_published=True
+        )
+        cls.actors = [make_user(f'actor{i}') for i in range(4)]
+
+    def notify(self, actor, repeat=False):
+        return notifications.notify_grouped('like', self.owner.pk, actor, self.game, repeat=repeat)
+
+    def unread(self):
+        return User.objects.values_list('unread_notifications_count', flat=True).get(pk=self.owner.pk)
+
+    def group(self):
+        return Notification.objects.get(recipient=self.owner, notification_type='like')
+
+    def test_actors_are_grouped(self):
+        for actor in self.actors:
+            self.notify(actor)
+        group = self.group()
+        self.assertEqual(group.actor_count, 4)
+        self.assertEqual([username for _, username in group.recent_actors], ['actor3', 'actor2', 'actor1'])
+        self.assertEqual(group.message, 'actor3, actor2, actor1 и еще 1 поставили лайк «Игра»')
+        self.assertEqual(self.unread(), 1)
+
+    def test_same_actor_is_counted_once(self):
+        self.notify(self.actors[0])
+        self.assertIsNone(self.notify(self.actors[0]))
+        self.assertIsNone(notifications.notify_grouped('like', self.owner.pk, self.owner, self.game))
+        self.assertEqual(self.group().actor_count, 1)
+
+    def test_repeat_bumps_group_without_new_actor(self):
+        self.notify(self.actors[0])
+        self.notify(self.actors[1])
+        before = self.group().created_at
+        self.notify(self.actors[0], repeat=True)
+        group = self.group()
+        self.assertEqual(group.actor_count, 2)
+        self.assertEqual(group.recent_actors[0][1], 'actor0')
+        self.assertGreater(group.created_at, before)
+
+    def test_bump_of_read_group_is_delivered_as_new_unread(self):
+        self.notify(self.actors[0])
+        notifications.mark_read(self.owner)
+        self.assertEqual(self.unread(), 0)
+
+        with mock.patch.object(push, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.notify(self.actors[1])
+            with self.captureOnCommitCallbacks(execute=True):
+                self.notify(self.actors[2])
+        self.assertEqual(self.unread(), 1)
+        self.assertEqual([call.args[1]['new_unread'] for call in publish.call_args_list], [True, False])
+
+    def test_withdraw_removes_actor_and_last_group(self):
+        self.notify(self.actors[0])
+        self.notify(self.actors[1])
+        notifications.withdraw_grouped('like', self.owner.pk, self.actors[1].pk, self.game)
+        group = self.group()
+        self.assertEqual((group.actor_count, group.message), (1, 'actor0 поставил лайк «Игра»'))
+
+        notifications.withdraw_grouped('like', self.owner.pk, self.actors[0].pk, self.game)
+        self.assertFalse(Notification.objects.filter(recipient=self.owner).exists())
+        self.assertEqual(self.unread(), 0)
+
+    def test_cursor_round_trip(self):
+        group = self.notify(self.actors[0])
+        key = notifications.delivery_key(group)
+        self.assertEqual(notifications.parse_cursor(notifications.format_cursor(key)), key)
+        for value in ('', '42', 'abc-1', '1-x', '-1-2'):
+            self.assertIsNone(notifications.parse_cursor(value))
+
+    def test_missed_since_returns_bumped_group(self):
+        group = self.notify(self.actors[0])
+        follow = notifications.notify_grouped('follow', self.owner.pk, self.actors[1])
+        key = notifications.delivery_key(Notification.objects.get(pk=follow.pk))
+        self.assertEqual(notifications.missed_since(self.owner.pk, key), [])
+
+        # Группа с меньшим id поднята позже курсора — клиент должен ее получить
+        self.notify(self.actors[2])
+        self.assertLess(group.pk, follow.pk)
+        self.assertEqual([n.pk for n in notifications.missed_since(self.owner.pk, key)], [group.pk])
+
+
+class CounterCacheTests(TestCase):
+    """Счетчики лайков, комментариев и ответов на объектах (social/counter_cache.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = make_user('author', is_developer=True)
+        cls.readers = [make_user(f'reader{i}') for i in range(2)]
+        cls.post = Post.objects.create(author=cls.author, title='Пост', slug='post', content='Текст')
+
+    def comment(self, user, target, **kwargs):
+        return Comment.objects.create(user=user, content='Комментарий', content_object=target, **kwargs)
+
+    def counts(self, obj, *fields):
+        return type(obj).objects.values_list(*fields).get(pk=obj.pk)
+
+    def test_likes_follow_create_and_delete(self):
+        likes = [Like.objects.create(user=user, content_object=self.post) for user in self.readers]
+        self.assertEqual(self.counts(self.post, 'likes_count'), (2,))
+        likes[0].delete()
+        self.assertEqual(self.counts(self.post, 'likes_count'), (1,))
+
+    def test_replies_and_visibility(self):
+        root = self.comment(self.readers[0], self.post)
+        reply = self.comment(self.readers[1], self.post, parent=root)
+        self.assertEqual(self.counts(self.post, 'comments_count'), (2,))
+        self.assertEqual(self.counts(root, 'replies_count'), (1,))
+
+        reply.is_public = False
+        reply.save()
+        self.assertEqual(self.counts(self.post, 'comments_count'), (1,))
+        self.assertEqual(self.counts(root, 'replies_count'), (0,))
+
+        reply.is_public = True
+        reply.save()
+        reply.delete()
+        self.assertEqual(self.counts(root, 'replies_count'), (0,))
+
+    def test_reconcile_fixes_drift(self):
+        root = self.comment(self.readers[0], self.post)
+        Like.objects.create(user=self.readers[1], content_object=root)
+        Post.objects.filter(pk=self.post.pk).update(comments_count=9, likes_count=3)
+        Comment.objects.filter(pk=root.pk).update(likes_count=0)
+
+        self.assertEqual(counter_cache.reconcile(), 2)
+        self.assertEqual(self.counts(self.post, 'likes_count', 'comments_count'), (0, 1))
+        self.assertEqual(self.counts(root, 'likes_count'), (1,))
+        self.assertEqual(counter_cache.reconcile(), 0)
+
+
+class CommentThreadTests(TestCase):
+    """Ветки комментариев по материализованному пути (social/threads.py) и их JSON API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = make_user('author', is_developer=True)
+        cls.reader = make_user('reader')
+        cls.post = Post.objects.create(author=cls.author, title='Пост', slug='post', content='Текст')
+        cls.first = cls.comment(cls.post)
+        cls.reply = cls.comment(cls.post, parent=cls.first)
+        cls.nested = cls.comment(cls.post, parent=cls.reply)
+        cls.hidden = cls.comment(cls.post, parent=cls.first, is_public=False)
+        cls.comment(cls.post, parent=cls.hidden)
+        cls.second = cls.comment(cls.post)
+
+    @classmethod
+    def comment(cls, target, **kwargs):
+        return Comment.objects.create(user=cls.reader, content='Комментарий', content_object=target, **kwargs)
+
+    def tree(self, comments):
+        return [(comment.pk, self.tree(comment.children)) for comment in comments]
+
+    def test_path_encodes_ancestors(self):
+        nested = Comment.objects.get(pk=self.nested.pk)
+        self.assertEqual((nested.root_id, nested.depth), (self.first.pk, 2))
+        self.assertTrue(nested.path.startswith(Comment.objects.get(pk=self.reply.pk).path))
+
+    def test_thread_skips_hidden_branches(self):
+        ContentType.objects.get_for_model(Post)
+        with self.assertNumQueries(2):
+            page = threads.thread(self.post)
+            tree = self.tree(page)
+        self.assertEqual(tree, [
+            (self.second.pk, []),
+            (self.first.pk, [(self.reply.pk, [(self.nested.pk, [])])]),
+        ])
+
+    def test_depth_window(self):
+        page = threads.thread(self.post, max_depth=1)
+        self.assertEqual(self.tree(page)[1], (self.first.pk, [(self.reply.pk, [])]))
+        subtree = threads.subtree(self.reply, max_depth=1)
+        self.assertEqual(self.tree([subtree]), [(self.reply.pk, [(self.nested.pk, [])])])
+
+    def test_thread_api(self):
+        response = self.client.get(reverse('social:comment_thread', args=['post', self.post.pk]), {'depth': 1})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([item['id'] for item in data['results']], [self.second.pk, self.first.pk])
+        reply = data['results'][1]['replies'][0]
+        self.assertEqual((reply['id'], reply['replies'], reply['has_more_replies']), (self.reply.pk, [], True))
+        self.assertIsNone(data['next'])
+
+        response = self.client.get(reverse('social:comment_replies', args=[self.reply.pk]))
+        self.assertEqual([item['id'] for item in response.json()['replies']], [self.nested.pk])
+
+    def test_thread_api_hides_unknown_and_private_targets(self):
+        self.assertEqual(self.client.get(reverse('social:comment_thread', args=['game', 1])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('social:comment_replies', args=[self.hidden.pk])).status_code, 404)
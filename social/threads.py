@@ -0,0 +1,133 @@
+# Ветки комментариев
+#
+# Comment хранит материализованный путь: path — id всех предков и свой id,
+# каждый дополнен нулями до Comment.PATH_STEP цифр; root — корневой
+# комментарий ветки, depth — уровень (0 у корня). Путь записывается при
+# создании комментария (Comment.save), родитель после этого не меняется.
+# Сортировка по path дает обход ветки в глубину, ответы одного уровня —
+# в порядке создания.
+#
+# thread() отдает страницу корневых комментариев объекта (keyset по
+# (-created_at, -id), индекс social_comment_roots) и все их ответы до
+# max_depth одним запросом по индексу (root, path) — два запроса на
+# страницу, сколько бы комментариев ни было в ветках. Счетчики ответов
+# (replies_count, social/counter_cache.py) позволяют показать «еще N
+# ответов» за пределами окна без дополнительных запросов.
+#
+# Непубличные комментарии не показываются вместе со своими ответами.
+
+from django.apps import apps as global_apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+
+from core.pagination import KeysetPaginator
+
+
+# Ключ keyset-пагинации корневых комментариев
+ROOT_ORDERING = ('-created_at', '-id')
+
+UPDATE_BATCH_SIZE = 500
+
+
+def _attach(roots, descendants):
+    """Раскладывает descendants (по возрастанию path) в children родителей"""
+    by_pk = {}
+    for comment in roots:
+        comment.children = []
+        by_pk[comment.pk] = comment
+    for comment in descendants:
+        parent = by_pk.get(comment.parent_id)
+        if parent is None:
+            # Предок скрыт или за пределами окна
+            continue
+        comment.children = []
+        parent.children.append(comment)
+        by_pk[comment.pk] = comment
+
+
+def _descendants(queryset, max_depth):
+    queryset = queryset.filter(is_public=True).select_related('user').order_by('path')
+    if max_depth is not None:
+        queryset = queryset.filter(depth__lte=max_depth)
+    return list(queryset)
+
+
+def roots(target):
+    """Публичные корневые комментарии объекта target"""
+    from .models import Comment
+
+    return Comment.objects.filter(
+        content_type=ContentType.objects.get_for_model(target),
+        object_id=target.pk,
+        depth=0,
+        is_public=True,
+    ).select_related('user')
+
+
+def thread(target, cursor=None, per_page=20, max_depth=None):
+    """
+    Страница веток комментариев объекта target: корневые комментарии
+    (KeysetPage) с деревом ответов в comment.children, ответы не глубже
+    max_depth.
+    """
+    from .models import Comment
+
+    page = KeysetPaginator(roots(target), ROOT_ORDERING, per_page).page(cursor)
+    if page.object_list:
+        descendants = _descendants(
+            Comment.objects.filter(root_id__in=[comment.pk for comment in page], depth__gt=0), max_depth
+        )
+    else:
+        descendants = []
+    _attach(page.object_list, descendants)
+    return page
+
+
+def subtree(comment, max_depth=None):
+    """
+    Ответы на comment (дерево в comment.children) не глубже max_depth
+    уровней от него — одним запросом по префиксу пути.
+    """
+    from .models import Comment
+
+    descendants = _descendants(
+        Comment.objects.filter(root_id=comment.root_id, path__startswith=comment.path, depth__gt=comment.depth),
+        None if max_depth is None else comment.depth + max_depth,
+    )
+    _attach([comment], descendants)
+    return comment
+
+
+def rebuild_paths(apps=global_apps):
+    """Заполняет root, path и depth всех комментариев, возвращает количество"""
+    Comment = apps.get_model('social', 'Comment')
+    step, max_depth = 10, 20  # Comment.PATH_STEP, Comment.MAX_DEPTH
+
+    parents = dict(Comment.objects.values_list('pk', 'parent_id'))
+    paths = {}
+
+    def resolve(pk):
+        chain = []
+        while pk is not None and pk not in paths and pk not in chain:
+            chain.append(pk)
+            pk = parents.get(pk)
+        for current in reversed(chain):
+            parent_id = parents.get(current)
+            if parent_id is None or parent_id not in paths:
+                paths[current] = (None, current, str(current).zfill(step), 0)
+                continue
+            _, root_id, path, depth = paths[parent_id]
+            if depth >= max_depth:
+                parent_id = parents[parent_id]
+                path, depth = path[:-step], depth - 1
+            paths[current] = (parent_id, root_id, path + str(current).zfill(step), depth + 1)
+
+    for pk in parents:
+        resolve(pk)
+
+    with transaction.atomic():
+        comments = []
+        for pk, (parent_id, root_id, path, depth) in paths.items():
+            comments.append(Comment(pk=pk, parent_id=parent_id, root_id=root_id, path=path, depth=depth))
+        Comment.objects.bulk_update(comments, ['parent_id', 'root_id', 'path', 'depth'], batch_size=UPDATE_BATCH_SIZE)
+    return len(comments)
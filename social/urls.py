@@ -4,6 +4,14 @@ from . import views
 app_name = 'social'
 
 urlpatterns = [
+    # Лента подписок
+    path('feed/', views.feed_view, name='feed'),
+    
+    # Уведомления
+    path('notifications/', views.notification_list, name='notifications'),
+    path('notifications/read/', views.mark_notifications_read, name='notifications_read'),
+    path('notifications/stream/', views.notification_stream, name='notification_stream'),
+    
     # Отзывы
     # path('reviews/', views.ReviewListView.as_view(), name='review_list'),
     # path('reviews/<int:pk>/', views.ReviewDetailView.as_view(), name='review_detail'),
@@ -12,6 +20,10 @@ urlpatterns = [
     # path('posts/', views.PostListView.as_view(), name='post_list'),
     # path('posts/<slug:slug>/', views.PostDetailView.as_view(), name='post_detail'),
     
+    # Ветки комментариев (social/threads.py)
+    path('comments/<str:target_type>/<int:object_id>/', views.comment_thread, name='comment_thread'),
+    path('comments/<int:pk>/replies/', views.comment_replies, name='comment_replies'),
+    
     # Комментарии и лайки
     # path('like/<int:content_type_id>/<int:object_id>/', views.toggle_like, name='toggle_like'),
     # path('comment/<int:content_type_id>/<int:object_id>/', views.add_comment, name='add_comment'),
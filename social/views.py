@@ -1,4 +1,159 @@
-# Social views будут добавлены позже
-from django.shortcuts import render
+import asyncio
+import json
 
-# Заглушки для views
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_POST
+
+from core.pagination import KeysetPaginator, cursor_query_string
+from . import feed, notifications, push, threads
+from .models import Comment, Post, Review
+
+
+# Объекты с комментариями (имя в URL -> модель и условие видимости)
+COMMENT_TARGETS = {
+    'post': (Post, {'is_published': True}),
+    'review': (Review, {'is_public': True}),
+}
+
+# Корневых комментариев на странице ветки
+THREAD_PAGE_SIZE = 20
+
+
+@login_required
+def notification_list(request):
+    """Лента уведомлений"""
+    unread_only = request.GET.get('unread') == '1'
+    paginator = KeysetPaginator(
+        notifications.inbox(request.user, unread_only), notifications.INBOX_ORDERING, 20
+    )
+    page_obj = paginator.page(request.GET.get('cursor'))
+    
+    return render(request, 'social/notification_list.html', {
+        'notifications': page_obj,
+        'page_obj': page_obj,
+        'unread_only': unread_only,
+        'pagination_query': cursor_query_string(request),
+    })
+
+
+@login_required
+def feed_view(request):
+    """Лента постов авторов, на которых подписан пользователь"""
+    page_obj = feed.timeline(request.user, request.GET.get('cursor'))
+    
+    return render(request, 'social/feed.html', {
+        'posts': page_obj,
+        'page_obj': page_obj,
+        'pagination_query': cursor_query_string(request),
+    })
+
+
+@login_required
+@require_POST
+def mark_notifications_read(request):
+    """Отмечает прочитанными выбранные (ids) или все уведомления"""
+    ids = request.POST.getlist('ids')
+    updated = notifications.mark_read(request.user, [int(pk) for pk in ids if pk.isdigit()] if ids else None)
+    
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return JsonResponse({'updated': updated, 'unread': request.user.unread_notifications_count - updated})
+    return redirect('social:notifications')
+
+
+def _depth(request):
+    """?depth=N — глубина окна ответов; без параметра — вся ветка"""
+    depth = request.GET.get('depth', '')
+    return int(depth) if depth.isdigit() else None
+
+
+def _comment_data(comment):
+    children = getattr(comment, 'children', [])
+    return {
+        'id': comment.pk,
+        'user': comment.user.username,
+        'content': comment.content,
+        'created_at': comment.created_at.isoformat(),
+        'depth': comment.depth,
+        'likes_count': comment.likes_count,
+        'replies_count': comment.replies_count,
+        # Ответы за пределами окна ?depth дочитываются через comment_replies
+        'has_more_replies': comment.replies_count > len(children),
+        'replies': [_comment_data(child) for child in children],
+    }
+
+
+def comment_thread(request, target_type, object_id):
+    """
+    Ветки комментариев объекта (JSON): страница корневых комментариев по
+    ?cursor= с деревьями ответов — два запроса на страницу (social/threads.py)
+    """
+    if target_type not in COMMENT_TARGETS:
+        raise Http404
+    model, visible = COMMENT_TARGETS[target_type]
+    target = get_object_or_404(model, pk=object_id, **visible)
+    page = threads.thread(target, request.GET.get('cursor'), THREAD_PAGE_SIZE, _depth(request))
+    
+    return JsonResponse({
+        'results': [_comment_data(comment) for comment in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def comment_replies(request, pk):
+    """Ответы на комментарий (JSON) одним запросом по префиксу пути"""
+    comment = get_object_or_404(Comment.objects.select_related('user'), pk=pk, is_public=True)
+    return JsonResponse(_comment_data(threads.subtree(comment, _depth(request))))
+
+
+def _event(notification):
+    data = json.dumps(notification, ensure_ascii=False)
+    return f"id: {notification['cursor']}\nevent: notification\ndata: {data}\n\n"
+
+
+async def notification_stream(request):
+    """
+    Поток новых уведомлений (Server-Sent Events). Работает под ASGI;
+    после переподключения дочитывает пропущенное по Last-Event-ID.
+    """
+    if not push.enabled():
+        # 204 — EventSource не переподключается
+        return HttpResponse(status=204)
+    user_id = await sync_to_async(
+        lambda: request.user.pk if request.user.is_authenticated else None
+    )()
+    if user_id is None:
+        return HttpResponse(status=401)
+    
+    # Ключ доставки (created_at, id): поднятая группа сохраняет id, но не created_at
+    last_key = notifications.parse_cursor(request.headers.get('Last-Event-ID', ''))
+    
+    async def events():
+        sent = last_key or (0, 0)
+        async with push.hub.subscribe(user_id) as queue:
+            yield 'retry: 5000\n\n'
+            # Дочитываем пропущенное уже после подписки, чтобы ничего не потерять между ними
+            if last_key is not None:
+                missed = await sync_to_async(notifications.missed_since)(user_id, last_key)
+                for notification in missed:
+                    yield _event(push.serialize(notification))
+                    sent = max(sent, notifications.delivery_key(notification))
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), push.heartbeat())
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                key = notifications.parse_cursor(message['cursor'])
+                if key > sent:
+                    sent = key
+                    yield _event(message)
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response